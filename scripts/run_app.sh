@@ -1,6 +1,8 @@
 #!/bin/sh
-python3 ./scripts/wait_for_postgres.py
+python3 ./src/manage.py wait_for_database --timeout 30
 python3 ./src/manage.py collectstatic --noinput
 python3 ./src/manage.py migrate
+python3 ./src/manage.py build_openapi
 #python3 ./src/manage.py runserver 0.0.0.0:8000
-cd src && gunicorn config.wsgi:application --workers=2 --reload --bind 0.0.0.0:8000
\ No newline at end of file
+# Settings in src/gunicorn.conf.py (workers, preload, worker class, ...), set by the GUNICORN_* environment variables
+cd src && gunicorn
\ No newline at end of file
@@ -0,0 +1,158 @@
+import structlog
+
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status, viewsets
+from rest_framework.utils.urls import replace_query_param
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from apis.serializers.page import PageResponseSerializer
+from apis.serializers.part import PartResponseSerializer
+from apis.serializers.version import VersionResponseSerializer
+from docs.changes import KIND_MODELS, changes_since, collapse_changes, expand_access_changes, lost_permission_ids
+from docs.models import Change
+from users.access import active_groups, readable_permission_ids
+from utils.choices import ChangeActions, DocKinds
+from utils.pagination import get_page_size
+
+logger = structlog.getLogger('wz-doc')
+
+RESPONSE_SERIALIZERS = {
+    DocKinds.VERSIONS: VersionResponseSerializer,
+    DocKinds.PAGES: PageResponseSerializer,
+    DocKinds.PARTS: PartResponseSerializer,
+}
+
+since_parameter = openapi.Parameter(
+    'since', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+    description='Cursor returned by the previous sync. Without it, every Version, Page and Part is returned'
+)
+
+page_size_parameter = openapi.Parameter(
+    'page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Max number of changes read'
+)
+
+
+def ids_schema(description: str):
+    return openapi.Schema(
+        type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER), description=description
+    )
+
+
+class ChangeViewSet(viewsets.GenericViewSet):
+    """
+    Incremental sync of the offline copies of the documentation
+    """
+    permission_classes = (IsAuthenticated,)
+    queryset = Change.objects.none()
+
+    @swagger_auto_schema(
+        operation_description="List the Versions, Pages and Parts created, updated or deleted since a cursor",
+        manual_parameters=[since_parameter, page_size_parameter],
+        responses={
+            status.HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'next': openapi.Schema(
+                        type=openapi.TYPE_STRING, description='URL of the next changes, null when the client is up to date'
+                    ),
+                    'results': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'data': openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'cursor': openapi.Schema(
+                                        type=openapi.TYPE_INTEGER, description='`since` of the next sync'
+                                    ),
+                                    'versions': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                    'pages': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                    'parts': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                    'deleted': openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            'versions': ids_schema('IDs of the Versions deleted or not readable anymore'),
+                                            'pages': ids_schema('IDs of the Pages deleted or not readable anymore'),
+                                            'parts': ids_schema('IDs of the Parts deleted or not readable anymore'),
+                                        }
+                                    ),
+                                }
+                            ),
+                            'code': openapi.Schema(type=openapi.TYPE_STRING),
+                        }
+                    ),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            )
+        },
+        tags=['docs-changes'])
+    def list(self, request):
+        """
+        Created and updated objects are returned in their current state, if the user can read them.
+        Deleted objects are only returned as IDs, if the user could read them. So are the objects the user can not
+        read anymore since a permission or a group was revoked; the objects it can read since a grant are returned
+        like the created ones. Grants and revocations are logged per permission or group and expanded to their
+        objects here.
+        :param request:
+        :return:
+        """
+        try:
+            try:
+                since = int(request.query_params.get('since', 0))
+            except ValueError:
+                return Response({'message': 'since should be a cursor', 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            page_size = get_page_size(request)
+            rows = changes_since(since, limit=page_size + 1, user=request.user)
+
+            next_url = None
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                next_url = replace_query_param(request.build_absolute_uri(), 'since', rows[-1][0])
+
+            cursor = rows[-1][0] if rows else since
+
+            user_permissions = None
+            if (request.user.is_superuser, request.user.is_staff) != (False, False):
+                # Staff read everything: their access changes, logged before they became staff, are meaningless
+                rows = [row for row in rows if row[1] in KIND_MODELS]
+            elif rows:
+                rows = expand_access_changes(rows)
+                user_permissions = set(readable_permission_ids(request.user))
+                # An object still read through another grant is not revoked
+                rows = [row for row in rows if row[3] != ChangeActions.REVOKED or row[4] not in user_permissions]
+
+                if any(row[3] == ChangeActions.DELETED and row[4] not in user_permissions for row in rows):
+                    readable = user_permissions | lost_permission_ids(
+                        request.user, since, active_groups(request.user).values_list('id', flat=True)
+                    )
+                    rows = [row for row in rows if row[3] != ChangeActions.DELETED or row[4] in readable]
+
+            upserted, deleted = collapse_changes(rows)
+
+            data = {kind: [] for kind in KIND_MODELS}
+            for kind, ids in upserted.items():
+                if not ids:
+                    continue
+
+                queryset = KIND_MODELS[kind].objects.filter(id__in=ids).select_related('permission').order_by('id')
+                if user_permissions is not None:
+                    queryset = queryset.filter(permission_id__in=user_permissions)
+
+                data[kind] = RESPONSE_SERIALIZERS[kind](queryset, many=True).data
+
+            data['cursor'] = cursor
+            data['deleted'] = deleted
+
+            logger.info('DOCS_CHANGES-DATA', since=since, cursor=cursor, changes=len(rows), next=next_url)
+
+            return Response({'next': next_url, 'results': {'data': data, 'code': '200'}})
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
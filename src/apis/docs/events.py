@@ -0,0 +1,226 @@
+import asyncio
+import time
+
+import orjson
+import structlog
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from docs.changes import last_sequence, publish_changes_since
+from docs.events import RESYNC, hub
+from users.access import readable_permission_ids
+from utils.choices import ChangeActions
+
+logger = structlog.getLogger('wz-doc')
+
+# Sessions need the CSRF and session middlewares, which do not run for this endpoint
+EVENTS_AUTHENTICATION_CLASSES = (JWTAuthentication, TokenAuthentication)
+
+
+def authenticate(headers: dict):
+    """
+    Return the user authenticated by the Authorization header, None if there is none or it is invalid
+    """
+    request = HttpRequest()
+    request.META['HTTP_AUTHORIZATION'] = headers.get('authorization', '')
+
+    for authentication_class in EVENTS_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except AuthenticationFailed:
+            return None
+
+        if result is not None and result[0].is_active:
+            return result[0]
+
+    return None
+
+
+class ChangeTail:
+    """
+    Read the change feed (docs.changes) by cursor and publish the changes to the hub (docs.events), so that the
+    streams of each process get the changes committed by every process. Runs in the event loop of the streams,
+    every settings.DOC_EVENTS_POLL seconds, while at least one stream is open.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.streams = 0
+
+    def start(self):
+        self.streams += 1
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+
+    def stop(self):
+        self.streams = max(self.streams - 1, 0)
+        if self.streams == 0 and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        cursor = await sync_to_async(last_sequence)()
+        while True:
+            await asyncio.sleep(settings.DOC_EVENTS_POLL)
+            more = True
+            while more:
+                try:
+                    cursor, more = await sync_to_async(publish_changes_since)(cursor)
+                except Exception as e:
+                    logger.exception('DOC_EVENTS-TAIL_ERROR', error=str(e), cursor=cursor)
+                    break
+
+
+change_tail = ChangeTail()
+
+
+class ReaderFilter:
+    """
+    Decide which events a connection may receive, from the permissions of its user.
+    The permissions are reloaded when they are older than settings.DOC_EVENTS_ACCESS_TTL, when an access change of
+    the user (grant or revocation) is published after they were loaded, or when an object is created after they
+    were loaded with a permission the user does not hold (e.g. a Page created in a Version the user reads, its
+    permission being added to the Version group). Other events never reload them: an event burst costs at most
+    one reload per connection.
+    A deletion is sent if the user could read the object during the connection: the permissions lost by a reload
+    are kept, as the deletion of a permission revokes it before its objects are deleted.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_staff = user.is_superuser or user.is_staff
+        self.permissions = set()
+        self.lost_permissions = set()
+        self.loaded_at = None
+
+    async def load(self):
+        permissions = set(await sync_to_async(lambda: list(readable_permission_ids(self.user)))())
+        self.lost_permissions |= self.permissions - permissions
+        self.permissions = permissions
+        self.loaded_at = time.monotonic()
+
+    def is_stale(self, event: dict) -> bool:
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > settings.DOC_EVENTS_ACCESS_TTL:
+            return True
+
+        if event['published_at'] <= self.loaded_at:
+            return False
+
+        return event['user_id'] is not None or (
+            event['action'] == ChangeActions.CREATED and event['permission_id'] not in self.permissions
+        )
+
+    async def accepts(self, event: dict) -> bool:
+        if event['user_id'] is not None and event['user_id'] != self.user.id:
+            # Access changes are only sent to their user, like in the change feed
+            return False
+
+        if self.is_staff:
+            return True
+
+        if event['action'] == ChangeActions.DELETED:
+            # Deleted objects are only sent as IDs, like in the change feed
+            return event['permission_id'] in self.permissions or event['permission_id'] in self.lost_permissions
+
+        if self.is_stale(event):
+            await self.load()
+
+        return event['user_id'] is not None or event['permission_id'] in self.permissions
+
+
+def format_event(event: dict) -> bytes:
+    """
+    Server-Sent Event: the id is the change cursor, so that a client can resume from the change feed
+    """
+    if event is RESYNC:
+        return b'event: resync\ndata: {}\n\n'
+
+    data = orjson.dumps({key: event[key] for key in ('cursor', 'kind', 'id', 'action')})
+    lines = [f'id: {event["cursor"]}'.encode()] if event['cursor'] is not None else []
+    lines += [f'event: {event["action"]}'.encode(), b'data: ' + data]
+    return b'\n'.join(lines) + b'\n\n'
+
+
+async def send_json(send, status: int, content: dict):
+    body = orjson.dumps(content)
+    await send({
+        'type': 'http.response.start', 'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def doc_events(scope, receive, send):
+    """
+    ASGI endpoint streaming the changes of the Versions, Pages and Parts the user can read, as Server-Sent Events.
+
+    Each event is {"cursor", "kind", "id", "action"}. "granted" and "revoked" are the access changes of the user,
+    of kind "permissions" or "groups": the client reads the objects they give or take from the change feed.
+    A client which falls behind receives a "resync" event and the stream ends: it should read
+    /api/docs/changes/?since=<last event id> and reconnect.
+    A comment line is sent every settings.DOC_EVENTS_HEARTBEAT seconds to keep idle connections open.
+    """
+    if scope['method'] != 'GET':
+        await send_json(send, 405, {'detail': f'Method "{scope["method"]}" not allowed.'})
+        return
+
+    headers = {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope['headers']}
+    user = await sync_to_async(authenticate)(headers)
+    if user is None:
+        await send_json(send, 401, {'detail': 'Authentication credentials were not provided.'})
+        return
+
+    reader = ReaderFilter(user)
+    if not reader.is_staff:
+        await reader.load()
+
+    subscription = hub.subscribe(asyncio.get_running_loop(), settings.DOC_EVENTS_QUEUE_SIZE)
+    change_tail.start()
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    logger.info('DOC_EVENTS-SUBSCRIBE', user=str(user.id), subscriptions=len(hub))
+
+    try:
+        await send({
+            'type': 'http.response.start', 'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),  # Do not let nginx buffer the stream
+            ],
+        })
+
+        while True:
+            get = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect}, timeout=settings.DOC_EVENTS_HEARTBEAT, return_when=asyncio.FIRST_COMPLETED
+            )
+            if get not in done:
+                get.cancel()
+                if disconnect in done:
+                    return
+
+                await send({'type': 'http.response.body', 'body': b': heartbeat\n\n', 'more_body': True})
+                continue
+
+            event = get.result()
+            if event is RESYNC:
+                await send({'type': 'http.response.body', 'body': format_event(RESYNC), 'more_body': False})
+                return
+
+            if await reader.accepts(event):
+                await send({'type': 'http.response.body', 'body': format_event(event), 'more_body': True})
+    finally:
+        hub.unsubscribe(subscription)
+        change_tail.stop()
+        disconnect.cancel()
+        logger.info('DOC_EVENTS-UNSUBSCRIBE', user=str(user.id), subscriptions=len(hub))
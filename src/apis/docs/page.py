@@ -1,6 +1,7 @@
 import structlog
-from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
@@ -9,10 +10,20 @@ from rest_framework import status, viewsets, mixins
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from apis.serializers.page import PageRequestSerializer, PageResponseSerializer, PageWithPartSerializer
-from apis.serializers.part import PartResponseSerializer
-from docs.models import Page, Version, Part
-from utils.decorators import IsStaffOrAdminUser
+from apis.serializers.page import (
+    PageRequestSerializer, PageResponseSerializer, PageWithPartSerializer, BulkPageDeleteRequest, BulkPageMoveRequest,
+)
+from apis.serializers.part import PartResponseSerializer, PartValuesSerializer
+from apis.serializers.users import ReaderSerializer
+from docs.models import Page, Part, RevisionConflict
+from users.access import readable_permission_ids, readers, active_groups, active_user_permissions
+from users.models import User
+from utils.decorators import (
+    IsStaffOrAdminUser, idempotent, idempotency_key_parameter, if_match_parameter, if_match_revision,
+    revision_conflict_response, with_revision_etag,
+)
+from utils.sparse_fields import get_sparse_fields, sparse_fields_parameters
+from utils.streaming import is_streaming_requested, streaming_list_response, stream_parameter
 
 logger = structlog.getLogger('wz-doc')
 
@@ -25,7 +36,7 @@ class PageViewSet(
     queryset = Page.objects.none()
 
     def get_permissions(self):
-        if self.action in ('create', 'update', 'destroy'):
+        if self.action in ('create', 'update', 'destroy', 'readers', 'bulk_delete', 'bulk_move'):
             permission_classes = (IsStaffOrAdminUser,)
         else:
             permission_classes = (IsAuthenticated,)
@@ -39,21 +50,23 @@ class PageViewSet(
             return PageRequestSerializer
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            # Schema generation (manage.py build_openapi) has no connected user
+            return Page.objects.none()
+
         if (self.request.user.is_superuser, self.request.user.is_staff) == (False, False):
             # if it is not a superadmin or not a staff we check
             #permissions_code = Permission.objects.filter(group__user=self.request.user).values_list('codename', flat=True)
-            user_permissions = (
-                Permission.objects.filter(group__user=self.request.user) |
-                self.request.user.user_permissions.all()
-            ).values_list('id', flat=True)
+            user_permissions = readable_permission_ids(self.request.user)
 
             logger.info('PAGE-QUERYSET', permissions_ids=user_permissions)
 
             return Page.objects.filter(permission__id__in=user_permissions).order_by('name')
 
-        return Page.objects.all().order_by('name')
+        return Page.objects.select_related('permission', 'version').order_by('name')
 
-    @swagger_auto_schema(operation_description="Create a Page", request_body=PageRequestSerializer, responses={status.HTTP_201_CREATED: PageResponseSerializer()}, tags=['docs-page'])
+    @swagger_auto_schema(operation_description="Create a Page", request_body=PageRequestSerializer, manual_parameters=[idempotency_key_parameter], responses={status.HTTP_201_CREATED: PageResponseSerializer()}, tags=['docs-page'])
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             logger.info('PAGE_CREATE-DATA', data=request.data)
@@ -62,25 +75,24 @@ class PageViewSet(
             if not serializer.is_valid():
                 return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
 
-            version = Version.objects.get(id=request.data['version'])
+            version = serializer.validated_data['version']
             permission_code = f"{version.name.lower()}" \
                               f"-{request.data['name'].lower().replace(' ', '_')}"
 
-            page = serializer.save()
-            logger.info('PAGE_CREATE-CREATE_PERMISSION', data=request.data)
-
             content_type = ContentType.objects.get_for_model(Page)
-            permission = Permission.objects.create(
-                codename=permission_code,
-                name=f"{version.name} - {serializer.data['name']}",
-                content_type=content_type
-            )
-            page.permission = permission
-            page.save()
-
-            logger.info('PAGE_CREATE-ASSOCIATE_PERMISSION_TO_GROUP', data=request.data)
-            group = Group.objects.get(name=version.name)
-            group.permissions.add(permission)
+            with transaction.atomic():
+                # The Permission is created first, so that the Page row is inserted only once
+                logger.info('PAGE_CREATE-CREATE_PERMISSION', data=request.data)
+                permission = Permission.objects.create(
+                    codename=permission_code,
+                    name=f"{version.name} - {serializer.validated_data['name'].title()}",
+                    content_type=content_type
+                )
+                page = serializer.save(permission=permission)
+
+                if version.group_id is not None:
+                    logger.info('PAGE_CREATE-ASSOCIATE_PERMISSION_TO_GROUP', data=request.data)
+                    permission.group_set.add(version.group_id)
 
             serializer = PageResponseSerializer(instance=page)
 
@@ -88,7 +100,7 @@ class PageViewSet(
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @swagger_auto_schema(operation_description="Retrieve a Page", responses={status.HTTP_200_OK: PageWithPartSerializer()}, tags=['docs-page'])
+    @swagger_auto_schema(operation_description="Retrieve a Page", manual_parameters=sparse_fields_parameters, responses={status.HTTP_200_OK: PageWithPartSerializer()}, tags=['docs-page'])
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve a Documentation Page
@@ -98,15 +110,21 @@ class PageViewSet(
         :return:
         """
         try:
+            serializer_class = self.get_serializer_class()
+            try:
+                sparse_fields = get_sparse_fields(request, serializer_class)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
             instance = self.get_object()
             #serializer = self.serializer_class(instance=instance)
-            serializer_class = self.get_serializer_class()
-            serializer = serializer_class(instance=instance)
-            return Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            serializer = serializer_class(instance=instance, **sparse_fields)
+            response = Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            return with_revision_etag(response, instance)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @swagger_auto_schema(operation_description="Update a Documentation Page", responses={status.HTTP_201_CREATED: PageResponseSerializer()}, tags=['docs-page'])
+    @swagger_auto_schema(operation_description="Update a Documentation Page", manual_parameters=[if_match_parameter], responses={status.HTTP_201_CREATED: PageResponseSerializer()}, tags=['docs-page'])
     def update(self, request, *args, **kwargs):
         """
         Retrieve a Documentation Page
@@ -115,6 +133,14 @@ class PageViewSet(
         :param kwargs:
         :return:
         """
+        try:
+            expected_revision = if_match_revision(request)
+        except ValueError:
+            return Response(
+                {'message': 'If-Match should be the revision of the object', 'code': '400'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             instance = self.get_object()
             old_version_name = instance.version.name.lower()
@@ -126,7 +152,8 @@ class PageViewSet(
             serializer = serializer_class(
                 instance=instance,
                 data=request.data,
-                partial=True
+                partial=True,
+                context={'expected_revision': expected_revision}
             )
             if not serializer.is_valid():
                 return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
@@ -134,7 +161,7 @@ class PageViewSet(
             if 'name' in request.data or 'version' in request.data:
 
                 if 'version' in request.data:
-                    version = Version.objects.get(id=request.data['version'])
+                    version = serializer.validated_data['version']
                     old_version = instance.version
 
                     if old_version != version:
@@ -146,30 +173,33 @@ class PageViewSet(
                 permission_code = f"{version.name.lower()}" \
                                   f"-{request.data.get('name', instance.name).lower().replace(' ', '_')}"
 
-                serializer.save()
+                with transaction.atomic():
+                    serializer.save()
 
-                logger.info('PAGE_UPDATE-UPDATE_PERMISSION', data=request.data, permission_code=permission_code)
-                instance.permission.codename = permission_code
-                instance.permission.name = f"{version.name} - {serializer.data['name']}"
-                instance.permission.save()
+                    logger.info('PAGE_UPDATE-UPDATE_PERMISSION', data=request.data, permission_code=permission_code)
+                    instance.permission.codename = permission_code
+                    instance.permission.name = f"{version.name} - {instance.name}"
+                    instance.permission.save(update_fields=['codename', 'name'])
 
-                if switch_group:
-                    logger.info(
-                        'PAGE_UPDATE-UPDATE_GROUP',
-                        data=request.data, old_version_name=old_version_name, permission_code=permission_code
-                    )
+                    if switch_group:
+                        logger.info(
+                            'PAGE_UPDATE-UPDATE_GROUP',
+                            data=request.data, old_version_name=old_version_name, permission_code=permission_code
+                        )
 
-                    old_group = Group.objects.get(name=old_version_name.title())
-                    old_group.permissions.remove(instance.permission)
-
-                    new_group = Group.objects.get(name=instance.version.name)
-                    new_group.permissions.add(instance.permission)
+                        if old_version.group_id is not None:
+                            instance.permission.group_set.remove(old_version.group_id)
+                        if version.group_id is not None:
+                            instance.permission.group_set.add(version.group_id)
 
             else:
                 serializer.save()
 
             serializer = PageResponseSerializer(instance=instance)
-            return Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            response = Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            return with_revision_etag(response, instance)
+        except RevisionConflict as e:
+            return revision_conflict_response(e, expected_revision)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -185,11 +215,12 @@ class PageViewSet(
             instance = self.get_object()
             logger.info('PAGE_DELETE-DATA', id=kwargs.get('pk'), name=instance.name)
 
-            logger.info('PAGE_DELETE-DELETE_PERMISSION', id=kwargs.get('pk'))
-            instance.permission.delete()
+            with transaction.atomic():
+                logger.info('PAGE_DELETE-DELETE_PERMISSION', id=kwargs.get('pk'))
+                instance.permission.delete()
 
-            logger.info('PAGE_DELETE-INSTANCE', id=kwargs.get('pk'))
-            instance.delete()
+                logger.info('PAGE_DELETE-INSTANCE', id=kwargs.get('pk'))
+                instance.delete()
 
             return Response({'message': 'Documentation Page deleted successfully', 'code': '202'}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
@@ -197,20 +228,26 @@ class PageViewSet(
 
     @swagger_auto_schema(
         operation_description="List All Parts related to a Documentation Page",
+        manual_parameters=[stream_parameter, *sparse_fields_parameters],
         responses={status.HTTP_200_OK: PartResponseSerializer()},
         tags=['docs-page'])
     @action(methods=['GET'], detail=True)
     def parts(self, request, pk):
         try:
+            try:
+                sparse_fields = get_sparse_fields(request, PartResponseSerializer)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
             instance = self.get_object()
             logger.info('LIST_PART-DATA', page=instance.name)
             page_parts = Part.objects.filter(page=instance).order_by('name')
 
             if (self.request.user.is_superuser, self.request.user.is_staff) == (False, False) \
-                    and self.request.user.groups.filter(name=instance.version.name).exists() is False:
+                    and active_groups(self.request.user).filter(id=instance.version.group_id).exists() is False:
                 logger.info('LIST_PART-NOT_STAFF')
 
-                user_permissions = self.request.user.user_permissions.all().values_list('id', flat=True)
+                user_permissions = active_user_permissions(self.request.user).values_list('id', flat=True)
 
                 logger.info('LIST_PART-NOT_STAFF_2', user_permissions=user_permissions)
 
@@ -221,9 +258,136 @@ class PageViewSet(
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
+            if is_streaming_requested(request):
+                return streaming_list_response(
+                    PartValuesSerializer(**sparse_fields).values(page_parts), PartValuesSerializer,
+                    serializer_kwargs=sparse_fields
+                )
+
+            page_parts = PartValuesSerializer(**sparse_fields).values(page_parts)
             page = self.paginator.paginate_queryset(queryset=page_parts, request=request)
 
-            serializer = PartResponseSerializer(page, many=True)
+            serializer = PartValuesSerializer(page, many=True, **sparse_fields)
+            return self.paginator.get_paginated_response({'data': serializer.data, 'code': '200'})
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="List Users who can read the Page, through a direct Permission or their Version Group",
+        responses={status.HTTP_200_OK: ReaderSerializer(many=True)},
+        tags=['docs-page'])
+    @action(methods=['GET'], detail=True)
+    def readers(self, request, pk):
+        """
+        Audit who can read a Documentation Page. Staff and superusers read everything and are not listed.
+        :param request:
+        :param pk:
+        :return:
+        """
+        try:
+            instance = self.get_object()
+            logger.info('PAGE_READERS-DATA', page=instance.id, permission=instance.permission_id)
+
+            queryset = readers(instance.permission_id) if instance.permission_id else User.objects.none()
+            page = self.paginator.paginate_queryset(queryset=queryset, request=request)
+
+            serializer = ReaderSerializer(page, many=True)
             return self.paginator.get_paginated_response({'data': serializer.data, 'code': '200'})
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Delete many Pages, their Parts and their Permissions at once",
+        request_body=BulkPageDeleteRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses={
+            status.HTTP_202_ACCEPTED: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'data': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'pages': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of pages deleted"),
+                            'parts': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of parts deleted"),
+                        }
+                    ),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            )
+        },
+        tags=['docs-page'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_delete(self, request):
+        """
+        Delete many Documentation Pages in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('PAGE_BULK_DELETE-START', data=request.data)
+
+            serializer = BulkPageDeleteRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('PAGE_BULK_DELETE-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Move many Pages (and their Parts) to another Version at once",
+        request_body=BulkPageMoveRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses={
+            status.HTTP_202_ACCEPTED: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'data': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'pages': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of pages moved"),
+                            'parts': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of parts moved with them"),
+                        }
+                    ),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            )
+        },
+        tags=['docs-page'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_move(self, request):
+        """
+        Move many Documentation Pages to a Version in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('PAGE_BULK_MOVE-START', data=request.data)
+
+            serializer = BulkPageMoveRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('PAGE_BULK_MOVE-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
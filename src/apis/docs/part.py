@@ -1,6 +1,7 @@
 import structlog
-from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
@@ -9,9 +10,18 @@ from rest_framework import status, viewsets, mixins
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from apis.serializers.part import PartRequestSerializer, PartResponseSerializer
-from docs.models import Part, Page
-from utils.decorators import IsStaffOrAdminUser
+from apis.serializers.part import (
+    PartRequestSerializer, PartResponseSerializer, BulkPartDeleteRequest, BulkPartMoveRequest,
+)
+from apis.serializers.users import ReaderSerializer
+from docs.models import Part, Page, RevisionConflict
+from users.access import readable_permission_ids, readers
+from users.models import User
+from utils.decorators import (
+    IsStaffOrAdminUser, idempotent, idempotency_key_parameter, if_match_parameter, if_match_revision,
+    revision_conflict_response, with_revision_etag,
+)
+from utils.sparse_fields import get_sparse_fields, sparse_fields_parameters
 
 logger = structlog.getLogger('wz-doc')
 
@@ -24,7 +34,7 @@ class PartViewSet(
     queryset = Part.objects.none()
 
     def get_permissions(self):
-        if self.action in ('create', 'update', 'destroy'):
+        if self.action in ('create', 'update', 'destroy', 'readers', 'bulk_delete', 'bulk_move'):
             permission_classes = (IsStaffOrAdminUser,)
         else:
             permission_classes = (IsAuthenticated,)
@@ -32,25 +42,28 @@ class PartViewSet(
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            # Schema generation (manage.py build_openapi) has no connected user
+            return Part.objects.none()
+
         if (self.request.user.is_superuser, self.request.user.is_staff) == (False, False):
             # if it is not a superadmin or not a staff we check
             #permissions_code = Permission.objects.filter(group__user=self.request.user).values_list('codename', flat=True)
-            user_permissions = (
-                    Permission.objects.filter(group__user=self.request.user) |
-                    self.request.user.user_permissions.all()
-            ).values_list('id', flat=True)
+            user_permissions = readable_permission_ids(self.request.user)
 
             logger.info('PART-QUERYSET', permissions_ids=user_permissions)
 
             return Part.objects.filter(permission__id__in=user_permissions)
 
-        return Part.objects.all()
+        return Part.objects.select_related('permission', 'page__version')
 
     @swagger_auto_schema(
         operation_description="Create a Part of a Page",
-        request_body=PartRequestSerializer, responses={status.HTTP_201_CREATED: PartResponseSerializer()},
+        request_body=PartRequestSerializer, manual_parameters=[idempotency_key_parameter],
+        responses={status.HTTP_201_CREATED: PartResponseSerializer()},
         tags=['docs-page-part']
     )
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             logger.info('PAGE_PART_CREATE-DATA', data=request.data)
@@ -58,26 +71,25 @@ class PartViewSet(
             if not serializer.is_valid():
                 return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
 
-            page = Page.objects.get(id=request.data['page'])
+            page = serializer.validated_data['page']
             permission_code = f"{page.version.name.lower()}" \
                               f"-{page.name.lower().replace(' ', '_')}" \
                               f"-{request.data['name'].lower().replace(' ', '_')}"
 
-            part = serializer.save()
-            logger.info('PAGE_PART_CREATE-CREATE_PERMISSION', data=request.data, permission_code=permission_code)
-
             content_type = ContentType.objects.get_for_model(Part)
-            permission = Permission.objects.create(
-                codename=permission_code,
-                name=f"{page.version.name} - {page.name} - {serializer.data['name']}",
-                content_type=content_type
-            )
-            part.permission = permission
-            part.save()
+            with transaction.atomic():
+                # The Permission is created first, so that the Part row is inserted only once
+                logger.info('PAGE_PART_CREATE-CREATE_PERMISSION', data=request.data, permission_code=permission_code)
+                permission = Permission.objects.create(
+                    codename=permission_code,
+                    name=f"{page.version.name} - {page.name} - {serializer.validated_data['name'].title()}",
+                    content_type=content_type
+                )
+                part = serializer.save(permission=permission)
 
-            logger.info('PAGE_PART_CREATE-ASSOCIATE_PERMISSION_TO_GROUP', data=request.data)
-            group = Group.objects.get(name=page.version.name)
-            group.permissions.add(permission)
+                if page.version.group_id is not None:
+                    logger.info('PAGE_PART_CREATE-ASSOCIATE_PERMISSION_TO_GROUP', data=request.data)
+                    permission.group_set.add(page.version.group_id)
 
             serializer = PartResponseSerializer(instance=part)
             return Response({'data': serializer.data, 'code': '201'}, status=status.HTTP_201_CREATED)
@@ -86,6 +98,7 @@ class PartViewSet(
 
     @swagger_auto_schema(
         operation_description="Retrieve a Part of a Page",
+        manual_parameters=sparse_fields_parameters,
         responses={status.HTTP_200_OK: PartResponseSerializer()},
         tags=['docs-page-part']
     )
@@ -98,13 +111,19 @@ class PartViewSet(
         :return:
         """
         try:
+            try:
+                sparse_fields = get_sparse_fields(request, PartResponseSerializer)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
             instance = self.get_object()
-            serializer = PartResponseSerializer(instance=instance)
-            return Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            serializer = PartResponseSerializer(instance=instance, **sparse_fields)
+            response = Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            return with_revision_etag(response, instance)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @swagger_auto_schema(operation_description="Update a Documentation Page", responses={status.HTTP_201_CREATED: PartResponseSerializer()}, tags=['docs-page-part'])
+    @swagger_auto_schema(operation_description="Update a Documentation Page", manual_parameters=[if_match_parameter], responses={status.HTTP_201_CREATED: PartResponseSerializer()}, tags=['docs-page-part'])
     def update(self, request, *args, **kwargs):
         """
         Retrieve a Documentation Page
@@ -113,6 +132,14 @@ class PartViewSet(
         :param kwargs:
         :return:
         """
+        try:
+            expected_revision = if_match_revision(request)
+        except ValueError:
+            return Response(
+                {'message': 'If-Match should be the revision of the object', 'code': '400'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             switch_group = False  # To check if we should switch the group where this part is associated
 
@@ -126,7 +153,8 @@ class PartViewSet(
             serializer = serializer_class(
                 instance=instance,
                 data=request.data,
-                partial=True
+                partial=True,
+                context={'expected_revision': expected_revision}
             )
             if not serializer.is_valid():
                 return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
@@ -134,7 +162,7 @@ class PartViewSet(
             if 'name' in request.data or 'page' in request.data:
 
                 if 'page' in request.data:
-                    page = Page.objects.get(id=request.data['page'])
+                    page = serializer.validated_data['page']
                     old_page = instance.page
 
                     if old_page.version != page.version:
@@ -146,31 +174,34 @@ class PartViewSet(
                                   f"-{page.name.lower().replace(' ', '_')}" \
                                   f"-{request.data.get('name', instance.name).lower().replace(' ', '_')}"
 
-                serializer.save()
-
-                logger.info('PAGE_PART_UPDATE-UPDATE_PERMISSION', data=request.data, permission_code=permission_code)
-                instance.permission.codename = permission_code
-                instance.permission.name = f"{page.version.name} - {instance.page.name} - {serializer.data['name']}"
-                instance.permission.save()
+                with transaction.atomic():
+                    serializer.save()
 
-                logger.info(
-                    'PAGE_PART_UPDATE-UPDATE_GROUP',
-                    data=request.data, old_page_name=old_page_name, permission_code=permission_code, switch_group=switch_group
-                )
+                    logger.info('PAGE_PART_UPDATE-UPDATE_PERMISSION', data=request.data, permission_code=permission_code)
+                    instance.permission.codename = permission_code
+                    instance.permission.name = f"{page.version.name} - {instance.page.name} - {instance.name}"
+                    instance.permission.save(update_fields=['codename', 'name'])
 
-                if switch_group:
-                    old_group = Group.objects.get(name=old_page.version.name)
-                    old_group.permissions.remove(instance.permission)
+                    logger.info(
+                        'PAGE_PART_UPDATE-UPDATE_GROUP',
+                        data=request.data, old_page_name=old_page_name, permission_code=permission_code, switch_group=switch_group
+                    )
 
-                    new_group = Group.objects.get(name=page.version.name)
-                    new_group.permissions.add(instance.permission)
+                    if switch_group:
+                        if old_page.version.group_id is not None:
+                            instance.permission.group_set.remove(old_page.version.group_id)
+                        if page.version.group_id is not None:
+                            instance.permission.group_set.add(page.version.group_id)
 
             else:
                 serializer.save()
 
             serializer = PartResponseSerializer(instance=instance)
 
-            return Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            response = Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            return with_revision_etag(response, instance)
+        except RevisionConflict as e:
+            return revision_conflict_response(e, expected_revision)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -186,12 +217,131 @@ class PartViewSet(
             instance = self.get_object()
             logger.info('PAGE_PART_DELETE-DATA', id=kwargs.get('pk'), name=instance.name)
 
-            logger.info('PAGE_PART_DELETE-DELETE_PERMISSION', id=kwargs.get('pk'))
-            instance.permission.delete()
+            with transaction.atomic():
+                logger.info('PAGE_PART_DELETE-DELETE_PERMISSION', id=kwargs.get('pk'))
+                instance.permission.delete()
 
-            logger.info('PAGE_PART_DELETE', id=kwargs.get('pk'))
-            instance.delete()
+                logger.info('PAGE_PART_DELETE', id=kwargs.get('pk'))
+                instance.delete()
 
             return Response({'message': 'Part Page deleted successfully', 'code': '202'}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="List Users who can read the Part, through a direct Permission or their Version Group",
+        responses={status.HTTP_200_OK: ReaderSerializer(many=True)},
+        tags=['docs-part'])
+    @action(methods=['GET'], detail=True)
+    def readers(self, request, pk):
+        """
+        Audit who can read a Documentation Part. Staff and superusers read everything and are not listed.
+        :param request:
+        :param pk:
+        :return:
+        """
+        try:
+            instance = self.get_object()
+            logger.info('PART_READERS-DATA', part=instance.id, permission=instance.permission_id)
+
+            queryset = readers(instance.permission_id) if instance.permission_id else User.objects.none()
+            page = self.paginator.paginate_queryset(queryset=queryset, request=request)
+
+            serializer = ReaderSerializer(page, many=True)
+            return self.paginator.get_paginated_response({'data': serializer.data, 'code': '200'})
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Delete many Parts and their Permissions at once",
+        request_body=BulkPartDeleteRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses={
+            status.HTTP_202_ACCEPTED: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'data': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'parts': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of parts deleted"),
+                        }
+                    ),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            )
+        },
+        tags=['docs-page-part'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_delete(self, request):
+        """
+        Delete many Documentation Parts in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('PAGE_PART_BULK_DELETE-START', data=request.data)
+
+            serializer = BulkPartDeleteRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('PAGE_PART_BULK_DELETE-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Move many Parts to another Page at once",
+        request_body=BulkPartMoveRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses={
+            status.HTTP_202_ACCEPTED: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'data': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'parts': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of parts moved"),
+                        }
+                    ),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                    'code': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            )
+        },
+        tags=['docs-page-part'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_move(self, request):
+        """
+        Move many Documentation Parts to a Page in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('PAGE_PART_BULK_MOVE-START', data=request.data)
+
+            serializer = BulkPartMoveRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('PAGE_PART_BULK_MOVE-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,6 +1,7 @@
 import structlog
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
@@ -9,10 +10,16 @@ from rest_framework import status, viewsets, mixins
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from apis.serializers.version import VersionRequestSerializer, VersionResponseSerializer
-from apis.serializers.page import PageResponseSerializer
-from docs.models import Version, Page
-from utils.decorators import IsStaffOrAdminUser
+from apis.serializers.version import VersionRequestSerializer, VersionResponseSerializer, VersionValuesSerializer
+from apis.serializers.page import PageResponseSerializer, PageValuesSerializer
+from docs.models import Version, Page, RevisionConflict
+from users.access import readable_permission_ids, active_groups, active_user_permissions
+from utils.decorators import (
+    IsStaffOrAdminUser, idempotent, idempotency_key_parameter, if_match_parameter, if_match_revision,
+    revision_conflict_response, with_revision_etag,
+)
+from utils.sparse_fields import get_sparse_fields, sparse_fields_parameters
+from utils.streaming import is_streaming_requested, streaming_list_response, stream_parameter
 
 logger = structlog.getLogger('wz-doc')
 
@@ -33,26 +40,29 @@ class VersionViewSet(
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            # Schema generation (manage.py build_openapi) has no connected user
+            return Version.objects.none()
+
         if (self.request.user.is_superuser, self.request.user.is_staff) == (False, False):
             # if it is not a superadmin or not a staff we check
             #permissions_code = Permission.objects.filter(group__user=self.request.user).values_list('codename', flat=True)
-            user_permissions = (
-                    Permission.objects.filter(group__user=self.request.user) |
-                    self.request.user.user_permissions.all()
-            ).values_list('id', flat=True)
+            user_permissions = readable_permission_ids(self.request.user)
 
             logger.info('VERSION-QUERYSET', permissions_ids=user_permissions)
 
             return Version.objects.filter(permission_id__in=user_permissions).order_by('name')
 
-        return Version.objects.all().order_by('name')
+        return Version.objects.select_related('permission', 'group').order_by('name')
 
     @swagger_auto_schema(
         operation_description="Create a Documentation Version",
         request_body=VersionRequestSerializer,
+        manual_parameters=[idempotency_key_parameter],
         responses={status.HTTP_201_CREATED: VersionResponseSerializer()},
         tags=['docs-version']
     )
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             logger.info('DOCS_VERSION_CREATE-DATA', data=request.data)
@@ -60,21 +70,27 @@ class VersionViewSet(
             if not serializer.is_valid():
                 return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
 
-            version = serializer.save()
-
-            logger.info('DOCS_VERSION_CREATE-CREATE_PERMISSION', data=request.data)
             content_type = ContentType.objects.get_for_model(Version)
-            permission = Permission.objects.create(
-                codename=request.data['name'].lower(),
-                name=request.data['name'].title(),
-                content_type=content_type
-            )
-            version.permission = permission
-            version.save()
+            try:
+                with transaction.atomic():
+                    # The Permission and the Group are created first, so that the Version row is inserted only once
+                    logger.info('DOCS_VERSION_CREATE-CREATE_PERMISSION', data=request.data)
+                    permission = Permission.objects.create(
+                        codename=request.data['name'].lower(),
+                        name=request.data['name'].title(),
+                        content_type=content_type
+                    )
+
+                    logger.info('DOCS_VERSION_CREATE-CREATE_GROUP', data=request.data)
+                    group = Group.objects.create(name=serializer.validated_data['name'].title())
+                    group.permissions.add(permission)
 
-            logger.info('DOCS_VERSION_CREATE-CREATE_GROUP', data=request.data)
-            group = Group.objects.create(name=serializer.data['name'])
-            group.permissions.add(permission)
+                    version = serializer.save(permission=permission, group=group)
+            except IntegrityError:
+                # The Group of a duplicate Version clashes before the Version itself: report the Version name
+                if Version.objects.filter(name__iexact=serializer.validated_data['name']).exists():
+                    raise IntegrityError(f'UNIQUE constraint failed: {Version._meta.db_table}.name')
+                raise
 
             serializer = VersionResponseSerializer(instance=version)
             return Response({'data': serializer.data, 'code': '201'}, status=status.HTTP_201_CREATED)
@@ -83,6 +99,7 @@ class VersionViewSet(
 
     @swagger_auto_schema(
         operation_description="List all Documentations Versions",
+        manual_parameters=sparse_fields_parameters,
         responses={status.HTTP_200_OK: VersionResponseSerializer()},
         tags=['docs-version']
     )
@@ -96,8 +113,15 @@ class VersionViewSet(
         :return:
         """
         try:
-            page = self.paginator.paginate_queryset(queryset=self.get_queryset(), request=request)
-            serializer = VersionResponseSerializer(page, many=True)
+            try:
+                sparse_fields = get_sparse_fields(request, VersionResponseSerializer)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Rows are read with values(), only the columns of the fields returned
+            queryset = VersionValuesSerializer(**sparse_fields).values(self.get_queryset())
+            page = self.paginator.paginate_queryset(queryset=queryset, request=request)
+            serializer = VersionValuesSerializer(page, many=True, **sparse_fields)
             return self.paginator.get_paginated_response({'data':serializer.data, 'code': '200'})
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -118,12 +142,14 @@ class VersionViewSet(
         try:
             instance = self.get_object()
             serializer = self.serializer_class(instance=instance)
-            return Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            response = Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
+            return with_revision_etag(response, instance)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @swagger_auto_schema(
         operation_description="Update Version information",
+        manual_parameters=[if_match_parameter],
         responses={status.HTTP_201_CREATED: VersionResponseSerializer()},
         tags=['docs-version']
     )
@@ -135,31 +161,44 @@ class VersionViewSet(
         :param kwargs:
         :return:
         """
+        try:
+            expected_revision = if_match_revision(request)
+        except ValueError:
+            return Response(
+                {'message': 'If-Match should be the revision of the object', 'code': '400'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             instance = self.get_object()
-            instance_group = Group.objects.get(name=instance.name)
 
             logger.info('DOCS_VERSION_UPDATE-DATA', data=request.data)
             serializer = self.serializer_class(
                 instance=instance,
                 data=request.data,
-                partial=True
+                partial=True,
+                context={'expected_revision': expected_revision}
             )
             if not serializer.is_valid():
                 return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
 
-            serializer.save()
-            if 'name' in request.data:
-                logger.info('DOCS_VERSION_UPDATE-UPDATE_GROUP_NAME', data=request.data)
-                instance.permission.name = serializer.data['name'].title()
-                instance.permission.codename = serializer.data['name'].lower()
-                instance.permission.save()
+            with transaction.atomic():
+                serializer.save()
+                if 'name' in request.data:
+                    logger.info('DOCS_VERSION_UPDATE-UPDATE_GROUP_NAME', data=request.data)
+                    instance.permission.name = instance.name
+                    instance.permission.codename = instance.name.lower()
+                    instance.permission.save(update_fields=['name', 'codename'])
 
-                instance_group.name = serializer.data['name']
-                instance_group.save()
+                    if instance.group is not None:
+                        instance.group.name = instance.name
+                        instance.group.save(update_fields=['name'])
 
             serializer = VersionResponseSerializer(instance=instance)
-            return Response({'data': serializer.data, 'code': '201'}, status=status.HTTP_201_CREATED)
+            response = Response({'data': serializer.data, 'code': '201'}, status=status.HTTP_201_CREATED)
+            return with_revision_etag(response, instance)
+        except RevisionConflict as e:
+            return revision_conflict_response(e, expected_revision)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -175,11 +214,13 @@ class VersionViewSet(
             instance = self.get_object()
             logger.info('DOCS_VERSION_DELETE', id=kwargs.get('pk'))
 
-            instance_group = Group.objects.get(name=instance.name)
+            instance_group = instance.group
 
-            instance.delete()
-            logger.info('DOCS_VERSION_DELETE-DELETE_GROUP', id=kwargs.get('pk'))
-            instance_group.delete()
+            with transaction.atomic():
+                instance.delete()
+                if instance_group is not None:
+                    logger.info('DOCS_VERSION_DELETE-DELETE_GROUP', id=kwargs.get('pk'))
+                    instance_group.delete()
 
             return Response({'message': 'Documentation Version deleted successfully', 'code': '202'}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
@@ -187,6 +228,7 @@ class VersionViewSet(
 
     @swagger_auto_schema(
         operation_description="List All pages related to a Documentation Version",
+        manual_parameters=[stream_parameter, *sparse_fields_parameters],
         responses={status.HTTP_200_OK: PageResponseSerializer()},
         tags=['docs-version'])
     @action(methods=['GET'], detail=True)
@@ -200,15 +242,20 @@ class VersionViewSet(
         :return:
         """
         try:
+            try:
+                sparse_fields = get_sparse_fields(request, PageResponseSerializer)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
             version = self.get_object()
             logger.info('LIST_PAGES-DATA', version=version.name)
             version_pages = Page.objects.filter(version=version).order_by('name')
 
             if (self.request.user.is_superuser, self.request.user.is_staff) == (False, False) \
-                    and self.request.user.groups.filter(name=version.name).exists() is False:
+                    and active_groups(self.request.user).filter(id=version.group_id).exists() is False:
                 logger.info('LIST_PAGES-NOT_STAFF')
 
-                user_permissions = self.request.user.user_permissions.all().values_list('id', flat=True)
+                user_permissions = active_user_permissions(self.request.user).values_list('id', flat=True)
                 version_pages = version_pages.filter(version=version, permission__id__in=user_permissions)
 
                 if version_pages.count() == 0:
@@ -217,9 +264,16 @@ class VersionViewSet(
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
+            if is_streaming_requested(request):
+                return streaming_list_response(
+                    PageValuesSerializer(**sparse_fields).values(version_pages), PageValuesSerializer,
+                    serializer_kwargs=sparse_fields
+                )
+
+            version_pages = PageValuesSerializer(**sparse_fields).values(version_pages)
             page = self.paginator.paginate_queryset(queryset=version_pages, request=request)
 
-            serializer = PageResponseSerializer(page, many=True)
+            serializer = PageValuesSerializer(page, many=True, **sparse_fields)
             return self.paginator.get_paginated_response({'data': serializer.data, 'code': '200'})
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
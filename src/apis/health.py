@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from config.connections import databases_ready
+from config.warmup import warm_up
+
+
+@require_safe
+def readiness(request):
+    """
+    Readiness probe for the load balancer or the orchestrator: 200 when the worker can serve requests, else 503.
+    It opens the database connections the next requests reuse, so a ready worker starts with warm connections.
+    A worker is not ready before its warm-up (config.warmup) is done: it is tried again if it failed at startup.
+    """
+    if not databases_ready():
+        return JsonResponse({'status': 'unavailable', 'code': '503'}, status=503)
+
+    if settings.WARM_UP and not warm_up():
+        return JsonResponse({'status': 'warming up', 'code': '503'}, status=503)
+
+    return JsonResponse({'status': 'ready', 'code': '200'})
@@ -0,0 +1,37 @@
+from django.db import transaction
+
+
+class UpdateFieldsMixin:
+    """
+    ModelSerializer mixin saving only the validated fields (and updated_at) on update, instead of the whole row.
+
+    The update is conditional on the revision given in the context as `expected_revision` (the If-Match header),
+    or else on the revision of the instance that was read: see docs.models.RevisionedModel.
+    The row and its change log entry (docs.signals) are written in the same transaction.
+    """
+
+    def update(self, instance, validated_data):
+        expected_revision = self.context.get('expected_revision')
+        if expected_revision is None:
+            expected_revision = instance.revision
+
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        with transaction.atomic(savepoint=False):
+            instance.save(update_fields=[*validated_data, 'updated_at'], expected_revision=expected_revision)
+        return instance
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin keeping only some of its fields: `fields` lists the fields kept, `omit` the fields removed.
+    Both are given by the ?fields= and ?omit= query parameters of the read endpoints, see utils.sparse_fields.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or (omit is not None and name in omit):
+                self.fields.pop(name)
@@ -1,13 +1,16 @@
 import re
 
-from docs.models import Page
+from docs.bulk import BULK_DOCS_MAX_ITEMS, delete_pages, move_pages
+from docs.models import Page, Version
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 from .part import PartResponseSerializer
+from .mixins import UpdateFieldsMixin, SparseFieldsMixin
 from .users import PermissionSerializer
+from .values import ValuesSerializer
 
 
-class PageRequestSerializer(serializers.ModelSerializer):
+class PageRequestSerializer(UpdateFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Page
         fields = '__all__'
@@ -22,7 +25,7 @@ class PageRequestSerializer(serializers.ModelSerializer):
         return name
 
 
-class PageResponseSerializer(serializers.ModelSerializer):
+class PageResponseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     permission = PermissionSerializer(many=False, read_only=True)
 
     class Meta:
@@ -39,7 +42,14 @@ class PageResponseSerializer(serializers.ModelSerializer):
         return name
 
 
-class PageWithPartSerializer(serializers.ModelSerializer):
+class PageValuesSerializer(ValuesSerializer):
+    """
+    PageResponseSerializer for lists read with values()
+    """
+    serializer_class = PageResponseSerializer
+
+
+class PageWithPartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     parts = PartResponseSerializer(many=True, read_only=True)
     permission = PermissionSerializer(many=False, read_only=True)
 
@@ -58,3 +68,44 @@ class PageWithPartSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(msg)
 
         return name
+
+
+# ============================================
+# ==== Bulk delete or move (many pages at once)
+class BulkPageRequest(serializers.Serializer):
+    pages = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_DOCS_MAX_ITEMS
+    )
+
+    def validate_pages(self, pages: list):
+        pages = list(dict.fromkeys(pages))
+        if Page.objects.filter(id__in=pages).count() != len(pages):
+            msg = _("Some IDs are not pages IDs. Please check again")
+            raise serializers.ValidationError(msg)
+
+        return pages
+
+
+class BulkPageDeleteRequest(BulkPageRequest):
+
+    def create(self, validated_data):
+        return delete_pages(validated_data['pages'])
+
+
+class BulkPageMoveRequest(BulkPageRequest):
+    version = serializers.PrimaryKeyRelatedField(queryset=Version.objects.all())
+
+    def validate(self, attrs):
+        names = list(Page.objects.filter(id__in=attrs['pages']).values_list('name', flat=True))
+        if len(set(names)) != len(names) or Page.objects.filter(
+            version=attrs['version'], name__in=names
+        ).exclude(id__in=attrs['pages']).exists():
+            msg = _("Page names should be unique in the Version")
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+    def create(self, validated_data):
+        return move_pages(validated_data['pages'], validated_data['version'])
@@ -1,12 +1,15 @@
 import re
 
-from docs.models import Part
+from docs.bulk import BULK_DOCS_MAX_ITEMS, delete_parts, move_parts
+from docs.models import Page, Part
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
+from .mixins import UpdateFieldsMixin, SparseFieldsMixin
 from .users import PermissionSerializer
+from .values import ValuesSerializer
 
 
-class PartRequestSerializer(serializers.ModelSerializer):
+class PartRequestSerializer(UpdateFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Part
         fields = '__all__'
@@ -21,7 +24,7 @@ class PartRequestSerializer(serializers.ModelSerializer):
         return name
 
 
-class PartResponseSerializer(serializers.ModelSerializer):
+class PartResponseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     permission = PermissionSerializer(many=False, read_only=True)
 
     class Meta:
@@ -35,4 +38,52 @@ class PartResponseSerializer(serializers.ModelSerializer):
                 msg = _("Name can not contains special characters")
                 raise serializers.ValidationError(msg)
 
-        return name
\ No newline at end of file
+        return name
+
+
+class PartValuesSerializer(ValuesSerializer):
+    """
+    PartResponseSerializer for lists read with values()
+    """
+    serializer_class = PartResponseSerializer
+
+
+# ============================================
+# ==== Bulk delete or move (many parts at once)
+class BulkPartRequest(serializers.Serializer):
+    parts = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_DOCS_MAX_ITEMS
+    )
+
+    def validate_parts(self, parts: list):
+        parts = list(dict.fromkeys(parts))
+        if Part.objects.filter(id__in=parts).count() != len(parts):
+            msg = _("Some IDs are not parts IDs. Please check again")
+            raise serializers.ValidationError(msg)
+
+        return parts
+
+
+class BulkPartDeleteRequest(BulkPartRequest):
+
+    def create(self, validated_data):
+        return delete_parts(validated_data['parts'])
+
+
+class BulkPartMoveRequest(BulkPartRequest):
+    page = serializers.PrimaryKeyRelatedField(queryset=Page.objects.select_related('version'))
+
+    def validate(self, attrs):
+        names = list(Part.objects.filter(id__in=attrs['parts']).values_list('name', flat=True))
+        if len(set(names)) != len(names) or Part.objects.filter(
+            page=attrs['page'], name__in=names
+        ).exclude(id__in=attrs['parts']).exists():
+            msg = _("Part names should be unique in the Page")
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+    def create(self, validated_data):
+        return move_parts(validated_data['parts'], validated_data['page'])
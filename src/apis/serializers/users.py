@@ -1,10 +1,17 @@
 from uuid import UUID
 
+from django.db import transaction
+from django.utils import timezone
+
+from users.access import log_access_changes, set_grants_expiry
 from users.models import User
+from utils.choices import ChangeActions
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 from rest_framework import exceptions
 from django.contrib.auth.models import Permission, Group
+from .mixins import SparseFieldsMixin
+from .values import ValuesSerializer
 
 
 class PermissionSerializer(serializers.ModelSerializer):
@@ -21,7 +28,7 @@ class GroupSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
 
 
-class UserFullSerializer(serializers.ModelSerializer):
+class UserFullSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_permissions = PermissionSerializer(many=True, read_only=True)
     groups = GroupSerializer(many=True, read_only=True)
 
@@ -49,13 +56,33 @@ class UserCreateSerializer(serializers.ModelSerializer):
             'id', 'first_name', 'last_name', 'email', 'is_staff', 'password', 'is_active', 'username', 'enterprise', 'created_at', 'updated_at')
 
 
-class UserInfoSerializer(serializers.ModelSerializer):
+class UserInfoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
             'id', 'first_name', 'last_name', 'email', 'is_staff', 'is_active', 'username', 'enterprise', 'created_at', 'updated_at')
 
 
+class UserInfoValuesSerializer(ValuesSerializer):
+    """
+    UserInfoSerializer for lists read with values()
+    """
+    serializer_class = UserInfoSerializer
+
+
+class ReaderSerializer(UserInfoSerializer):
+    """
+    A User able to read a documentation object, with the grant giving the access (see users.access.readers)
+    """
+    access = serializers.SerializerMethodField()
+
+    class Meta(UserInfoSerializer.Meta):
+        fields = UserInfoSerializer.Meta.fields + ('access',)
+
+    def get_access(self, user) -> dict:
+        return {'direct': user.direct_grant, 'group': user.group_grant}
+
+
 class UpdatePasswordStaffSerializer(serializers.Serializer):
     old_password = serializers.CharField(style={"input_type": "password"}, required=False, help_text='Not required if it is a staff or superadmin ')
     new_password = serializers.CharField(style={"input_type": "password"}, required=True)
@@ -87,11 +114,33 @@ class UpdatePasswordSerializer(serializers.Serializer):
         return instance
 
 
-class PermissionGrantRequest(serializers.Serializer):
-    permissions = serializers.ListField(
-        child=serializers.IntegerField(),
-        allow_empty=False
+# Most users, permissions or groups one access request takes
+ACCESS_REQUEST_MAX_ITEMS = 1000
+
+
+def access_list_field(child) -> serializers.ListField:
+    """
+    Non-empty list of the users, permissions or groups of an access request, of at most ACCESS_REQUEST_MAX_ITEMS
+    """
+    return serializers.ListField(child=child, allow_empty=False, max_length=ACCESS_REQUEST_MAX_ITEMS)
+
+
+class ExpiringGrantMixin(serializers.Serializer):
+    expires_at = serializers.DateTimeField(
+        required=False, allow_null=True,
+        help_text='The grant is revoked at this date. Permanent if not given'
     )
+
+    def validate_expires_at(self, expires_at):
+        if expires_at is not None and expires_at <= timezone.now():
+            msg = _("Expiration date should be in the future")
+            raise serializers.ValidationError(msg)
+
+        return expires_at
+
+
+class PermissionGrantRequest(ExpiringGrantMixin):
+    permissions = access_list_field(serializers.IntegerField())
     user = serializers.UUIDField()
 
     def validate_permissions(self, permissions: list):
@@ -112,17 +161,19 @@ class PermissionGrantRequest(serializers.Serializer):
         user = User.objects.get(id=validated_data['user'])
         permissions = Permission.objects.filter(id__in=validated_data['permissions'])
 
-        for perm in permissions:
-            user.user_permissions.add(perm)
+        with transaction.atomic():
+            for perm in permissions:
+                user.user_permissions.add(perm)
+            set_grants_expiry(
+                [user.id], validated_data.get('expires_at'), permissions=validated_data['permissions']
+            )
+            log_access_changes([user.id], ChangeActions.GRANTED, permissions=validated_data['permissions'])
 
         return user
 
 
 class PermissionDenyRequest(serializers.Serializer):
-    permissions = serializers.ListField(
-        child=serializers.IntegerField(),
-        allow_empty=False
-    )
+    permissions = access_list_field(serializers.IntegerField())
     user = serializers.UUIDField()
 
     def validate_permissions(self, permissions: list):
@@ -144,17 +195,17 @@ class PermissionDenyRequest(serializers.Serializer):
         permissions = Permission.objects.filter(id__in=validated_data['permissions'])
 
         # PS: it seems we can not remove permission with list on one time. We have to do it one by one
-        for perm in permissions:
-            user.user_permissions.remove(perm)
+        with transaction.atomic():
+            for perm in permissions:
+                user.user_permissions.remove(perm)
+            set_grants_expiry([user.id], permissions=validated_data['permissions'])
+            log_access_changes([user.id], ChangeActions.REVOKED, permissions=validated_data['permissions'])
 
         return user
 
 
-class GroupGrantRequest(serializers.Serializer):
-    groups = serializers.ListField(
-        child=serializers.IntegerField(),
-        allow_empty=False
-    )
+class GroupGrantRequest(ExpiringGrantMixin):
+    groups = access_list_field(serializers.IntegerField())
     user = serializers.UUIDField()
 
     def validate_groups(self, groups: list):
@@ -175,17 +226,17 @@ class GroupGrantRequest(serializers.Serializer):
         user = User.objects.get(id=validated_data['user'])
         groups = Group.objects.filter(id__in=validated_data['groups'])
 
-        for group in groups:
-            group.user_set.add(user)
+        with transaction.atomic():
+            for group in groups:
+                group.user_set.add(user)
+            set_grants_expiry([user.id], validated_data.get('expires_at'), groups=validated_data['groups'])
+            log_access_changes([user.id], ChangeActions.GRANTED, groups=validated_data['groups'])
 
         return user
 
 
 class GroupDenyRequest(serializers.Serializer):
-    groups = serializers.ListField(
-        child=serializers.IntegerField(),
-        allow_empty=False
-    )
+    groups = access_list_field(serializers.IntegerField())
     user = serializers.UUIDField()
 
     def validate_groups(self, groups: list):
@@ -206,7 +257,128 @@ class GroupDenyRequest(serializers.Serializer):
         user = User.objects.get(id=validated_data['user'])
         groups = Group.objects.filter(id__in=validated_data['groups'])
 
-        for group in groups:
-            group.user_set.remove(user)
+        with transaction.atomic():
+            for group in groups:
+                group.user_set.remove(user)
+            set_grants_expiry([user.id], groups=validated_data['groups'])
+            log_access_changes([user.id], ChangeActions.REVOKED, groups=validated_data['groups'])
 
         return user
+
+
+# ============================================
+# ==== Bulk grant or deny (many users x many permissions or groups)
+
+
+def grant_in_bulk(through, target_field: str, users: list, targets: list) -> int:
+    """
+    Insert the missing (user, target) rows of a User m2m through table with one bulk INSERT.
+    Return the number of rows created.
+    """
+    existing = set(
+        through.objects.filter(user_id__in=users, **{f'{target_field}__in': targets})
+        .values_list('user_id', target_field)
+    )
+    missing = [
+        through(user_id=user, **{target_field: target})
+        for user in users for target in targets
+        if (user, target) not in existing
+    ]
+    through.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+
+    return len(missing)
+
+
+def deny_in_bulk(through, target_field: str, users: list, targets: list) -> int:
+    """
+    Delete the (user, target) rows of a User m2m through table with one DELETE. Return the number of rows deleted.
+    """
+    deleted, _ = through.objects.filter(user_id__in=users, **{f'{target_field}__in': targets}).delete()
+
+    return deleted
+
+
+class BulkAccessRequest(serializers.Serializer):
+    users = access_list_field(serializers.UUIDField())
+
+    def validate_users(self, users: list):
+        users = list(dict.fromkeys(users))
+        if User.objects.filter(id__in=users).count() != len(users):
+            msg = _("Some IDs are not users IDs. Please check again")
+            raise serializers.ValidationError(msg)
+
+        return users
+
+
+class BulkPermissionRequest(BulkAccessRequest):
+    permissions = access_list_field(serializers.IntegerField())
+
+    def validate_permissions(self, permissions: list):
+        permissions = list(dict.fromkeys(permissions))
+        if Permission.objects.filter(id__in=permissions).count() != len(permissions):
+            msg = _("Some ID are not permissions IDs. Please check again")
+            raise serializers.ValidationError(msg)
+
+        return permissions
+
+
+class BulkGroupRequest(BulkAccessRequest):
+    groups = access_list_field(serializers.IntegerField())
+
+    def validate_groups(self, groups: list):
+        groups = list(dict.fromkeys(groups))
+        if Group.objects.filter(id__in=groups).count() != len(groups):
+            msg = _("Some IDs are not groups IDs. Please check again")
+            raise serializers.ValidationError(msg)
+
+        return groups
+
+
+class BulkPermissionGrantRequest(ExpiringGrantMixin, BulkPermissionRequest):
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            granted = grant_in_bulk(
+                User.user_permissions.through, 'permission_id', validated_data['users'], validated_data['permissions']
+            )
+            set_grants_expiry(
+                validated_data['users'], validated_data.get('expires_at'), permissions=validated_data['permissions']
+            )
+            log_access_changes(validated_data['users'], ChangeActions.GRANTED, permissions=validated_data['permissions'])
+
+        return {'users': len(validated_data['users']), 'permissions': len(validated_data['permissions']), 'granted': granted}
+
+
+class BulkPermissionDenyRequest(BulkPermissionRequest):
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            denied = deny_in_bulk(
+                User.user_permissions.through, 'permission_id', validated_data['users'], validated_data['permissions']
+            )
+            set_grants_expiry(validated_data['users'], permissions=validated_data['permissions'])
+            log_access_changes(validated_data['users'], ChangeActions.REVOKED, permissions=validated_data['permissions'])
+
+        return {'users': len(validated_data['users']), 'permissions': len(validated_data['permissions']), 'denied': denied}
+
+
+class BulkGroupGrantRequest(ExpiringGrantMixin, BulkGroupRequest):
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            granted = grant_in_bulk(User.groups.through, 'group_id', validated_data['users'], validated_data['groups'])
+            set_grants_expiry(validated_data['users'], validated_data.get('expires_at'), groups=validated_data['groups'])
+            log_access_changes(validated_data['users'], ChangeActions.GRANTED, groups=validated_data['groups'])
+
+        return {'users': len(validated_data['users']), 'groups': len(validated_data['groups']), 'granted': granted}
+
+
+class BulkGroupDenyRequest(BulkGroupRequest):
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            denied = deny_in_bulk(User.groups.through, 'group_id', validated_data['users'], validated_data['groups'])
+            set_grants_expiry(validated_data['users'], groups=validated_data['groups'])
+            log_access_changes(validated_data['users'], ChangeActions.REVOKED, groups=validated_data['groups'])
+
+        return {'users': len(validated_data['users']), 'groups': len(validated_data['groups']), 'denied': denied}
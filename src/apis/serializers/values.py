@@ -0,0 +1,102 @@
+import functools
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+# Values read from the database are already what these fields return: they are not converted again
+PASS_THROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ReadOnlyField,
+)
+
+
+def build_layout(serializer, prefix: str = '') -> tuple:
+    """
+    Columns to read with values() and, for each output field in order, (name, column, to_representation, nested)
+    where nested is the layout of a nested serializer (e.g. the permission of a Page), or None.
+    """
+    columns, layout = [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        column = prefix + field.source
+        if isinstance(field, serializers.ListSerializer) or isinstance(field, serializers.ManyRelatedField):
+            raise ImproperlyConfigured(f'{name}: many-to-many and reverse relations can not be read with values()')
+        if field.source == '*' or '.' in field.source:
+            raise ImproperlyConfigured(f'{name}: only model fields can be read with values()')
+
+        if isinstance(field, serializers.BaseSerializer):
+            nested_columns, nested_layout = build_layout(field, prefix=f'{column}__')
+            columns += [column, *nested_columns]  # The foreign key tells a missing object
+            layout.append((name, column, None, nested_layout))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            columns.append(column)  # values() returns the primary key of the related object
+            to_representation = field.pk_field.to_representation if field.pk_field is not None else None
+            layout.append((name, column, to_representation, None))
+        else:
+            columns.append(column)
+            to_representation = None if isinstance(field, PASS_THROUGH_FIELDS) else field.to_representation
+            layout.append((name, column, to_representation, None))
+
+    return columns, layout
+
+
+def layout_key(names: list = None) -> tuple:
+    """
+    The ?fields= and ?omit= names as a cache key of the layout: their order and repetitions do not change it
+    """
+    return tuple(sorted(set(names))) if names is not None else None
+
+
+def to_representation(layout: list, row: dict) -> dict:
+    data = {}
+    for name, column, field_representation, nested in layout:
+        value = row[column]
+        if value is None:
+            data[name] = None
+        elif nested is not None:
+            data[name] = to_representation(nested, row)
+        elif field_representation is not None:
+            data[name] = field_representation(value)
+        else:
+            data[name] = value
+
+    return data
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer of the rows of `queryset.values()`, returning the same data as `serializer_class` for the
+    same objects. No model instance is built and the DRF fields run only where the database value has to be
+    converted (dates, UUIDs, ...), which makes large lists several times faster.
+
+    Used like the DRF serializer it mirrors, with the sparse fieldsets of SparseFieldsMixin:
+
+        serializer = PartValuesSerializer(fields=['id', 'name'])
+        rows = serializer.values(Part.objects.filter(page=page))
+        PartValuesSerializer(rows, many=True, fields=['id', 'name']).data
+    """
+    serializer_class = None
+
+    def __init__(self, instance=None, many: bool = False, fields: list = None, omit: list = None):
+        self.instance = instance
+        self.many = many
+        self.columns, self.layout = self.get_layout(layout_key(fields), layout_key(omit))
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def get_layout(cls, fields: tuple = None, omit: tuple = None) -> tuple:
+        return build_layout(cls.serializer_class(fields=fields, omit=omit))
+
+    def values(self, queryset):
+        """
+        Read only the columns of the fields of the serializer, joining the nested objects
+        """
+        return queryset.values(*self.columns)
+
+    @property
+    def data(self):
+        if self.many:
+            return [to_representation(self.layout, row) for row in self.instance]
+
+        return to_representation(self.layout, self.instance)
@@ -3,14 +3,16 @@ import re
 from docs.models import Version
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
+from .mixins import UpdateFieldsMixin, SparseFieldsMixin
 from .users import PermissionSerializer
+from .values import ValuesSerializer
 
 
-class VersionRequestSerializer(serializers.ModelSerializer):
+class VersionRequestSerializer(UpdateFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Version
         fields = '__all__'
-        read_only_fields = ('permission',)
+        read_only_fields = ('permission', 'group')
 
     def validate_name(self, name: str) -> str:
         if name is not None:
@@ -21,13 +23,13 @@ class VersionRequestSerializer(serializers.ModelSerializer):
         return name
 
 
-class VersionResponseSerializer(serializers.ModelSerializer):
+class VersionResponseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     permission = PermissionSerializer(many=False, read_only=True)
 
     class Meta:
         model = Version
         fields = '__all__'
-        read_only_fields = ('permission',)
+        read_only_fields = ('permission', 'group')
 
     def validate_name(self, name: str) -> str:
         if name is not None:
@@ -37,3 +39,9 @@ class VersionResponseSerializer(serializers.ModelSerializer):
 
         return name
 
+
+class VersionValuesSerializer(ValuesSerializer):
+    """
+    VersionResponseSerializer for lists read with values()
+    """
+    serializer_class = VersionResponseSerializer
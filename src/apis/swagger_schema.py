@@ -1,18 +1,135 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import structlog
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 
 from rest_framework import permissions
+from rest_framework.settings import api_settings
 
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml, yaml_sane_dump
 from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import _SpecRenderer
 
+logger = structlog.getLogger('wz-doc')
 
+SCHEMA_INFO = openapi.Info(title="Wizall Documentation", default_version="0.1.0")
 
-# Schema configuration
-swagger_schema_view = get_schema_view(
-    openapi.Info(title="Wizall Documentation", default_version="0.1.0"),
-    validators=["flex", "ssv"],
+# Validation is expensive, so it only runs when the schema is built (manage.py build_openapi, CI),
+# never while serving a request.
+SCHEMA_VALIDATORS = ["flex", "ssv"]
+
+_encoded_schemas = {}
+_encoded_schemas_lock = threading.Lock()
+
+
+class EncodedSchema:
+    """
+    A rendered schema kept in memory with its gzip version and ETag, so it is encoded only once per worker
+    """
+    def __init__(self, content: bytes):
+        self.content = content
+        self.gzip_content = gzip.compress(content, compresslevel=9, mtime=0)
+        self.etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+    def as_response(self, request, content_type: str) -> HttpResponse:
+        if_none_match = [
+            etag[2:] if etag.startswith('W/') else etag
+            for etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        ]
+
+        if self.etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = HttpResponse(self.gzip_content, content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(self.content, content_type=content_type)
+
+        # Weak ETag: the same schema is served either raw or gzipped
+        response['ETag'] = f'W/{self.etag}'
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def generate_schema(version: str = '', validators: list = None) -> bytes:
+    """
+    Generate the OpenAPI schema as JSON, optionally validated.
+    Raise drf_yasg.errors.SwaggerValidationError if the validation fails
+    """
+    generator = OpenAPISchemaGenerator(SCHEMA_INFO, version, settings.SWAGGER_BASE_URL)
+    schema = generator.get_schema(request=None, public=True)
+
+    return OpenAPICodecJson(validators or []).encode(schema)
+
+
+def load_schema(version: str) -> bytes:
+    """
+    Return the JSON schema built by manage.py build_openapi if it matches the version, else generate it
+    """
+    schema_file = Path(settings.OPENAPI_SCHEMA_FILE)
+    if version == api_settings.DEFAULT_VERSION and schema_file.is_file():
+        logger.info('OPENAPI_SCHEMA-LOAD_FILE', file=str(schema_file))
+        return schema_file.read_bytes()
+
+    logger.info('OPENAPI_SCHEMA-GENERATE', version=version)
+    return generate_schema(version)
+
+
+def get_encoded_schema(version: str, codec_class) -> EncodedSchema:
+    key = (version, codec_class)
+    encoded = _encoded_schemas.get(key)
+    if encoded is not None:
+        return encoded
+
+    with _encoded_schemas_lock:
+        if key not in _encoded_schemas:
+            content = load_schema(version)
+            if codec_class is OpenAPICodecYaml:
+                content = yaml_sane_dump(json.loads(content, object_pairs_hook=OrderedDict), binary=True)
+
+            _encoded_schemas[key] = EncodedSchema(content)
+
+    return _encoded_schemas[key]
+
+
+def clear_schema_cache():
+    with _encoded_schemas_lock:
+        _encoded_schemas.clear()
+
+
+_SchemaView = get_schema_view(
+    SCHEMA_INFO,
     public=True,
     permission_classes=[permissions.IsAuthenticated],
-    url= settings.SWAGGER_BASE_URL,
+    url=settings.SWAGGER_BASE_URL,
 )
+
+
+class PrecomputedSchemaView(_SchemaView):
+    """
+    Serve the JSON/YAML schema from memory instead of generating and validating it on each request.
+    The Swagger UI page itself is left to drf_yasg, it fetches the schema through this same view.
+    """
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            return super().get(request, version, format)
+
+        schema = get_encoded_schema(request.version or version or '', renderer.codec_class)
+        return schema.as_response(request, renderer.media_type)
+
+
+# Schema configuration
+swagger_schema_view = PrecomputedSchemaView
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
@@ -9,6 +10,9 @@ from apis.users.space import UserViewSet
 from apis.docs.version import VersionViewSet
 from apis.docs.page import PageViewSet
 from apis.docs.part import PartViewSet
+from apis.docs.change import ChangeViewSet
+from apis.health import readiness
+from utils.async_views import async_read_view
 
 
 router = DefaultRouter()
@@ -18,13 +22,30 @@ router.register(r'users', UserViewSet, basename='user_space')
 router.register(r'docs/versions', VersionViewSet, basename='docs-versions')
 router.register(r'docs/pages', PageViewSet, basename='docs-pages')
 router.register(r'docs/parts', PartViewSet, basename='docs-parts')
+router.register(r'docs/changes', ChangeViewSet, basename='docs-changes')
 
 router.register(r'docs/access', UserDocsAccessViewSet, basename='docs-access')
 
 
+# Read endpoints of the documentation, served by async views under ASGI
+ASYNC_READ_ROUTES = (
+    'docs-versions-list', 'docs-versions-detail', 'docs-versions-pages',
+    'docs-pages-detail', 'docs-pages-parts',
+    'docs-parts-detail',
+)
+
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    for url in router_urls:
+        if url.name in ASYNC_READ_ROUTES:
+            url.callback = async_read_view(url.callback)
+
+
 urlpatterns = [
-    path("", include(router.urls)),
+    path("", include(router_urls)),
 
     path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', CustomTokenVerifyView.as_view(), name='token_verify'),
+
+    path('health/ready/', readiness, name='readiness'),
 ]
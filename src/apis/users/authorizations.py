@@ -1,19 +1,62 @@
+import hashlib
+
 import structlog
+from django.core.cache import cache
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status, viewsets, mixins
+from rest_framework.utils.urls import replace_query_param
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.contrib.auth.models import Group
 
+from docs.catalogue import permission_catalogue, get_structure_generation, CATALOGUE_CACHE_TIMEOUT
 from docs.models import Version, Page, Part
 from apis.serializers.users import UserFullSerializer, PermissionGrantRequest, PermissionDenyRequest, GroupGrantRequest, \
-    GroupDenyRequest, GroupSerializer
-from utils.decorators import IsStaffOrAdminUser
+    GroupDenyRequest, GroupSerializer, BulkPermissionGrantRequest, BulkPermissionDenyRequest, BulkGroupGrantRequest, \
+    BulkGroupDenyRequest
+from users.access import access_matrix, ACCESS_MATRIX_HEADER
+from utils.decorators import IsStaffOrAdminUser, idempotent, idempotency_key_parameter
+from utils.pagination import decode_cursor, encode_cursor, get_page_size
+from utils.streaming import streaming_csv_response, STREAMING_CHUNK_SIZE
 
 logger = structlog.getLogger('wz-doc')
 
 
+def bulk_access_responses(targets: str, result: str) -> dict:
+    """
+    Swagger responses of the bulk grant and deny endpoints, e.g. targets='groups' and result='denied'
+    """
+    error = openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'message': openapi.Schema(type=openapi.TYPE_STRING),
+            'code': openapi.Schema(type=openapi.TYPE_STRING),
+        }
+    )
+
+    return {
+        status.HTTP_202_ACCEPTED: openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'data': openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'users': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of users"),
+                        targets: openapi.Schema(type=openapi.TYPE_INTEGER, description=f"Number of {targets}"),
+                        result: openapi.Schema(
+                            type=openapi.TYPE_INTEGER, description=f"Number of (user, {targets[:-1]}) pairs {result}"
+                        ),
+                    }
+                ),
+                'code': openapi.Schema(type=openapi.TYPE_STRING),
+            }
+        ),
+        status.HTTP_500_INTERNAL_SERVER_ERROR: error,
+        status.HTTP_400_BAD_REQUEST: error,
+    }
+
+
 class UserDocsAccessViewSet(viewsets.GenericViewSet):
     """
     This View will help to manage User access to Version
@@ -52,10 +95,7 @@ class UserDocsAccessViewSet(viewsets.GenericViewSet):
         """
         try:
             logger.info('LIST_GROUPS-START')
-            names = Version.objects.all().values_list('name', flat=True)
-
-            logger.info('LIST_GROUPS-NAMES', names=names)
-            groups = Group.objects.filter(name__in=names).order_by('name')
+            groups = Group.objects.filter(version__isnull=False).order_by('name')
 
             page = self.paginator.paginate_queryset(
                 queryset=groups, request=request)
@@ -66,55 +106,64 @@ class UserDocsAccessViewSet(viewsets.GenericViewSet):
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @swagger_auto_schema(
-        operation_description="List all Permissions available",
+        operation_description="List all Permissions available, ordered by codename (cursor pagination)",
         request_body=None,
+        manual_parameters=[
+            openapi.Parameter('version', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Only permissions of this Version, its Pages and Parts"),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Only permissions of this Page and its Parts"),
+            openapi.Parameter('codename', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Codename prefix"),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Cursor returned in 'next'"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
         responses={
             status.HTTP_200_OK: openapi.Schema(
                 type=openapi.TYPE_OBJECT,
                 properties={
-                    'data': openapi.Schema(
+                    'next': openapi.Schema(type=openapi.TYPE_STRING, description="URL of the next page"),
+                    'results': openapi.Schema(
                         type=openapi.TYPE_OBJECT,
                         properties={
-                            'versions': openapi.Schema(
-                                description='Permission Created for each Version',
-                                type=openapi.TYPE_ARRAY,
-                                items=openapi.Schema(
-                                    type=openapi.TYPE_OBJECT,
-                                    properties={
-                                        'permission_id': openapi.Schema(type=openapi.TYPE_STRING, description="Permisison ID"),
-                                        'permission__codename': openapi.Schema(type=openapi.TYPE_STRING, description="Permission Codename"),
-                                    }
-                                )
-                            ),
-                            'pages': openapi.Schema(
-                                description='Permission Created for Each Page',
-                                type=openapi.TYPE_ARRAY,
-                                items=openapi.Schema(
-                                    type=openapi.TYPE_OBJECT,
-                                    properties={
-                                        'permission_id': openapi.Schema(type=openapi.TYPE_STRING,
-                                                                        description="Permisison ID"),
-                                        'permission__codename': openapi.Schema(type=openapi.TYPE_STRING,
-                                                                               description="Permission Codename"),
-                                    }
-                                )
-                            ),
-                            'parts': openapi.Schema(
-                                description='Permission Created for each Part of pages',
-                                type=openapi.TYPE_ARRAY,
-                                items=openapi.Schema(
-                                    type=openapi.TYPE_OBJECT,
-                                    properties={
-                                        'permission_id': openapi.Schema(type=openapi.TYPE_STRING,
-                                                                        description="Permisison ID"),
-                                        'permission__codename': openapi.Schema(type=openapi.TYPE_STRING,
-                                                                               description="Permission Codename"),
-                                    }
-                                )
+                            'data': openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'versions': openapi.Schema(
+                                        description='Permission Created for each Version',
+                                        type=openapi.TYPE_ARRAY,
+                                        items=openapi.Schema(
+                                            type=openapi.TYPE_OBJECT,
+                                            properties={
+                                                'permission_id': openapi.Schema(type=openapi.TYPE_STRING, description="Permisison ID"),
+                                                'permission__codename': openapi.Schema(type=openapi.TYPE_STRING, description="Permission Codename"),
+                                            }
+                                        )
+                                    ),
+                                    'pages': openapi.Schema(
+                                        description='Permission Created for Each Page',
+                                        type=openapi.TYPE_ARRAY,
+                                        items=openapi.Schema(
+                                            type=openapi.TYPE_OBJECT,
+                                            properties={
+                                                'permission_id': openapi.Schema(type=openapi.TYPE_STRING, description="Permisison ID"),
+                                                'permission__codename': openapi.Schema(type=openapi.TYPE_STRING, description="Permission Codename"),
+                                            }
+                                        )
+                                    ),
+                                    'parts': openapi.Schema(
+                                        description='Permission Created for each Part of pages',
+                                        type=openapi.TYPE_ARRAY,
+                                        items=openapi.Schema(
+                                            type=openapi.TYPE_OBJECT,
+                                            properties={
+                                                'permission_id': openapi.Schema(type=openapi.TYPE_STRING, description="Permisison ID"),
+                                                'permission__codename': openapi.Schema(type=openapi.TYPE_STRING, description="Permission Codename"),
+                                            }
+                                        )
+                                    ),
+                                }
                             ),
+                            'code': openapi.Schema(type=openapi.TYPE_STRING),
                         }
                     ),
-                    'code': openapi.Schema(type=openapi.TYPE_STRING),
                 }
             ),
             status.HTTP_500_INTERNAL_SERVER_ERROR: openapi.Schema(
@@ -136,24 +185,79 @@ class UserDocsAccessViewSet(viewsets.GenericViewSet):
     @action(methods=['GET'], detail=False)
     def permissions(self, request):
         """
-        List all permissions created (Permissions on Versions, Pages and Parts)
+        List all permissions created (Permissions on Versions, Pages and Parts).
+        The catalogue is read with one UNION query and cached until a Version, Page or Part is created, renamed
+        or deleted.
         :param request:
         :return:
         """
         try:
-            logger.info('LIST_PERMISSIONS-START')
-            data = {
-                'versions': Version.objects.all().order_by('permission__codename').values('permission_id', 'permission__codename'),
-                'pages': Page.objects.all().order_by('permission__codename').values('permission_id', 'permission__codename'),
-                'parts': Part.objects.all().order_by('permission__codename').values('permission_id', 'permission__codename'),
-            }
+            logger.info('LIST_PERMISSIONS-START', params=request.query_params)
+            try:
+                version = int(request.query_params['version']) if 'version' in request.query_params else None
+                page = int(request.query_params['page']) if 'page' in request.query_params else None
+                after = (
+                    decode_cursor(request.query_params['cursor'], types=(str, int))
+                    if 'cursor' in request.query_params else None
+                )
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            codename = request.query_params.get('codename') or None
+            page_size = get_page_size(request)
+
+            cache_key = 'docs:permissions:{}:{}'.format(
+                get_structure_generation(),
+                hashlib.md5(repr((version, page, codename, after, page_size)).encode()).hexdigest()
+            )
+            rows = cache.get(cache_key)
+            if rows is None:
+                rows = permission_catalogue(version, page, codename, after, limit=page_size + 1)
+                cache.set(cache_key, rows, CATALOGUE_CACHE_TIMEOUT)
+
+            next_url = None
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                next_url = replace_query_param(
+                    request.build_absolute_uri(), 'cursor',
+                    encode_cursor((rows[-1]['permission__codename'], rows[-1]['permission_id']))
+                )
+
+            data = {'versions': [], 'pages': [], 'parts': []}
+            for row in rows:
+                data[row['kind']].append(
+                    {'permission_id': row['permission_id'], 'permission__codename': row['permission__codename']}
+                )
 
-            logger.info('LIST_PERMISSIONS-DATA', data=data)
+            logger.info('LIST_PERMISSIONS-DATA', count=len(rows), next=next_url)
 
-            return Response({'data': data, 'code': '200'})
+            return Response({'next': next_url, 'results': {'data': data, 'code': '200'}})
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @swagger_auto_schema(
+        operation_description="Download who can read which Version and Page, as CSV (one line per access)",
+        responses={
+            status.HTTP_200_OK: openapi.Response(
+                description=f"text/csv with columns {', '.join(ACCESS_MATRIX_HEADER)}",
+                schema=openapi.Schema(type=openapi.TYPE_FILE)
+            ),
+        },
+        tags=['access management'])
+    @action(methods=['GET'], detail=False)
+    def matrix(self, request):
+        """
+        Stream the access matrix (users x versions/pages) built by users.access.access_matrix
+        :param request:
+        :return:
+        """
+        logger.info('ACCESS_MATRIX-START')
+        return streaming_csv_response(
+            ACCESS_MATRIX_HEADER,
+            access_matrix().iterator(chunk_size=STREAMING_CHUNK_SIZE),
+            filename='access-matrix.csv'
+        )
+
     # =========================================
     # ==== Grant or Remove permission to a User
     @swagger_auto_schema(
@@ -355,3 +459,111 @@ class UserDocsAccessViewSet(viewsets.GenericViewSet):
             return Response({'data': serializer.data, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Give many Users many Access Permissions at once",
+        request_body=BulkPermissionGrantRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses=bulk_access_responses('permissions', 'granted'),
+        tags=['access management'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_grant_permissions(self, request):
+        """
+        Give Permissions to many Users, in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('BULK_GRANT_PERMISSIONS-START', users=len(request.data.get('users') or []))
+
+            serializer = BulkPermissionGrantRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('BULK_GRANT_PERMISSIONS-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Remove many Access Permissions from many Users at once",
+        request_body=BulkPermissionDenyRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses=bulk_access_responses('permissions', 'denied'),
+        tags=['access management'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_deny_permissions(self, request):
+        """
+        Remove Permissions from many Users, in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('BULK_DENY_PERMISSIONS-START', users=len(request.data.get('users') or []))
+
+            serializer = BulkPermissionDenyRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('BULK_DENY_PERMISSIONS-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Put many Users in many Documentation Groups at once",
+        request_body=BulkGroupGrantRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses=bulk_access_responses('groups', 'granted'),
+        tags=['access management'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_grant_groups(self, request):
+        """
+        Put many Users in Documentation Groups, in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('BULK_GRANT_GROUPS-START', users=len(request.data.get('users') or []))
+
+            serializer = BulkGroupGrantRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('BULK_GRANT_GROUPS-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @swagger_auto_schema(
+        operation_description="Remove many Users from many Documentation Groups at once",
+        request_body=BulkGroupDenyRequest,
+        manual_parameters=[idempotency_key_parameter],
+        responses=bulk_access_responses('groups', 'denied'),
+        tags=['access management'])
+    @action(methods=['POST'], detail=False)
+    @idempotent
+    def bulk_deny_groups(self, request):
+        """
+        Remove many Users from Documentation Groups, in one transaction
+        :param request:
+        :return:
+        """
+        try:
+            logger.info('BULK_DENY_GROUPS-START', users=len(request.data.get('users') or []))
+
+            serializer = BulkGroupDenyRequest(data=request.data)
+            if serializer.is_valid() is False:
+                return Response({'message': serializer.errors, 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            summary = serializer.save()
+            logger.info('BULK_DENY_GROUPS-DATA', **summary)
+            return Response({'data': summary, 'code': '202'}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -8,9 +8,11 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from apis.serializers.users import UserInfoSerializer, UserFullSerializer, UpdatePasswordStaffSerializer, \
-    UpdatePasswordSerializer, UserCreateSerializer
+    UpdatePasswordSerializer, UserCreateSerializer, UserInfoValuesSerializer
 from users.models import User
-from utils.decorators import IsStaffOrAdminUser
+from utils.decorators import IsStaffOrAdminUser, idempotent, idempotency_key_parameter
+from utils.sparse_fields import get_sparse_fields, sparse_fields_parameters
+from utils.streaming import is_streaming_requested, streaming_list_response, stream_parameter
 
 logger = structlog.getLogger('wz-doc')
 
@@ -28,7 +30,8 @@ class UserViewSet(
         else:
             return UserInfoSerializer
 
-    @swagger_auto_schema(operation_description="Create a User", request_body=UserCreateSerializer, responses={status.HTTP_201_CREATED: UserInfoSerializer()})
+    @swagger_auto_schema(operation_description="Create a User", request_body=UserCreateSerializer, manual_parameters=[idempotency_key_parameter], responses={status.HTTP_201_CREATED: UserInfoSerializer()})
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Create a User
@@ -53,7 +56,7 @@ class UserViewSet(
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @swagger_auto_schema(operation_description="List all Users", responses={status.HTTP_200_OK: UserInfoSerializer()})
+    @swagger_auto_schema(operation_description="List all Users", manual_parameters=[stream_parameter, *sparse_fields_parameters], responses={status.HTTP_200_OK: UserInfoSerializer()})
     def list(self, request, *args, **kwargs):
         """
         List All users
@@ -64,14 +67,25 @@ class UserViewSet(
         :return:
         """
         try:
+            try:
+                sparse_fields = get_sparse_fields(request, UserInfoSerializer)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
+            queryset = UserInfoValuesSerializer(**sparse_fields).values(self.get_queryset())
+            if is_streaming_requested(request):
+                return streaming_list_response(
+                    queryset.order_by('username'), UserInfoValuesSerializer, serializer_kwargs=sparse_fields
+                )
+
             page = self.paginator.paginate_queryset(
-                queryset=self.get_queryset(), request=request)
-            serializer = UserInfoSerializer(page, many=True)
+                queryset=queryset, request=request)
+            serializer = UserInfoValuesSerializer(page, many=True, **sparse_fields)
             return self.paginator.get_paginated_response({'data': serializer.data, 'code': '200'})
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @swagger_auto_schema(operation_description="Retrieve User information", responses={status.HTTP_200_OK: UserFullSerializer()})
+    @swagger_auto_schema(operation_description="Retrieve User information", manual_parameters=sparse_fields_parameters, responses={status.HTTP_200_OK: UserFullSerializer()})
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve a User
@@ -81,8 +95,13 @@ class UserViewSet(
         :return:
         """
         try:
+            try:
+                sparse_fields = get_sparse_fields(request, self.serializer_class)
+            except ValueError as e:
+                return Response({'message': str(e), 'code': '400'}, status=status.HTTP_400_BAD_REQUEST)
+
             instance = self.get_object()
-            serializer = self.serializer_class(instance=instance)
+            serializer = self.serializer_class(instance=instance, **sparse_fields)
             return Response({'data': serializer.data, 'code': '200'}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'message': str(e), 'code': '500'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,56 @@
+"""
+Micro benchmarks of the API hot paths.
+
+Run them from the src folder, for example:
+    python -m benchmarks.serialization --pages 10000
+
+They use the testing settings and a throw-away test database.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django(settings_module: str = 'config.settings.testing'):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Create the test database for the duration of the benchmark, then destroy it
+    """
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """
+    Return the best wall time (in seconds) of `repeat` calls of func
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def report(title: str, results: dict, unit: str = 'ms'):
+    """
+    Print a small table: name, timing and ratio against the first result
+    """
+    print(f'\n{title}')
+    reference = next(iter(results.values()))
+    for name, seconds in results.items():
+        value = seconds * 1000 if unit == 'ms' else seconds
+        print(f'  {name:<40} {value:>10.2f} {unit}   x{reference / seconds:.2f}')
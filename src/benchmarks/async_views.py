@@ -0,0 +1,167 @@
+"""
+Throughput of the read endpoints at high concurrency: gunicorn sync workers (scripts/run_app.sh) vs ASGI workers,
+with and without the async read views (settings.ASYNC_READ_VIEWS).
+
+    python -m benchmarks.async_views --requests 400 --concurrency 50 --db-latency 2
+
+The servers are simulated in-process: each sync worker is a thread calling the WSGI handler, the ASGI workers are
+one event loop calling the ASGI handler with `concurrency` requests in flight. --db-latency adds a sleep to each
+query to reproduce the network round trip to PostgreSQL, which the in-memory SQLite database does not have.
+"""
+import argparse
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup_django, benchmark_database
+
+
+def create_docs(pages: int):
+    from django.contrib.auth.models import Permission
+    from django.contrib.contenttypes.models import ContentType
+    from docs.models import Version, Page
+
+    content_type = ContentType.objects.get_for_model(Page)
+    version = Version.objects.create(name='Benchmark')
+    Permission.objects.bulk_create([
+        Permission(codename=f'benchmark-page_{i}', name=f'Benchmark - Page {i}', content_type=content_type)
+        for i in range(pages)
+    ])
+    permissions = Permission.objects.filter(codename__startswith='benchmark-page_').order_by('id')
+    Page.objects.bulk_create([
+        Page(name=f'Page {i}', description='A page description ' * 10, version=version, permission=permission)
+        for i, permission in enumerate(permissions)
+    ])
+    return version
+
+
+def add_query_latency(seconds: float):
+    from django.db.backends import utils
+
+    execute = utils.CursorWrapper._execute
+
+    def slow_execute(self, *args, **kwargs):
+        time.sleep(seconds)
+        return execute(self, *args, **kwargs)
+
+    utils.CursorWrapper._execute = slow_execute
+
+
+def reload_urls(async_read_views: bool):
+    from django.conf import settings
+    from django.urls import clear_url_caches
+    import apis.urls
+    import config.urls
+
+    settings.ASYNC_READ_VIEWS = async_read_views
+    importlib.reload(apis.urls)
+    importlib.reload(config.urls)
+    clear_url_caches()
+
+
+def run_wsgi(paths: list, headers: dict, workers: int) -> float:
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def call(path):
+        environ = factory.get(path, **headers).environ
+        response = handler(environ, lambda status, response_headers, exc_info=None: None)
+        assert response.status_code == 200, response.status_code
+        response.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(call, paths))
+
+    return time.perf_counter() - start
+
+
+def run_asgi(paths: list, headers: dict, concurrency: int) -> float:
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    asgi_headers = [(b'authorization', headers['HTTP_AUTHORIZATION'].encode()), (b'host', b'testserver')]
+
+    async def call(path, semaphore):
+        async with semaphore:
+            sent = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                'path': path, 'raw_path': path.encode(), 'query_string': b'', 'headers': asgi_headers,
+                'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+            }
+            await handler(scope, receive, send)
+            assert sent[0]['status'] == 200, sent[0]['status']
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(call(path, semaphore) for path in paths))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight for the ASGI workers')
+    parser.add_argument('--workers', type=int, default=2, help='Workers, as in scripts/run_app.sh')
+    parser.add_argument('--db-latency', type=float, default=2.0, help='Milliseconds added to each query')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    from users.models import User
+
+    # One ASGI worker with the read threads of all the workers
+    settings.ASYNC_READ_THREADS = settings.ASYNC_READ_THREADS * args.workers
+    settings.ALLOWED_HOSTS = ['*']
+
+    with benchmark_database():
+        version = create_docs(args.pages)
+        page = version.page_set.order_by('id').first()
+        admin = User.objects.create_superuser('benchmark', 'benchmark@mail.com', 'benchmark')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(admin)}'}
+        endpoints = [
+            f'/api/docs/versions/{version.id}/', f'/api/docs/versions/{version.id}/pages/',
+            f'/api/docs/pages/{page.id}/', f'/api/docs/versions/',
+        ]
+        paths = [endpoints[i % len(endpoints)] for i in range(args.requests)]
+
+        if args.db_latency:
+            add_query_latency(args.db_latency / 1000)
+
+        results = {f'gunicorn sync, {args.workers} workers': run_wsgi(paths, headers, args.workers)}
+        reload_urls(async_read_views=False)
+        results['ASGI, sync views'] = run_asgi(paths, headers, args.concurrency)
+        reload_urls(async_read_views=True)
+        results[f'ASGI, async read views ({settings.ASYNC_READ_THREADS} threads)'] = run_asgi(
+            paths, headers, args.concurrency
+        )
+
+    print(
+        f'\n{args.requests} reads, {args.concurrency} in flight, {args.db_latency} ms per query '
+        f'({len(endpoints)} endpoints: version, version pages, page, versions)'
+    )
+    reference = next(iter(results.values()))
+    for name, seconds in results.items():
+        print(f'  {name:<45} {args.requests / seconds:>10.0f} req/s   x{reference / seconds:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Memory per worker and throughput of gunicorn profiles (gunicorn.conf.py), against the previous command of
+scripts/run_app.sh (2 sync workers, each loading the app).
+
+    python -m benchmarks.gunicorn_profiles --duration 10 --clients 8
+
+Each profile runs a real gunicorn master, with the production settings on a SQLite file (USE_SQLITE). Memory is read
+from /proc (Linux): PSS counts the pages shared by copy-on-write once, divided between the processes sharing them,
+so it shows what preload_app and gc.freeze() save; RSS counts them in each worker.
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import setup_django
+
+PROFILES = {
+    'before: sync, 2 workers, no preload': {
+        'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_WORKERS': '2', 'GUNICORN_PRELOAD': 'false',
+    },
+    'sync, preload': {'GUNICORN_WORKER_CLASS': 'sync'},
+    'gthread, preload': {'GUNICORN_WORKER_CLASS': 'gthread'},
+    'uvicorn, preload': {'GUNICORN_WORKER_CLASS': 'uvicorn'},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid: int) -> dict:
+    """
+    PSS and RSS of a process, in kB
+    """
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                memory[name.lower()] = int(value.split()[0])
+
+    return memory
+
+
+def worker_pids(master_pid: int) -> list:
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def request(port: int, path: str, headers: dict) -> int:
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def wait_ready(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if request(port, '/api/health/ready/', {}) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+
+    raise RuntimeError('gunicorn did not start')
+
+
+def load(port: int, path: str, headers: dict, clients: int, duration: float) -> float:
+    """
+    Requests per second served to `clients` concurrent clients
+    """
+    counts = [0] * clients
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        while time.monotonic() < deadline:
+            assert request(port, path, headers) == 200
+            counts[index] += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sum(counts) / duration
+
+
+def run_profile(environment: dict, path: str, headers: dict, clients: int, duration: float) -> dict:
+    port = free_port()
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn'],
+        env={**environment, 'GUNICORN_BIND': f'127.0.0.1:{port}', 'GUNICORN_MAX_REQUESTS': '0'},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        load(port, path, headers, clients, 1)  # Warm up every worker
+        workers = [memory_kb(pid) for pid in worker_pids(master.pid)]
+        throughput = load(port, path, headers, clients, duration)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=60)
+
+    return {
+        'workers': len(workers),
+        'pss': sum(worker['pss'] for worker in workers) / len(workers) / 1024,
+        'rss': sum(worker['rss'] for worker in workers) / len(workers) / 1024,
+        'throughput': throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per profile')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent HTTP clients')
+    parser.add_argument('--pages', type=int, default=50)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.gettempdir(), 'benchmark-gunicorn.sqlite3')
+    environment = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'config.settings.production',
+        'USE_SQLITE': 'true',
+        'DATABASE_SQLITE': f'sqlite:///{database}',
+        'DEBUG': 'false',
+        'LOG_FORMATTER': 'json_formatter',
+    }
+    os.environ.update(environment)
+    setup_django('config.settings.production')
+
+    from django.contrib.auth.models import Permission
+    from django.contrib.contenttypes.models import ContentType
+    from django.core.management import call_command
+    from rest_framework_simplejwt.tokens import AccessToken
+    from docs.models import Version, Page
+    from users.models import User
+
+    call_command('migrate', verbosity=0)
+    content_type = ContentType.objects.get_for_model(Page)
+    version = Version.objects.create(name='Benchmark')
+    for i in range(args.pages):
+        Page.objects.create(
+            name=f'Page {i}', version=version,
+            permission=Permission.objects.create(
+                codename=f'benchmark-page_{i}', name=f'Page {i}', content_type=content_type
+            ),
+        )
+    admin = User.objects.create_superuser('benchmark', 'benchmark@mail.com', 'benchmark')
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+    path = f'/api/docs/versions/{version.id}/pages/'
+
+    results = {}
+    try:
+        for name, profile in PROFILES.items():
+            if profile['GUNICORN_WORKER_CLASS'] == 'uvicorn' and importlib.util.find_spec('uvicorn') is None:
+                print(f'  {name}: skipped, uvicorn is not installed')
+                continue
+
+            results[name] = run_profile({**environment, **profile}, path, headers, args.clients, args.duration)
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.unlink(database + suffix)
+
+    print(f'\nGET /api/docs/versions/<id>/pages/ ({args.pages} pages), {args.clients} clients, {os.cpu_count()} CPU(s)')
+    reference = next(iter(results.values()))['throughput']
+    for name, result in results.items():
+        print(
+            f"  {name:<38} {result['workers']:>2} workers   PSS {result['pss']:>6.1f} MB   RSS {result['rss']:>6.1f} MB"
+            f"   {result['throughput']:>7.0f} req/s   x{result['throughput'] / reference:.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Serialization + rendering of a large pages listing, DRF JSONRenderer vs FastJSONRenderer.
+
+    python -m benchmarks.serialization --pages 10000
+"""
+import argparse
+
+from benchmarks import setup_django, benchmark_database, best_of, report
+
+
+def create_pages(count: int):
+    from django.contrib.auth.models import Permission
+    from django.contrib.contenttypes.models import ContentType
+    from docs.models import Version, Page
+
+    content_type = ContentType.objects.get_for_model(Page)
+    version = Version.objects.create(name='Benchmark')
+    Permission.objects.bulk_create([
+        Permission(codename=f'benchmark-page_{i}', name=f'Benchmark - Page {i}', content_type=content_type)
+        for i in range(count)
+    ])
+    permissions = Permission.objects.filter(codename__startswith='benchmark-page_').order_by('id')
+    Page.objects.bulk_create([
+        Page(
+            name=f'Page {i}', description='A page description ' * 10, version=version, permission=permission
+        )
+        for i, permission in enumerate(permissions)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+    from apis.serializers.page import PageResponseSerializer
+    from config.backends import FastJSONRenderer, CustomJSONRenderer, orjson
+    from docs.models import Page
+
+    with benchmark_database():
+        create_pages(args.pages)
+        data = {
+            'data': PageResponseSerializer(Page.objects.select_related('permission').order_by('name'), many=True).data,
+            'code': '200'
+        }
+        size = len(JSONRenderer().render(data))
+
+        results = {
+            'JSONRenderer (DRF, stdlib json)': best_of(lambda: JSONRenderer().render(data), args.repeat),
+            'FastJSONRenderer': best_of(lambda: FastJSONRenderer().render(data), args.repeat),
+            'CustomJSONRenderer (envelope)': best_of(lambda: CustomJSONRenderer().render(data), args.repeat),
+        }
+        serialize = best_of(
+            lambda: PageResponseSerializer(Page.objects.select_related('permission').order_by('name'), many=True).data,
+            args.repeat
+        )
+
+    report(
+        f'Rendering {args.pages} pages ({size / 1024:.0f} KiB), orjson {"enabled" if orjson else "not installed"}',
+        results
+    )
+    print(f'  (serializer alone, for reference: {serialize * 1000:.2f} ms)')
+
+
+if __name__ == '__main__':
+    main()
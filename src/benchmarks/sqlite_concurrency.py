@@ -0,0 +1,166 @@
+"""
+Reader throughput of a SQLite file while a writer updates a Part (PartViewSet.update) in a loop:
+Django's SQLite backend (rollback journal) vs config.sqlite (WAL, pragmas, write retries, query only read connections).
+
+    python -m benchmarks.sqlite_concurrency --readers 4 --duration 5
+
+Each setup runs in its own process, on a new database file. Readers and the writer are forked processes calling the
+WSGI handler, each with its own connections, like the gunicorn workers of a small install (USE_SQLITE).
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import setup_django, benchmark_database
+
+ENGINES = {
+    'django.db.backends.sqlite3': "Django's SQLite backend",
+    'config.sqlite': 'config.sqlite, read connections',
+}
+
+
+def create_docs(parts: int):
+    from django.contrib.auth.models import Permission
+    from django.contrib.contenttypes.models import ContentType
+    from docs.models import Version, Page, Part
+
+    content_type = ContentType.objects.get_for_model(Part)
+    version = Version.objects.create(name='Benchmark')
+    page = Page.objects.create(
+        name='Page', version=version,
+        permission=Permission.objects.create(codename='benchmark-page', name='Page', content_type=content_type),
+    )
+    for i in range(parts):
+        Part.objects.create(
+            name=f'Part {i}', content='Some documentation content. ' * 20, page=page,
+            permission=Permission.objects.create(
+                codename=f'benchmark-part_{i}', name=f'Part {i}', content_type=content_type
+            ),
+        )
+
+    return page
+
+
+def token(username: str) -> str:
+    from rest_framework_simplejwt.tokens import AccessToken
+    from users.models import User
+
+    user = User.objects.create_superuser(username, f'{username}@mail.com', username)
+    return f'Bearer {AccessToken.for_user(user)}'
+
+
+def run_setup(engine: str, path: str, readers: int, duration: float, parts: int) -> dict:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.testing')
+    from django.conf import settings
+
+    settings.DATABASES['default'].update({'ENGINE': engine, 'CONN_MAX_AGE': 60, 'TEST': {'NAME': path}})
+    if engine == 'config.sqlite':
+        settings.DATABASES['replica_read'] = {'ENGINE': engine, 'NAME': path, 'CONN_MAX_AGE': 60, 'READ_ONLY': True}
+        settings.DATABASE_REPLICAS = ['replica_read']
+
+    setup_django()
+    settings.ALLOWED_HOSTS = ['*']
+    logging.disable(logging.CRITICAL)  # Request logs would be most of the time spent
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test import RequestFactory
+
+    def worker(requests, error: str, results):
+        """
+        Forked like a gunicorn worker: call the WSGI handler until the deadline, with its own connections
+        """
+        connections.close_all()
+        handler = WSGIHandler()
+        counts = {'requests': 0, 'errors': 0}
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            response = handler(next(requests).environ, lambda status, response_headers, exc_info=None: None)
+            response.close()
+            counts['requests' if response.status_code == 200 else 'errors'] += 1
+
+        connections.close_all()
+        results.put((error, counts))
+
+    def reads(path, authorization):
+        while True:
+            yield RequestFactory().get(path, HTTP_AUTHORIZATION=authorization)
+
+    def writes(path, authorization):
+        revision = 0
+        while True:
+            revision += 1
+            yield RequestFactory().put(
+                path, data=json.dumps({'content': f'Revision {revision}. ' * 50}),
+                content_type='application/json', HTTP_AUTHORIZATION=authorization,
+            )
+
+    with benchmark_database():
+        page = create_docs(parts)
+        part = page.part_set.order_by('id').first()
+        reader_token, writer_token = token('reader'), token('writer')
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        read_path = f'/api/docs/pages/{page.id}/parts/'
+        processes = [
+            context.Process(target=worker, args=(reads(read_path, reader_token), 'read', results))
+            for _ in range(readers)
+        ]
+        processes.append(context.Process(
+            target=worker, args=(writes(f'/api/docs/parts/{part.id}/', writer_token), 'write', results)
+        ))
+        for process in processes:
+            process.start()
+
+        counts = {'reads': 0, 'read_errors': 0, 'writes': 0, 'write_errors': 0}
+        for _ in processes:
+            kind, worker_counts = results.get()
+            counts[f'{kind}s'] += worker_counts['requests']
+            counts[f'{kind}_errors'] += worker_counts['errors']
+        for process in processes:
+            process.join()
+
+    return {name: count / duration if name in ('reads', 'writes') else count for name, count in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=4, help='Reading workers, a writing worker runs next to them')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per setup')
+    parser.add_argument('--parts', type=int, default=20, help='Parts of the page read')
+    parser.add_argument('--engine', default=None, help=argparse.SUPPRESS)  # Runs one setup in this process
+    args = parser.parse_args()
+
+    if args.engine:
+        path = os.path.join(tempfile.gettempdir(), 'benchmark-concurrency.sqlite3')
+        print(json.dumps(run_setup(args.engine, path, args.readers, args.duration, args.parts)))
+        return
+
+    results = {}
+    for engine in ENGINES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--engine', engine, '--readers', str(args.readers),
+             '--duration', str(args.duration), '--parts', str(args.parts)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[engine] = json.loads(output.strip().splitlines()[-1])
+
+    print(f'\n{args.readers} readers (GET page parts) and 1 writer (PUT part), {args.duration}s per setup')
+    reference = results['django.db.backends.sqlite3']['reads'] or 1
+    for engine, result in results.items():
+        print(
+            f"  {ENGINES[engine]:<34} {result['reads']:>8.0f} reads/s ({result['read_errors']} errors)   "
+            f"{result['writes']:>6.0f} writes/s ({result['write_errors']} errors)   x{result['reads'] / reference:.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Rows per second of the hot list endpoints: model instances and DRF ModelSerializer vs values() and ValuesSerializer
+(apis.serializers.values), for the same JSON output.
+
+    python -m benchmarks.values_serializers --rows 10000
+
+Each measure reads the rows (query), serializes them and renders the JSON body, like VersionViewSet.list,
+VersionViewSet.pages, PageViewSet.parts and UserViewSet.list do for one page of results.
+"""
+import argparse
+
+from benchmarks import setup_django, benchmark_database, best_of
+
+
+def create_rows(count: int):
+    from django.contrib.auth.models import Group, Permission
+    from django.contrib.contenttypes.models import ContentType
+    from docs.models import Version, Page, Part
+    from users.models import User
+
+    content_type = ContentType.objects.get_for_model(Part)
+    Permission.objects.bulk_create([
+        Permission(codename=f'benchmark_{i}', name=f'Benchmark {i}', content_type=content_type)
+        for i in range(3 * count)
+    ])
+    permissions = list(Permission.objects.filter(codename__startswith='benchmark_').order_by('id'))
+    Group.objects.bulk_create([Group(name=f'Version {i}') for i in range(count)])
+    groups = Group.objects.filter(name__startswith='Version ').order_by('id')
+
+    Version.objects.bulk_create([
+        Version(name=f'Version{i}', description='A version description', permission=permissions[i], group=group)
+        for i, group in enumerate(groups)
+    ])
+    version = Version.objects.order_by('id').first()
+    Page.objects.bulk_create([
+        Page(name=f'Page {i}', description='A page description ' * 10, version=version,
+             permission=permissions[count + i])
+        for i in range(count)
+    ])
+    page = Page.objects.order_by('id').first()
+    Part.objects.bulk_create([
+        Part(name=f'Part {i}', content='Some documentation content. ' * 20, page=page,
+             permission=permissions[2 * count + i])
+        for i in range(count)
+    ])
+    User.objects.bulk_create([
+        User(username=f'user_{i}', email=f'user_{i}@mail.com', first_name='First', last_name='Last', enterprise='WZ')
+        for i in range(count)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='Rows of each list')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from apis.serializers.page import PageResponseSerializer, PageValuesSerializer
+    from apis.serializers.part import PartResponseSerializer, PartValuesSerializer
+    from apis.serializers.users import UserInfoSerializer, UserInfoValuesSerializer
+    from apis.serializers.version import VersionResponseSerializer, VersionValuesSerializer
+    from config.backends import FastJSONRenderer
+    from docs.models import Version, Page, Part
+    from users.models import User
+
+    endpoints = {
+        'versions': (Version.objects.select_related('permission').order_by('name'), VersionResponseSerializer,
+                     VersionValuesSerializer),
+        'pages of a version': (Page.objects.select_related('permission').order_by('name'), PageResponseSerializer,
+                               PageValuesSerializer),
+        'parts of a page': (Part.objects.select_related('permission').order_by('name'), PartResponseSerializer,
+                            PartValuesSerializer),
+        'users': (User.objects.order_by('username'), UserInfoSerializer, UserInfoValuesSerializer),
+    }
+
+    def model_serializer(queryset, serializer_class):
+        return FastJSONRenderer().render({'data': serializer_class(queryset.all(), many=True).data, 'code': '200'})
+
+    def values_serializer(queryset, serializer_class):
+        rows = serializer_class().values(queryset.all())
+        return FastJSONRenderer().render({'data': serializer_class(rows, many=True).data, 'code': '200'})
+
+    results = {}
+    with benchmark_database():
+        create_rows(args.rows)
+        for name, (queryset, serializer_class, values_serializer_class) in endpoints.items():
+            output = values_serializer(queryset, values_serializer_class)
+            assert model_serializer(queryset, serializer_class) == output, f'{name}: the outputs differ'
+
+            results[name] = (
+                best_of(lambda: model_serializer(queryset, serializer_class), args.repeat),
+                best_of(lambda: values_serializer(queryset, values_serializer_class), args.repeat),
+                len(output),
+            )
+
+    print(f'\nList of {args.rows} rows: query, serialization and JSON rendering (identical output)')
+    for name, (before, after, size) in results.items():
+        print(
+            f'  {name:<20} {size / 1024:>6.0f} KiB   ModelSerializer {args.rows / before:>9.0f} rows/s   '
+            f'values() {args.rows / after:>9.0f} rows/s   x{before / after:.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
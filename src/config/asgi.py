@@ -15,4 +15,39 @@ from .conf import DJANGO_SETTINGS_MODULE
 #os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', DJANGO_SETTINGS_MODULE)
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from django.conf import settings  # noqa: E402
+from asgiref.sync import sync_to_async  # noqa: E402
+from apis.docs.events import doc_events  # noqa: E402
+from config.warmup import warm_up  # noqa: E402
+
+
+async def lifespan(scope, receive, send):
+    """
+    Warm up the worker (config.warmup) at startup, before the server accepts requests.
+    It runs in the thread of the sync views (thread_sensitive), so that they reuse the connections it opens.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if settings.WARM_UP:
+                await sync_to_async(warm_up, thread_sensitive=True)()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """
+    Long-lived doc change streams are served by apis.docs.events, everything else by Django
+    """
+    if scope['type'] == 'lifespan':
+        return await lifespan(scope, receive, send)
+
+    if scope['type'] == 'http' and scope['path'] == settings.DOC_EVENTS_PATH:
+        return await doc_events(scope, receive, send)
+
+    return await django_application(scope, receive, send)
@@ -1,7 +1,14 @@
+import decimal
+
 from django.contrib.auth.backends import ModelBackend, UserModel
 from django.db.models import Q
 from rest_framework.renderers import JSONRenderer
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, we fall back to the stdlib encoder used by DRF
+    orjson = None
+
 
 class CustomBackendAuthentication(ModelBackend):
     """
@@ -27,20 +34,65 @@ class CustomBackendAuthentication(ModelBackend):
         return user if self.user_can_authenticate(user) else None
 
 
-class CustomJSONRenderer(JSONRenderer):
+class FastJSONRenderer(JSONRenderer):
+    """
+    Same output as DRF JSONRenderer, but encoded by orjson (C) when it is installed.
+    datetime, date, time and UUID are encoded natively by orjson, Decimal as float like DRF does.
+    Any other type falls back to the DRF encoder.
+    """
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+    def default(self, obj):
+        if isinstance(obj, decimal.Decimal):
+            return float(obj)
+
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            # Pretty printing (Browsable API) is not a hot path
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.default, option=self.options)
+
+        # Like DRF, fully escape \u2028 and \u2029 so that the output is a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
+
+
+class CustomJSONRenderer(FastJSONRenderer):
+    """
+    Wrap every response in a {data, code, message} envelope.
+    The envelope is built around the view data, which is neither copied nor mutated unless it carries its own
+    code or message.
+    """
 
     def render(self, data, accepted_media_type=None, renderer_context=None, **kwargs):
-        response = {'data': data} if 'data' not in data else {'data': data['data']}
-        if 'code' in data:
-            response['code'] = data['code']
-            data.pop('code')
-        else:
-            response['code'] = f"0{renderer_context.get('response').status_code}"
+        renderer_context = renderer_context or {}
 
-        if 'message' in data:
-            response['message'] = data['message']
-            data.pop('message')
+        if isinstance(data, dict):
+            code = data.get('code')
+            message = data.get('message')
+            if 'data' in data:
+                payload = data['data']
+            elif 'code' in data or 'message' in data:
+                payload = {key: value for key, value in data.items() if key not in ('code', 'message')}
+            else:
+                payload = data
         else:
-            response['message'] = None
+            code, message, payload = None, None, data
+
+        if code is None:
+            code = f"0{renderer_context['response'].status_code}" if 'response' in renderer_context else None
+
+        response = {'data': payload, 'code': code, 'message': message}
 
         return super(CustomJSONRenderer, self).render(response, accepted_media_type, renderer_context)
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+def check_connections():
+    """
+    Health check of the persistent connections (settings.CONN_MAX_AGE) of this thread, before they are reused.
+
+    A connection idle for more than settings.DATABASE_HEALTH_CHECK_IDLE may have been dropped by the server or the
+    network: it is pinged and closed if broken, so that the request opens a new one instead of failing.
+    Connections reused right away are not pinged, which saves a round trip on a busy worker.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+
+        released_at = getattr(connection, 'released_at', None)
+        if released_at is not None and now - released_at < settings.DATABASE_HEALTH_CHECK_IDLE:
+            continue
+
+        if not connection.is_usable():
+            connection.close()
+
+
+def release_connections():
+    """
+    Remember when the connections of this thread were last used, see check_connections()
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.released_at = now
+
+
+def database_ready(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """
+    Return True when the database accepts connections. The connection is kept for the next requests
+    """
+    connection = connections[using]
+    try:
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+        connection.ensure_connection()
+    except DatabaseError:
+        connection.close()
+        return False
+
+    return True
+
+
+def databases_ready() -> bool:
+    """
+    The primary and the read replicas (settings.DATABASE_REPLICAS) accept connections
+    """
+    return all(database_ready(using) for using in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS))
+
+
+def wait_for_databases(timeout: float, interval: float = 1) -> bool:
+    """
+    Wait until databases_ready(), for at most `timeout` seconds
+    """
+    deadline = time.monotonic() + timeout
+    while not databases_ready():
+        if time.monotonic() + interval > deadline:
+            return False
+
+        time.sleep(interval)
+
+    return True
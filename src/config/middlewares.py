@@ -0,0 +1,179 @@
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence
+
+from config.routers import end_request, read_alias, start_request, stick_to_primary
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional
+    zstandard = None
+
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json', 'application/openapi+json', 'application/yaml', 'application/javascript',
+    'application/xml', 'text/',
+)
+
+# Server preference, used when the client accepts several encodings with the same quality
+COMPRESSORS = OrderedDict()
+if zstandard is not None:
+    COMPRESSORS['zstd'] = lambda content: zstandard.ZstdCompressor(level=10).compress(content)
+if brotli is not None:
+    COMPRESSORS['br'] = lambda content: brotli.compress(content, quality=5)
+COMPRESSORS['gzip'] = lambda content: gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def negotiate_encoding(accept_encoding: str, available=None):
+    """
+    Return the best encoding among `available` (default: all supported) accepted by the Accept-Encoding header,
+    or None if the response should not be compressed.
+    """
+    available = available or COMPRESSORS.keys()
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return COMPRESSORS[encoding](content)
+
+
+def is_compressible(response) -> bool:
+    content_type = response.get('Content-Type', '').lower()
+    return any(content_type.startswith(compressible) for compressible in COMPRESSIBLE_CONTENT_TYPES)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress API responses with the best encoding accepted by the client (zstd, brotli when installed, gzip).
+
+    Responses of cacheable documentation endpoints (GET, 200, with an ETag) are compressed once: the compressed body
+    is stored in the cache keyed by encoding, URL and ETag, so hot pages are not compressed again on each request.
+    Streaming responses are gzipped on the fly.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(response):
+            return response
+
+        if response.streaming:
+            encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available=('gzip',))
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if encoding is None:
+                return response
+
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+            response['Content-Encoding'] = encoding
+            return response
+
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        if etag and self.is_cacheable(request, response):
+            cache = caches[settings.COMPRESSION_CACHE_ALIAS]
+            # The ETag of a documentation object is its revision: only unique with the URL
+            url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'compression:{encoding}:{url}:{etag}'
+            compressed = cache.get(key)
+            if compressed is None:
+                compressed = compress(response.content, encoding)
+                cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+        else:
+            compressed = compress(response.content, encoding)
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if etag and not etag.startswith('W/'):
+            # The compressed body is not byte-equal to the original one anymore
+            response['ETag'] = f'W/{etag}'
+
+        return response
+
+    @staticmethod
+    def is_cacheable(request, response) -> bool:
+        return (
+            request.method in ('GET', 'HEAD') and response.status_code == 200
+            and request.path.startswith(settings.COMPRESSION_CACHE_PATHS)
+        )
+
+
+class ReplicaMiddleware:
+    """
+    Route the reads of each request with config.routers.ReplicaRouter: safe requests of the doc and user endpoints
+    read from a replica, and a client which wrote sticks to the primary for a while.
+
+    Sync and async capable, so that it does not put an async-to-sync switch in front of every ASGI request.
+    The routing state (context variables) is set and reset around the request in the context it runs in: sync
+    views run in a copy of it, and their changes (a write) are brought back when they return.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Like MiddlewareMixin: tells the handler that calling the middleware returns a coroutine
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        tokens = start_request(read_alias(request))
+        try:
+            return self.get_response(request)
+        finally:
+            if end_request(tokens):
+                stick_to_primary(request)
+
+    async def __acall__(self, request):
+        # The sticky clients are read from and written to the cache in a thread, not to block the event loop
+        alias = await sync_to_async(read_alias, thread_sensitive=False)(request) if settings.DATABASE_REPLICAS else None
+        tokens = start_request(alias)
+        try:
+            return await self.get_response(request)
+        finally:
+            if end_request(tokens):
+                await sync_to_async(stick_to_primary, thread_sensitive=False)(request)
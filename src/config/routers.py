@@ -0,0 +1,95 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+PRIMARY = 'default'
+
+# Database used by the reads of the current request: None for the primary, or the alias of a read replica
+_read_alias = ContextVar('read_alias', default=None)
+# Set when the current request writes (see ReplicaRouter.db_for_write)
+_has_written = ContextVar('has_written', default=False)
+
+
+def client_key(request) -> str:
+    """
+    Identify the client of a request across requests: its credentials, else its session, else its IP address
+    """
+    identity = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'primary-sticky:' + hashlib.sha1(identity.encode()).hexdigest()
+
+
+def uses_replica(request) -> bool:
+    """
+    Safe requests of the doc and user endpoints read from a replica, unless the client wrote recently
+    """
+    if not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return False
+
+    if not request.path.startswith(settings.REPLICA_READ_PATHS):
+        return False
+
+    return not caches[settings.PRIMARY_STICKY_CACHE_ALIAS].get(client_key(request))
+
+
+def read_alias(request):
+    """
+    Database read by the request: the alias of a read replica, or None for the primary
+    """
+    return random.choice(settings.DATABASE_REPLICAS) if uses_replica(request) else None
+
+
+def start_request(alias):
+    """
+    Route the reads of the current request (context) to `alias`. Return the tokens given to end_request()
+    """
+    return _read_alias.set(alias), _has_written.set(False)
+
+
+def end_request(tokens) -> bool:
+    """
+    Reset the routing state of the current request (context). Return True if the request wrote
+    """
+    has_written = _has_written.get()
+    read_token, written_token = tokens
+    _read_alias.reset(read_token)
+    _has_written.reset(written_token)
+
+    return has_written
+
+
+def stick_to_primary(request):
+    """
+    Keep the client on the primary for settings.PRIMARY_STICKY_SECONDS after it wrote, so it reads its own writes
+    """
+    if settings.DATABASE_REPLICAS:
+        caches[settings.PRIMARY_STICKY_CACHE_ALIAS].set(client_key(request), True, settings.PRIMARY_STICKY_SECONDS)
+
+
+class ReplicaRouter:
+    """
+    Send the reads of the requests chosen by start_request() to a read replica (settings.DATABASE_REPLICAS),
+    everything else to the primary. Once a request writes, its remaining reads go to the primary too.
+    Code running outside a request (commands, shell, signals of a write) always uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _has_written.set(True)
+        _read_alias.set(None)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
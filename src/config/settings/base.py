@@ -18,7 +18,12 @@ import environ
 import structlog
 
 from config.conf import DEBUG, SECRET_KEY, AUTH_HEADER_TYPES, ACCESS_TOKEN_LIFETIME_MINUTES, \
-    REFRESH_TOKEN_LIFETIME_DAYS, VERIFYING_KEY, LOG_FORMATTER
+    REFRESH_TOKEN_LIFETIME_DAYS, VERIFYING_KEY, LOG_FORMATTER, OPENAPI_SCHEMA_FILE, \
+    COMPRESSION_MIN_SIZE, CACHE_URL, IDEMPOTENCY_KEY_TTL_HOURS, DOC_EVENTS_QUEUE_SIZE, DOC_EVENTS_HEARTBEAT_SECONDS, \
+    DOC_EVENTS_ACCESS_TTL_SECONDS, DOC_EVENTS_POLL_SECONDS, ASYNC_READ_VIEWS, ASYNC_READ_THREADS, \
+    PRIMARY_STICKY_SECONDS, \
+    DATABASE_HEALTH_CHECK_IDLE_SECONDS, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE_MB, SQLITE_CACHE_SIZE_MB, \
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_WRITE_RETRIES, WARM_UP
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,10 +60,13 @@ INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PART_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.middlewares.ReplicaMiddleware',  # Before any middleware reading the database
+    'config.middlewares.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django_structlog.middlewares.RequestMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',  # ETag used by the compression cache, and 304 responses
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -193,13 +201,76 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "config.backends.FastJSONRenderer",
         #"config.backends.CustomJSONRenderer"
     ],
     "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.AcceptHeaderVersioning",
     "DEFAULT_VERSION": "1.0",
 }
 
+# ===== Cache
+CACHES = {
+    'default': CACHE_URL,
+}
+
+# ===== Response compression
+COMPRESSION_MIN_SIZE = COMPRESSION_MIN_SIZE
+COMPRESSION_CACHE_ALIAS = 'default'
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+COMPRESSION_CACHE_PATHS = ('/api/docs/',)  # Only these responses have their compressed body cached
+
+# ===== Idempotency-Key header
+# First response of the create/bulk endpoints, replayed to retries using the same key (see utils.decorators.idempotent)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+# ===== Live doc change events
+# Server-Sent Events pushed by apis.docs.events under ASGI (see config.asgi), fanned out in-process by docs.events.
+# Each process reads the changes committed by every process from the change feed, every DOC_EVENTS_POLL seconds
+DOC_EVENTS_PATH = '/api/docs/events/'
+DOC_EVENTS_QUEUE_SIZE = DOC_EVENTS_QUEUE_SIZE
+DOC_EVENTS_HEARTBEAT = DOC_EVENTS_HEARTBEAT_SECONDS
+DOC_EVENTS_ACCESS_TTL = DOC_EVENTS_ACCESS_TTL_SECONDS
+DOC_EVENTS_POLL = DOC_EVENTS_POLL_SECONDS
+
+# ===== Async read views
+# Under ASGI, the read endpoints of the documentation are served by utils.async_views.async_read_view (see apis.urls)
+ASYNC_READ_VIEWS = ASYNC_READ_VIEWS
+ASYNC_READ_THREADS = ASYNC_READ_THREADS
+
+# ===== Database connections
+# Connections are kept for CONN_MAX_AGE (see the environment settings) and pinged before reuse when they were idle
+# for longer than this (see config.connections). Under ASGI, the read threads bound the connections of a worker.
+DATABASE_HEALTH_CHECK_IDLE = DATABASE_HEALTH_CHECK_IDLE_SECONDS
+
+# ===== Worker warm-up
+# Routes, serializers, connections and caches loaded before the first request (config.warmup), readiness waits for it
+WARM_UP = WARM_UP
+
+# ===== SQLite
+# Set on each connection of the config.sqlite backend, in this order (busy_timeout first, journal_mode waits for locks)
+SQLITE_PRAGMAS = {
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    'journal_mode': 'WAL',
+    'synchronous': SQLITE_SYNCHRONOUS,
+    'mmap_size': SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+    'cache_size': -SQLITE_CACHE_SIZE_MB * 1024,  # Negative: in KiB
+    'temp_store': 'MEMORY',
+}
+SQLITE_WRITE_RETRIES = SQLITE_WRITE_RETRIES
+
+# ===== Read replicas
+# Safe requests of these endpoints read from one of the DATABASE_REPLICAS aliases (see config.routers), which are
+# declared by the environment settings. A client which wrote reads from the primary for PRIMARY_STICKY_SECONDS.
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_READ_PATHS = ('/api/docs/', '/api/users/')
+PRIMARY_STICKY_SECONDS = PRIMARY_STICKY_SECONDS
+PRIMARY_STICKY_CACHE_ALIAS = 'default'  # Should be shared by the workers, like the cache of CACHE_URL
+
+# ===== OpenAPI schema
+# Built and validated once by "manage.py build_openapi", then served from memory by apis.swagger_schema
+OPENAPI_SCHEMA_FILE = BASE_DIR.parent / OPENAPI_SCHEMA_FILE
+
 # ===== Log settings
 LOGGING = {
     'version': 1,
@@ -10,8 +10,6 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration
 from config.conf import ALLOWED_HOSTS, CSRF_TRUSTED_ORIGINS, CORS_ORIGIN_WHITELIST, DATABASE_SQLITE, SWAGGER_BASE_URL, \
     USE_SQLITE, POSTGRES_USER, POSTGRES_DB, POSTGRES_PORT, POSTGRES_PASSWORD, POSTGRES_HOST, ENVIRONMENT
 
@@ -60,9 +58,13 @@ else:
     }
 
 # ===== Sentry settings
-SENTRY_DEBUG = env("SENTRY_DEBUG", default=False)
+SENTRY_DEBUG = env.bool("SENTRY_DEBUG", default=False)
 
 if SENTRY_DEBUG:
+    # Only imported when enabled: sentry_sdk and its integrations are slow to import
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+
     sentry_sdk.init(
         dsn="http://21934a58962e4bb0bba6515f52286b80@10.0.15.60:9000/9",
         integrations=[DjangoIntegration()],
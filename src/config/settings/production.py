@@ -10,10 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration
 from config.conf import ALLOWED_HOSTS, CSRF_TRUSTED_ORIGINS, CORS_ORIGIN_WHITELIST, DATABASE_SQLITE, SWAGGER_BASE_URL, \
-    USE_SQLITE, POSTGRES_USER, POSTGRES_DB, POSTGRES_PORT, POSTGRES_PASSWORD, POSTGRES_HOST, ENVIRONMENT
+    USE_SQLITE, POSTGRES_USER, POSTGRES_DB, POSTGRES_PORT, POSTGRES_PASSWORD, POSTGRES_HOST, ENVIRONMENT, \
+    DATABASE_REPLICA_URLS, DATABASE_CONN_MAX_AGE
 
 from .base import *
 
@@ -32,7 +31,8 @@ CSRF_TRUSTED_ORIGINS = CSRF_TRUSTED_ORIGINS
 CORS_ORIGIN_WHITELIST = CORS_ORIGIN_WHITELIST
 
 # Application definition
-THIRD_PART_APPS += [
+# The Swagger UI (templates and static files of drf_yasg) is not served in production, see config/urls.py
+THIRD_PART_APPS = [app for app in THIRD_PART_APPS if app != 'drf_yasg'] + [
     'corsheaders',
 ]
 
@@ -42,8 +42,13 @@ INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PART_APPS
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
 if USE_SQLITE is True:
+    # Tuned for concurrent workers by config.sqlite. The reads of safe requests use separate query only connections
+    # (see config.routers), which never wait for the writer thanks to the WAL journal
     DATABASES = {
-        'default': DATABASE_SQLITE
+        'default': {**DATABASE_SQLITE, 'ENGINE': 'config.sqlite'},
+        'replica_read': {
+            **DATABASE_SQLITE, 'ENGINE': 'config.sqlite', 'READ_ONLY': True, 'TEST': {'MIRROR': 'default'},
+        },
     }
 else:
     DATABASES = {
@@ -54,13 +59,29 @@ else:
             'PASSWORD': POSTGRES_PASSWORD,
             'HOST': POSTGRES_HOST,
             'PORT': POSTGRES_PORT,
+            'OPTIONS': {'connect_timeout': 5},  # Fail fast, see manage.py wait_for_database and /api/health/ready/
         }
     }
 
+# Read replicas, used by config.routers.ReplicaRouter. Tests run against the primary only
+for index, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica_{index}'] = {**environ.Env.db_url_config(url), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+
+# Persistent connections: each worker (or read thread under ASGI) reuses its connections instead of opening one per
+# request. They are health checked before reuse by config.connections
+for database in DATABASES.values():
+    database.setdefault('CONN_MAX_AGE', DATABASE_CONN_MAX_AGE)
+
 # ===== Sentry settings
-SENTRY_DEBUG = env("SENTRY_DEBUG", default=False)
+SENTRY_DEBUG = env.bool("SENTRY_DEBUG", default=False)
 
 if SENTRY_DEBUG:
+    # Only imported when enabled: sentry_sdk and its integrations are slow to import
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+
     sentry_sdk.init(
         dsn="http://21934a58962e4bb0bba6515f52286b80@10.0.15.60:9000/9",
         integrations=[DjangoIntegration()],
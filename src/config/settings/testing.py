@@ -32,9 +32,14 @@ INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PART_APPS
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'config.sqlite',
         'NAME': os.path.join(BASE_DIR, 'test.sqlite3'),
-    }
+    },
+    # Read replica, only used by the tests of config.routers which set DATABASE_REPLICAS = ['replica']
+    'replica': {
+        'ENGINE': 'config.sqlite',
+        'NAME': os.path.join(BASE_DIR, 'test_replica.sqlite3'),
+    },
 }
 
 
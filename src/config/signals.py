@@ -1,7 +1,10 @@
+from django.core.signals import request_finished, request_started
 from django.dispatch import receiver
 from django_structlog.signals import bind_extra_request_metadata
 import structlog
 
+from config.connections import check_connections, release_connections
+
 
 @receiver(bind_extra_request_metadata)
 def bind_user_info(request, logger, **kwargs):
@@ -25,3 +28,13 @@ def bind_user_info(request, logger, **kwargs):
             ip=ip
         )
 
+
+@receiver(request_started)
+def check_db_connections(**kwargs):
+    # Runs after django.db.close_old_connections, which drops the connections older than CONN_MAX_AGE
+    check_connections()
+
+
+@receiver(request_finished)
+def release_db_connections(**kwargs):
+    release_connections()
@@ -0,0 +1,65 @@
+"""
+SQLite backend for the installs running on a file (USE_SQLITE), with concurrent workers.
+
+- The pragmas of settings.SQLITE_PRAGMAS are set on each new connection: WAL journal (readers never wait for the
+  writer), synchronous, mmap_size, cache_size and busy_timeout.
+- Transactions start with BEGIN IMMEDIATE: a writer waits for the write lock (busy_timeout) when it begins, instead
+  of failing with "database is locked" when a read transaction is upgraded to a write.
+- Statements run outside a transaction, and BEGIN, are retried settings.SQLITE_WRITE_RETRIES times when the database
+  is still locked after busy_timeout. Statements inside a transaction are not retried: the transaction fails.
+- Connections of an alias with "READ_ONLY": True are query only, for the reads of safe requests (config.routers).
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3.base import Database, DatabaseWrapper as SQLiteDatabaseWrapper, SQLiteCursorWrapper
+
+RETRY_DELAY = 0.05  # in seconds, doubled on each retry
+
+
+def is_locked(error: Exception) -> bool:
+    # "database is locked", or "database table is locked" with a shared cache
+    return 'locked' in str(error)
+
+
+class RetryCursorWrapper(SQLiteCursorWrapper):
+
+    def execute(self, query, params=None):
+        return self.retry_on_lock(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self.retry_on_lock(super().executemany, query, param_list)
+
+    def retry_on_lock(self, execute, *args):
+        for attempt in range(settings.SQLITE_WRITE_RETRIES + 1):
+            try:
+                return execute(*args)
+            except Database.OperationalError as e:
+                if not is_locked(e) or self.connection.in_transaction or attempt == settings.SQLITE_WRITE_RETRIES:
+                    raise
+
+            time.sleep(random.uniform(0, RETRY_DELAY * 2 ** attempt))
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+
+    @property
+    def read_only(self) -> bool:
+        return bool(self.settings_dict.get('READ_ONLY'))
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+
+        if self.read_only:
+            connection.execute('PRAGMA query_only = ON')
+
+        return connection
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=RetryCursorWrapper)
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN' if self.read_only else 'BEGIN IMMEDIATE')
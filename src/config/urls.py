@@ -18,22 +18,25 @@ from django.urls import path, re_path, include
 from django.conf import settings
 from config.conf import ENVIRONMENT
 from django.conf.urls.static import static
-from apis.swagger_schema import swagger_schema_view
-
-
-schema_urls = [
-    # Swagger
-    re_path(
-        r"swagger(?P<format>\.json|\.yaml)$",
-        swagger_schema_view.without_ui(cache_timeout=0),
-        name="schema-json",
-    ),
-    path(
-        "swagger-docs",
-        swagger_schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-]
+
+
+def get_schema_urls() -> list:
+    # Imported here: the schema tooling (drf_yasg views, codecs and inspectors) is not loaded in production
+    from apis.swagger_schema import swagger_schema_view
+
+    return [
+        # Swagger
+        re_path(
+            r"swagger(?P<format>\.json|\.yaml)$",
+            swagger_schema_view.without_ui(cache_timeout=0),
+            name="schema-json",
+        ),
+        path(
+            "swagger-docs",
+            swagger_schema_view.with_ui("swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        ),
+    ]
 
 
 app_urls = [
@@ -45,7 +48,7 @@ if ENVIRONMENT == 'production':
     # We should hide swagger in production
     urlpatterns = app_urls + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    urlpatterns = app_urls + schema_urls + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns = app_urls + get_schema_urls() + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 # Django Admin site settings
 admin.site.site_header = "Backend Documentation Admin"
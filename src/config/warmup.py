@@ -0,0 +1,113 @@
+import importlib
+import pkgutil
+import threading
+import time
+
+import structlog
+from django.apps import apps
+from django.urls import URLResolver, get_resolver
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from config.connections import databases_ready
+
+logger = structlog.getLogger('wz-doc')
+
+_warm = threading.Event()
+_lock = threading.Lock()
+
+
+def resolve_routes(resolver: URLResolver = None) -> int:
+    """
+    Import every URL configuration, compile the route patterns and build the reverse lookups.
+    Return the number of routes.
+    """
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict, resolver.namespace_dict, resolver.app_dict  # noqa: Populated together, on first access
+
+    routes = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex  # noqa: Compiled on first access
+        if isinstance(pattern, URLResolver):
+            routes += resolve_routes(pattern)
+        else:
+            routes += 1
+
+    return routes
+
+
+def build_fields(serializer: BaseSerializer):
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+
+    for field in serializer.fields.values():
+        if isinstance(field, BaseSerializer):
+            build_fields(field)
+
+
+def build_serializers() -> int:
+    """
+    Build the fields of every serializer of apis.serializers, like the first request using it would: the model
+    _meta caches, the field mappings and the modules DRF imports lazily are loaded.
+    Return the number of serializers.
+    """
+    import apis.serializers
+
+    serializers = 0
+    for module_info in pkgutil.iter_modules(apis.serializers.__path__):
+        module = importlib.import_module(f'{apis.serializers.__name__}.{module_info.name}')
+        for serializer_class in vars(module).values():
+            if isinstance(serializer_class, type) and issubclass(serializer_class, BaseSerializer) \
+                    and serializer_class.__module__ == module.__name__:
+                build_fields(serializer_class())
+                serializers += 1
+
+    return serializers
+
+
+def load_caches():
+    """
+    Fill the caches the first requests read: the content types (permissions) and the documentation structure
+    generation, which also opens the connection to the cache server.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from docs.catalogue import get_structure_generation
+
+    ContentType.objects.get_for_models(*apps.get_models())
+    get_structure_generation()
+
+
+def warm_up() -> bool:
+    """
+    Do in this worker the work its first requests would do otherwise: resolve the routes, build the serializers,
+    open the database connections and load the hot caches. Run by gunicorn (post_worker_init, see gunicorn.conf.py)
+    or by the ASGI lifespan startup (config.asgi) before the worker accepts requests.
+
+    Return True once the worker is warm, see is_warm(). A failure is logged and the worker starts anyway: the
+    readiness probe (apis.health) reports it unavailable and tries again.
+    """
+    with _lock:
+        if _warm.is_set():
+            return True
+
+        start = time.perf_counter()
+        try:
+            routes = resolve_routes()
+            serializers = build_serializers()
+            if not databases_ready():
+                logger.warning('WARM_UP-DATABASE_UNAVAILABLE')
+                return False
+            load_caches()
+        except Exception as e:
+            logger.exception('WARM_UP-ERROR', error=str(e))
+            return False
+
+        _warm.set()
+        logger.info(
+            'WARM_UP-DONE', routes=routes, serializers=serializers,
+            duration_ms=round((time.perf_counter() - start) * 1000, 1)
+        )
+        return True
+
+
+def is_warm() -> bool:
+    return _warm.is_set()
@@ -0,0 +1,184 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from docs.catalogue import bump_structure_generation
+from docs.changes import insert_changes, object_changes, record_changes
+from docs.models import Page, Part
+from users.access import access_loss_changes
+from users.models import User, ExpiringGrant
+from utils.choices import ChangeActions
+
+BULK_DOCS_MAX_ITEMS = 1000
+
+
+def page_codename(version_name: str, page_name: str) -> str:
+    return f"{version_name.lower()}-{page_name.lower().replace(' ', '_')}"
+
+
+def part_codename(version_name: str, page_name: str, part_name: str) -> str:
+    return f"{page_codename(version_name, page_name)}-{part_name.lower().replace(' ', '_')}"
+
+
+def switch_version_group(permission_ids: list, old_groups: set, new_group: int = None):
+    """
+    Move permissions from the Groups of their old Versions to the Group of their new Version:
+    one DELETE and one INSERT on the group permissions through table, whatever the number of permissions
+    """
+    through = Group.permissions.through
+    old_groups = old_groups - {None, new_group}
+
+    if not permission_ids:
+        return
+
+    if old_groups:
+        through.objects.filter(permission_id__in=permission_ids, group_id__in=old_groups).delete()
+
+    if new_group is not None:
+        through.objects.bulk_create(
+            [through(group_id=new_group, permission_id=permission_id) for permission_id in permission_ids],
+            batch_size=1000, ignore_conflicts=True
+        )
+
+
+def raw_delete(queryset) -> int:
+    """
+    Delete the rows of the queryset with one DELETE: they are not loaded, no signal is sent and no cascade is
+    followed, so the rows pointing to them must be deleted first. Return the number of rows deleted
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_permissions(permission_ids: list):
+    """
+    Delete doc Permissions, their Group and User links and their expiring grants: one DELETE per table.
+    The Versions, Pages and Parts of the permissions must be deleted first, and the accesses lost read before
+    (users.access.access_loss_changes), so that the deletions still reach their readers
+    """
+    for model in (Group.permissions.through, User.user_permissions.through, ExpiringGrant):
+        raw_delete(model.objects.filter(permission_id__in=permission_ids))
+    raw_delete(Permission.objects.filter(id__in=permission_ids))
+
+
+def delete_pages(page_ids: list) -> dict:
+    """
+    Delete Pages, their Parts and the Permissions of both with one DELETE per table, and log the deletions and the
+    accesses lost with one bulk INSERT. Return the number of pages and parts deleted
+    """
+    with transaction.atomic():
+        pages = list(Page.objects.filter(id__in=page_ids).values_list('id', 'permission_id'))
+        parts = list(Part.objects.filter(page_id__in=page_ids).values_list('id', 'permission_id'))
+        permission_ids = [permission_id for _, permission_id in pages + parts if permission_id is not None]
+        changes = access_loss_changes(permissions=permission_ids)
+
+        parts_deleted = raw_delete(Part.objects.filter(page_id__in=page_ids))
+        pages_deleted = raw_delete(Page.objects.filter(id__in=page_ids))
+        delete_permissions(permission_ids)
+        insert_changes(changes + object_changes([
+            *(Page(pk=pk, permission_id=permission_id) for pk, permission_id in pages),
+            *(Part(pk=pk, permission_id=permission_id) for pk, permission_id in parts),
+        ], ChangeActions.DELETED))
+
+    bump_structure_generation()
+    return {'pages': pages_deleted, 'parts': parts_deleted}
+
+
+def delete_parts(part_ids: list) -> dict:
+    """
+    Delete Parts and their Permissions with one DELETE per table, and log the deletions and the accesses lost
+    with one bulk INSERT. Return the number of parts deleted
+    """
+    with transaction.atomic():
+        parts = list(Part.objects.filter(id__in=part_ids).values_list('id', 'permission_id'))
+        permission_ids = [permission_id for _, permission_id in parts if permission_id is not None]
+        changes = access_loss_changes(permissions=permission_ids)
+
+        deleted = raw_delete(Part.objects.filter(id__in=part_ids))
+        delete_permissions(permission_ids)
+        insert_changes(changes + object_changes(
+            [Part(pk=pk, permission_id=permission_id) for pk, permission_id in parts], ChangeActions.DELETED
+        ))
+
+    bump_structure_generation()
+    return {'parts': deleted}
+
+
+def move_pages(page_ids: list, version) -> dict:
+    """
+    Move Pages (and so their Parts) to another Version.
+    The pages are moved with one UPDATE, the codenames of their permissions and of their parts' permissions are
+    rewritten with a bulk UPDATE, and the permissions switch Version Group with one DELETE and one INSERT.
+    The pages and their parts get a new revision.
+    Return the number of pages and parts moved
+    """
+    pages = list(
+        Page.objects.filter(id__in=page_ids).exclude(version=version).select_related('permission', 'version')
+    )
+    parts = list(Part.objects.filter(page__in=pages).select_related('permission', 'page'))
+
+    permissions = []
+    for page in pages:
+        if page.permission is not None:
+            page.permission.codename = page_codename(version.name, page.name)
+            page.permission.name = f"{version.name} - {page.name}"
+            permissions.append(page.permission)
+
+    for part in parts:
+        if part.permission is not None:
+            part.permission.codename = part_codename(version.name, part.page.name, part.name)
+            part.permission.name = f"{version.name} - {part.page.name} - {part.name}"
+            permissions.append(part.permission)
+
+    with transaction.atomic():
+        now = timezone.now()
+        moved = Page.objects.filter(id__in=[page.id for page in pages]).update(
+            version=version, revision=F('revision') + 1, updated_at=now
+        )
+        # The permission codenames of their parts change: so do the parts' revisions, and their ETags
+        Part.objects.filter(id__in=[part.id for part in parts]).update(revision=F('revision') + 1, updated_at=now)
+        Permission.objects.bulk_update(permissions, ['codename', 'name'], batch_size=1000)
+        switch_version_group(
+            [permission.id for permission in permissions], {page.version.group_id for page in pages}, version.group_id
+        )
+        # The permissions of their parts changed too
+        record_changes([*pages, *parts], ChangeActions.UPDATED)
+
+    bump_structure_generation()
+    return {'pages': moved, 'parts': len(parts)}
+
+
+def move_parts(part_ids: list, page) -> dict:
+    """
+    Move Parts to another Page, possibly of another Version.
+    The parts are moved with one UPDATE, the codenames of their permissions are rewritten with a bulk UPDATE, and
+    the permissions of the parts changing Version switch Version Group with one DELETE and one INSERT.
+    Return the number of parts moved
+    """
+    version = page.version
+    parts = list(
+        Part.objects.filter(id__in=part_ids).exclude(page=page).select_related('permission', 'page__version')
+    )
+
+    permissions, switched = [], []
+    for part in parts:
+        if part.permission is not None:
+            part.permission.codename = part_codename(version.name, page.name, part.name)
+            part.permission.name = f"{version.name} - {page.name} - {part.name}"
+            permissions.append(part.permission)
+            if part.page.version_id != version.id:
+                switched.append(part.permission_id)
+
+    with transaction.atomic():
+        moved = Part.objects.filter(id__in=[part.id for part in parts]).update(
+            page=page, revision=F('revision') + 1, updated_at=timezone.now()
+        )
+        Permission.objects.bulk_update(permissions, ['codename', 'name'], batch_size=1000)
+        switch_version_group(
+            switched, {part.page.version.group_id for part in parts if part.page.version_id != version.id},
+            version.group_id
+        )
+        record_changes(parts, ChangeActions.UPDATED)
+
+    bump_structure_generation()
+    return {'parts': moved}
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db.models import CharField, Q, Value
+
+from docs.models import Version, Page, Part
+
+STRUCTURE_GENERATION_KEY = 'docs:structure-generation'
+CATALOGUE_CACHE_TIMEOUT = 60 * 5  # Bound the staleness when the cache is not shared between workers (locmem)
+
+
+def get_structure_generation() -> int:
+    """
+    Counter bumped each time a Version, Page or Part is created, renamed, moved or deleted.
+    Cached data depending on the documentation structure should be keyed by it.
+    """
+    return cache.get_or_set(STRUCTURE_GENERATION_KEY, 1, timeout=None)
+
+
+def bump_structure_generation():
+    try:
+        cache.incr(STRUCTURE_GENERATION_KEY)
+    except ValueError:
+        cache.set(STRUCTURE_GENERATION_KEY, 1, timeout=None)
+
+
+def permission_catalogue(version: int = None, page: int = None, codename: str = None, after: tuple = None,
+                         limit: int = 100) -> list:
+    """
+    List permissions of Versions, Pages and Parts ordered by (codename, permission_id), in one UNION query.
+
+    :param version: only permissions of this version, its pages and its parts
+    :param page: only permissions of this page and its parts
+    :param codename: codename prefix
+    :param after: (codename, permission_id) of the last row of the previous page (keyset pagination)
+    :param limit: max number of rows
+    :return: list of dict with keys kind ('versions', 'pages' or 'parts'), permission_id and permission__codename
+    """
+    filters = Q(permission__isnull=False)
+    if codename:
+        filters &= Q(permission__codename__startswith=codename)
+    if after is not None:
+        filters &= Q(permission__codename__gt=after[0]) | Q(permission__codename=after[0], permission_id__gt=after[1])
+
+    branches = []
+    if page is None:
+        versions = Version.objects.filter(filters)
+        if version is not None:
+            versions = versions.filter(id=version)
+        branches.append(versions.annotate(kind=Value('versions', output_field=CharField())))
+
+    pages = Page.objects.filter(filters)
+    parts = Part.objects.filter(filters)
+    if version is not None:
+        pages = pages.filter(version_id=version)
+        parts = parts.filter(page__version_id=version)
+    if page is not None:
+        pages = pages.filter(id=page)
+        parts = parts.filter(page_id=page)
+    branches.append(pages.annotate(kind=Value('pages', output_field=CharField())))
+    branches.append(parts.annotate(kind=Value('parts', output_field=CharField())))
+
+    branches = [branch.values('permission_id', 'permission__codename', 'kind').order_by() for branch in branches]
+    queryset = branches[0].union(*branches[1:], all=True).order_by('permission__codename', 'permission_id')
+
+    return list(queryset[:limit])
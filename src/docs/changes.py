@@ -0,0 +1,195 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import CharField, F, Q, Value
+
+from docs.events import change_event, hub
+from docs.models import Change, ChangeSequence, Version, Page, Part
+from utils.choices import AccessKinds, ChangeActions, DocKinds
+
+MODEL_KINDS = {Version: DocKinds.VERSIONS, Page: DocKinds.PAGES, Part: DocKinds.PARTS}
+KIND_MODELS = {kind: model for model, kind in MODEL_KINDS.items()}
+
+
+def next_sequences(count: int) -> int:
+    """
+    Reserve `count` change sequences, return the first one. Run in the transaction inserting the changes: the
+    UPDATE locks the counter row until the commit, so a transaction waits for the previous one to commit before
+    getting its sequences. A client which has seen a sequence can not miss a lower one committed later, which
+    an autoincrement id (given at INSERT time) does not guarantee.
+    """
+    counter = ChangeSequence.objects.all()
+    if not counter.update(value=F('value') + count):
+        # The counter row is created by the migrations, it is missing only from a flushed database
+        ChangeSequence.objects.create(value=count)
+
+    return counter.values_list('value', flat=True).get() - count + 1
+
+
+def insert_changes(changes: list):
+    """
+    Give their sequences to unsaved Change rows and insert them with one bulk INSERT
+    """
+    if not changes:
+        return
+
+    with transaction.atomic(savepoint=False):
+        first = next_sequences(len(changes))
+        for i, change in enumerate(changes):
+            change.sequence = first + i
+        Change.objects.bulk_create(changes, batch_size=1000)
+
+
+def record_change(instance, action: str):
+    with transaction.atomic(savepoint=False):
+        Change.objects.create(
+            sequence=next_sequences(1), kind=MODEL_KINDS[type(instance)], object_id=instance.pk,
+            permission_id=instance.permission_id, action=action
+        )
+
+
+def object_changes(instances: list, action: str) -> list:
+    """
+    Unsaved Change rows of the same change of many objects, for insert_changes()
+    """
+    return [
+        Change(kind=MODEL_KINDS[type(instance)], object_id=instance.pk, permission_id=instance.permission_id,
+               action=action)
+        for instance in instances
+    ]
+
+
+def record_changes(instances: list, action: str):
+    """
+    Log the same change for many objects with one bulk INSERT (bulk operations do not send model signals)
+    """
+    insert_changes(object_changes(instances, action))
+
+
+def permission_objects(permission_ids) -> list:
+    """
+    (kind, id, permission_id) of the Versions, Pages and Parts of the permissions, with one UNION query
+    """
+    branches = [
+        model.objects.filter(permission_id__in=permission_ids)
+        .annotate(change_kind=Value(kind, output_field=CharField()))
+        .values_list('change_kind', 'id', 'permission_id').order_by()
+        for model, kind in MODEL_KINDS.items()
+    ]
+    return list(branches[0].union(*branches[1:], all=True))
+
+
+def changes_since(cursor: int, limit: int, user=None) -> list:
+    """
+    Changes logged after the cursor (a Change sequence), oldest first, as (sequence, kind, object_id, action,
+    permission_id) tuples: the changes of every object and the access changes of the user.
+    Read from the sequence index only, so an up-to-date client costs one cheap query.
+    """
+    objects = Q(user__isnull=True, kind__in=KIND_MODELS)
+    changes = Change.objects.filter(Q(sequence__gt=cursor), objects | Q(user=user) if user is not None else objects)
+
+    return list(
+        changes.order_by('sequence').values_list('sequence', 'kind', 'object_id', 'action', 'permission_id')[:limit]
+    )
+
+
+def expand_access_changes(rows: list) -> list:
+    """
+    Replace each access change of a user (a permission or a group granted or revoked) by the same change of the
+    Versions, Pages and Parts of the permission, or of the permissions of the group, at the same sequence.
+    Two queries whatever the number of access changes: the permissions of the groups, then their objects.
+    """
+    access = [row for row in rows if row[1] not in KIND_MODELS]
+    if not access:
+        return rows
+
+    group_permissions = {}
+    groups = {object_id for _, kind, object_id, _, _ in access if kind == AccessKinds.GROUPS}
+    if groups:
+        links = Group.permissions.through.objects.filter(group_id__in=groups).values_list('group_id', 'permission_id')
+        for group_id, permission_id in links:
+            group_permissions.setdefault(group_id, []).append(permission_id)
+
+    permissions = {object_id for _, kind, object_id, _, _ in access if kind == AccessKinds.PERMISSIONS}
+    permissions.update(permission_id for ids in group_permissions.values() for permission_id in ids)
+    objects = {}
+    for kind, object_id, permission_id in permission_objects(permissions):
+        objects.setdefault(permission_id, []).append((kind, object_id))
+
+    expanded = []
+    for sequence, kind, object_id, action, permission_id in rows:
+        if kind in KIND_MODELS:
+            expanded.append((sequence, kind, object_id, action, permission_id))
+            continue
+
+        permission_ids = group_permissions.get(object_id, []) if kind == AccessKinds.GROUPS else [object_id]
+        expanded += [
+            (sequence, object_kind, id_, action, permission_id)
+            for permission_id in permission_ids for object_kind, id_ in objects.get(permission_id, [])
+        ]
+
+    return expanded
+
+
+def lost_permission_ids(user, cursor: int, group_ids) -> set:
+    """
+    Permissions the user could read before a revocation or a deletion logged after the cursor: revoked from the
+    user, or lost by one of its groups (`group_ids`, or revoked from the user since) with the deletion of their
+    objects. Two queries.
+    """
+    revoked = list(
+        Change.objects.filter(sequence__gt=cursor, user=user, action=ChangeActions.REVOKED)
+        .values_list('kind', 'object_id')
+    )
+    permissions = {object_id for kind, object_id in revoked if kind == AccessKinds.PERMISSIONS}
+    groups = set(group_ids) | {object_id for kind, object_id in revoked if kind == AccessKinds.GROUPS}
+    permissions.update(
+        Change.objects.filter(
+            sequence__gt=cursor, user__isnull=True, kind=AccessKinds.GROUPS, object_id__in=groups,
+            action=ChangeActions.REVOKED
+        ).values_list('permission_id', flat=True)
+    )
+
+    return permissions
+
+
+def last_sequence() -> int:
+    return Change.objects.order_by('-sequence').values_list('sequence', flat=True).first() or 0
+
+
+def publish_changes_since(cursor: int, limit: int = 1000) -> tuple:
+    """
+    Push the changes committed after the cursor, by any process, to the live subscriptions of this process
+    (docs.events). The changes are read in commit order, so none is missed. The permissions lost by groups are
+    not events: they only tell the change feed who could read deleted objects.
+    Return (new cursor, True if there may be more changes to read).
+    """
+    rows = list(
+        Change.objects.filter(sequence__gt=cursor).order_by('sequence')
+        .values_list('sequence', 'kind', 'object_id', 'action', 'permission_id', 'user_id')[:limit]
+    )
+
+    for sequence, kind, object_id, action, permission_id, user_id in rows:
+        if user_id is not None or kind in KIND_MODELS:
+            hub.publish(change_event(sequence, kind, object_id, action, permission_id, user_id))
+
+    return (rows[-1][0] if rows else cursor), len(rows) == limit
+
+
+def collapse_changes(rows) -> tuple:
+    """
+    Keep the last change of each object. An update does not undo a revocation: the user still can not read it.
+    Return ({kind: [ids created, updated or granted]}, {kind: [ids deleted or revoked]})
+    """
+    last_actions = {}
+    for _, kind, object_id, action, _ in rows:
+        if action == ChangeActions.UPDATED and last_actions.get((kind, object_id)) == ChangeActions.REVOKED:
+            continue
+        last_actions[(kind, object_id)] = action
+
+    upserted = {kind: [] for kind in KIND_MODELS}
+    deleted = {kind: [] for kind in KIND_MODELS}
+    for (kind, object_id), action in last_actions.items():
+        removed = action in (ChangeActions.DELETED, ChangeActions.REVOKED)
+        (deleted if removed else upserted)[kind].append(object_id)
+
+    return upserted, deleted
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import structlog
+
+logger = structlog.getLogger('wz-doc')
+
+# Put in place of the pending events of a subscription that fell behind
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """
+    Bounded queue of the events pushed to one connection, read from its event loop
+    """
+
+    def __init__(self, loop, queue_size: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def put(self, event: dict):
+        """
+        Called in the event loop of the subscription.
+        Backpressure: a subscription which can not keep up loses its pending events and gets a single RESYNC, so
+        a slow client never makes the queue (and the memory) grow, and never slows down the publishers.
+        The client then catches up from the change feed (/api/docs/changes/?since=<last cursor>).
+        """
+        if self.overflowed:
+            return
+
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning('DOC_EVENTS-SLOW_SUBSCRIPTION', queue_size=self.queue.maxsize)
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class EventHub:
+    """
+    In-memory channel layer: fan out documentation change events to the subscriptions of this process.
+
+    Events are published from any thread and delivered to each subscription in its own event loop. They are read
+    from the change feed (see apis.docs.events.ChangeTail), so each process pushes the changes committed by every
+    process (worker) to its own subscriptions.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, loop, queue_size: int) -> Subscription:
+        subscription = Subscription(loop, queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: dict):
+        event = {**event, 'published_at': time.monotonic()}
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The loop of the subscription is closed
+                self.unsubscribe(subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+hub = EventHub()
+
+
+def change_event(sequence: int, kind: str, object_id: int, action: str, permission_id, user_id=None) -> dict:
+    """
+    Event of a change of the feed (docs.models.Change). `user_id` is set for the access changes of a user.
+    """
+    return {
+        'type': 'change',
+        'cursor': sequence,
+        'kind': kind,
+        'id': object_id,
+        'action': action,
+        'permission_id': permission_id,
+        'user_id': user_id,
+    }
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from drf_yasg.errors import SwaggerValidationError
+from rest_framework.settings import api_settings
+
+from apis.swagger_schema import generate_schema, SCHEMA_VALIDATORS
+
+
+class Command(BaseCommand):
+    help = "Generate and validate the OpenAPI schema once, so that it is served from memory at runtime"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output', dest='output', default=None,
+            help='Output file. Default to settings.OPENAPI_SCHEMA_FILE'
+        )
+        parser.add_argument(
+            '--check', action='store_true', dest='check', default=False,
+            help='Only validate the schema, do not write it (used in CI)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            content = generate_schema(api_settings.DEFAULT_VERSION, validators=SCHEMA_VALIDATORS)
+        except SwaggerValidationError as e:
+            raise CommandError(f'OpenAPI schema is not valid: {e}')
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS('OpenAPI schema is valid'))
+            return
+
+        output = Path(options['output'] or settings.OPENAPI_SCHEMA_FILE)
+        output.write_bytes(content)
+        self.stdout.write(self.style.SUCCESS(f'OpenAPI schema written to {output} ({len(content)} bytes)'))
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker imports before it serves its first request: the application and the URL configuration
+WORKER_STARTUP = {
+    'wsgi': 'import config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns',
+    'asgi': 'import config.asgi; from django.urls import get_resolver; get_resolver().url_patterns',
+}
+
+
+def parse_importtime(output: str) -> list:
+    """
+    Parse the report of `python -X importtime`: return (module, self, cumulative) tuples, times in microseconds
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_time, cumulative, module = line[len('import time:'):].split('|')
+        modules.append((module.strip(), int(self_time), int(cumulative)))
+
+    return modules
+
+
+def group_by_package(modules: list) -> list:
+    """
+    Sum the self time of the modules of each top-level package: (package, self, self) tuples
+    """
+    packages = defaultdict(int)
+    for module, self_time, _ in modules:
+        packages[module.split('.')[0]] += self_time
+
+    return [(package, self_time, self_time) for package, self_time in packages.items()]
+
+
+class Command(BaseCommand):
+    help = "Report the import time of each module loaded by a worker before its first request (python -X importtime)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=WORKER_STARTUP.keys(), dest='server', default='wsgi',
+            help='Application loaded by the worker'
+        )
+        parser.add_argument(
+            '--top', type=int, dest='top', default=30,
+            help='Number of modules reported'
+        )
+        parser.add_argument(
+            '--sort', choices=('cumulative', 'self'), dest='sort', default='cumulative',
+            help='cumulative: with the imports of the module, self: the module only'
+        )
+        parser.add_argument(
+            '--packages', action='store_true', dest='packages', default=False,
+            help='Report the self time of the top-level packages instead of the modules'
+        )
+
+    def handle(self, *args, **options):
+        # A new interpreter, as cold as a new worker
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_STARTUP[options['server']]],
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+            cwd=settings.BASE_DIR.parent, capture_output=True, text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f'The worker failed to start:\n{process.stderr[-2000:]}')
+
+        modules = parse_importtime(process.stderr)
+        total = sum(self_time for _, self_time, _ in modules)
+        rows = group_by_package(modules) if options['packages'] else modules
+        rows = sorted(rows, key=lambda row: row[1 if options['sort'] == 'self' else 2], reverse=True)
+
+        self.stdout.write(
+            f"Worker start ({options['server']}, {settings.SETTINGS_MODULE}): "
+            f"{len(modules)} modules imported in {total / 1000:.1f} ms"
+        )
+        self.stdout.write(f"{'cumulative':>12} {'self':>10}   {'package' if options['packages'] else 'module'}")
+        for name, self_time, cumulative in rows[:options['top']]:
+            self.stdout.write(f'{cumulative / 1000:>9.1f} ms {self_time / 1000:>7.1f} ms   {name}')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from config.connections import wait_for_databases
+
+
+class Command(BaseCommand):
+    help = "Wait until the databases accept connections, before the migrations and the server start"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, dest='timeout', default=30,
+            help='Seconds to wait before failing'
+        )
+        parser.add_argument(
+            '--interval', type=float, dest='interval', default=1,
+            help='Seconds between two checks'
+        )
+
+    def handle(self, *args, **options):
+        if not wait_for_databases(options['timeout'], options['interval']):
+            raise CommandError(f"The databases are not ready after {options['timeout']} seconds")
+
+        self.stdout.write(self.style.SUCCESS('The databases are ready'))
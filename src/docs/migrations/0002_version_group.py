@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-19 01:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('docs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='group',
+            field=models.OneToOneField(blank=True, help_text='Group giving access to the Version, its Pages and Parts', null=True, on_delete=django.db.models.deletion.SET_NULL, to='auth.group'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def link_version_group(apps, schema_editor):
+    """
+    Versions used to find their Group by name: link each Version to the Group named after it
+    """
+    Version = apps.get_model('docs', 'Version')
+    Group = apps.get_model('auth', 'Group')
+
+    groups = {group.name.lower(): group.id for group in Group.objects.all()}
+    for version in Version.objects.filter(group__isnull=True).only('id', 'name'):
+        group_id = groups.get(version.name.lower())
+        if group_id is not None:
+            Version.objects.filter(id=version.id).update(group_id=group_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0002_version_group'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_version_group, migrations.RunPython.noop),
+    ]
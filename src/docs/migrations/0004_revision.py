@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0003_link_version_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
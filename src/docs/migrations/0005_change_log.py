@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+def log_existing_docs(apps, schema_editor):
+    """
+    Log the existing Versions, Pages and Parts as created, so that a first sync (no cursor) gets all of them
+    """
+    Change = apps.get_model('docs', 'Change')
+    db_alias = schema_editor.connection.alias
+
+    for kind, model in (('versions', 'Version'), ('pages', 'Page'), ('parts', 'Part')):
+        ids = apps.get_model('docs', model).objects.using(db_alias).order_by('id').values_list('id', flat=True)
+        Change.objects.using(db_alias).bulk_create(
+            [Change(kind=kind, object_id=object_id, action='created') for object_id in ids.iterator()],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0004_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('versions', 'Versions'), ('pages', 'Pages'), ('parts', 'Parts')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(log_existing_docs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.2 on 2026-10-19 02:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+import django.db.models.deletion
+
+
+def number_existing_changes(apps, schema_editor):
+    """
+    The existing changes keep their id as sequence, so that the cursors already given to the clients stay valid
+    """
+    Change = apps.get_model('docs', 'Change')
+    ChangeSequence = apps.get_model('docs', 'ChangeSequence')
+    db_alias = schema_editor.connection.alias
+
+    Change.objects.using(db_alias).update(sequence=F('id'))
+    last = Change.objects.using(db_alias).aggregate(last=Max('sequence'))['last']
+    ChangeSequence.objects.using(db_alias).create(value=last or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('docs', '0005_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='sequence',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='change',
+            name='action',
+            field=models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted'), ('granted', 'Granted'), ('revoked', 'Revoked')], max_length=10),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='change',
+            name='sequence',
+            field=models.BigIntegerField(unique=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-19 03:15
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def set_existing_permissions(apps, schema_editor):
+    """
+    The changes of the existing objects get their permission. Those of the objects already deleted keep none: their
+    deletion is only sent to the staff
+    """
+    Change = apps.get_model('docs', 'Change')
+    db_alias = schema_editor.connection.alias
+
+    for kind, model_name in (('versions', 'Version'), ('pages', 'Page'), ('parts', 'Part')):
+        model = apps.get_model('docs', model_name)
+        Change.objects.using(db_alias).filter(kind=kind).update(permission_id=Subquery(
+            model.objects.using(db_alias).filter(id=OuterRef('object_id')).values('permission_id')[:1]
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0006_change_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='change',
+            name='permission_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='change',
+            name='kind',
+            field=models.CharField(choices=[('versions', 'Versions'), ('pages', 'Pages'), ('parts', 'Parts'), ('permissions', 'Permissions'), ('groups', 'Groups')], max_length=11),
+        ),
+        migrations.RunPython(set_existing_permissions, migrations.RunPython.noop),
+    ]
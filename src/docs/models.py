@@ -1,12 +1,92 @@
 from django.db import models
-from django.contrib.auth.models import Permission
+from django.contrib.auth.models import Permission, Group
+
+from utils.choices import AccessKinds, ChangeActions, DocKinds
 # Create your models here.
 
 
-class Version(models.Model):
+class DocStructureMixin:
+    """
+    Remember the fields that define the documentation structure (name, parent, permission) as loaded from the
+    database, so that a save can tell whether the structure changed or only the content
+    """
+    structure_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_structure()
+        return instance
+
+    def remember_structure(self):
+        self._loaded_structure = self.get_structure()
+
+    def get_structure(self) -> tuple:
+        return tuple(self.__dict__.get(field) for field in self.structure_fields)
+
+    @property
+    def structure_changed(self) -> bool:
+        return getattr(self, '_loaded_structure', None) != self.get_structure()
+
+
+class RevisionConflict(Exception):
+    """
+    Raised when a row was updated by another request since the revision expected by the update
+    """
+
+
+class RevisionedModel(models.Model):
+    """
+    Row version used for optimistic concurrency.
+    `save(expected_revision=n)` updates the row with a single `UPDATE ... WHERE revision = n` (no lock held) and
+    raises RevisionConflict if another update happened since revision n was read.
+    """
+    revision = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, expected_revision=None, **kwargs):
+        if expected_revision is None or self._state.adding:
+            return super().save(*args, **kwargs)
+
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = [*kwargs['update_fields'], 'revision']
+
+        self._expected_revision = expected_revision
+        self.revision = expected_revision + 1
+        try:
+            super().save(*args, **kwargs)
+        except RevisionConflict:
+            self.revision = expected_revision
+            raise
+        finally:
+            del self._expected_revision
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_revision = getattr(self, '_expected_revision', None)
+        if expected_revision is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+        updated = super()._do_update(
+            base_qs.filter(revision=expected_revision), using, pk_val, values, update_fields, forced_update
+        )
+        if not updated:
+            raise RevisionConflict(f'{self._meta.verbose_name.title()} was modified by another request')
+
+        return updated
+
+
+class Version(DocStructureMixin, RevisionedModel):
+    structure_fields = ('name', 'permission_id')
+
     name = models.CharField(max_length=50, unique=True)
     description = models.CharField(max_length=500, null=True, blank=True)
     permission = models.OneToOneField(Permission, on_delete=models.CASCADE, null=True, blank=True)
+    group = models.OneToOneField(
+        Group, on_delete=models.SET_NULL, null=True, blank=True,
+        help_text="Group giving access to the Version, its Pages and Parts"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -20,7 +100,9 @@ class Version(models.Model):
         super(Version, self).save(*args, **kwargs)
 
 
-class Page(models.Model):
+class Page(DocStructureMixin, RevisionedModel):
+    structure_fields = ('name', 'version_id', 'permission_id')
+
     name = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
     is_under_maintenance = models.BooleanField(default=False, help_text="Is the Page under maintenance. If Yes, A Custom message should be shown")
@@ -43,7 +125,9 @@ class Page(models.Model):
     #     return Part.objects.filter(page=self)
 
 
-class Part(models.Model):
+class Part(DocStructureMixin, RevisionedModel):
+    structure_fields = ('name', 'page_id', 'permission_id')
+
     name = models.CharField(max_length=200)
     content = models.TextField()
     page = models.ForeignKey(Page, on_delete=models.CASCADE)
@@ -59,3 +143,39 @@ class Part(models.Model):
         self.name = self.name.title()
 
         super(Part, self).save(*args, **kwargs)
+
+
+class Change(models.Model):
+    """
+    Change log of Versions, Pages and Parts, read by the clients keeping an offline copy of the documentation.
+    The sequence is the sync cursor: a client asks for the changes after the last sequence it has seen.
+    It is taken from ChangeSequence, not from the id, so that it follows the commit order (see docs.changes).
+
+    Changes with a user are access changes of that user only: a permission or a group (AccessKinds) granted to it
+    or revoked from it. Access changes without a user are the permissions a group lost when their objects were
+    deleted. The feed of a user expands its access changes to the objects of the permissions.
+
+    The permission of a Version, Page or Part is kept on its changes, so that its deletion is only sent to the
+    users who could read it.
+    """
+    sequence = models.BigIntegerField(unique=True)
+    kind = models.CharField(max_length=11, choices=DocKinds.CHOICES + AccessKinds.CHOICES)
+    object_id = models.PositiveIntegerField()
+    permission_id = models.PositiveIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=ChangeActions.CHOICES)
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.sequence} {self.action} {self.kind} {self.object_id}'
+
+
+class ChangeSequence(models.Model):
+    """
+    Single row counter of the Change sequences. The row is locked from the increment to the commit of the
+    transaction logging changes, so the sequences are given in commit order.
+    """
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.value)
@@ -0,0 +1,48 @@
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from docs.catalogue import bump_structure_generation
+from docs.changes import insert_changes, record_change
+from docs.models import Version, Page, Part
+from users.access import access_loss_changes
+from utils.choices import ChangeActions
+
+
+@receiver(post_save, sender=Version)
+@receiver(post_save, sender=Page)
+@receiver(post_save, sender=Part)
+def doc_saved(sender, instance, created, **kwargs):
+    if created or instance.structure_changed:
+        bump_structure_generation()
+
+    instance.remember_structure()
+    record_change(instance, ChangeActions.CREATED if created else ChangeActions.UPDATED)
+
+
+@receiver(post_delete, sender=Version)
+@receiver(post_delete, sender=Page)
+@receiver(post_delete, sender=Part)
+def doc_deleted(sender, instance, **kwargs):
+    record_change(instance, ChangeActions.DELETED)
+
+
+@receiver(pre_delete, sender=Permission)
+def permission_deleting(sender, instance, **kwargs):
+    # Read before the Collector deletes the Group and User links of the permission
+    insert_changes(access_loss_changes(permissions=[instance.pk]))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    insert_changes(access_loss_changes(groups=[instance.pk]))
+
+
+@receiver(post_delete, sender=Version)
+@receiver(post_delete, sender=Page)
+@receiver(post_delete, sender=Part)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def doc_structure_changed(sender, **kwargs):
+    # Doc permissions carry the codenames listed in the permission catalogue
+    bump_structure_generation()
@@ -0,0 +1,95 @@
+"""
+Gunicorn settings, read from the src folder by scripts/run_app.sh (`gunicorn`). They are set by the environment,
+see the "Gunicorn" section of config/conf.py.
+
+The app is loaded once by the master (preload_app) and its objects are moved to the permanent generation of the
+garbage collector (gc.freeze) before the workers are forked. The workers then share these memory pages with the
+master (copy-on-write) instead of each importing Django, DRF, drf_yasg and structlog again.
+
+Each worker is warmed up (config.warmup) once it has loaded the app, before it accepts requests: the first requests
+after a deploy or a restart (max_requests) do not pay for cold routes, serializers, connections and caches.
+"""
+import gc
+import multiprocessing
+
+from config.conf import GUNICORN_BIND, GUNICORN_WORKER_CLASS, GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_PRELOAD, \
+    GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER, GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, \
+    GUNICORN_KEEPALIVE
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+APPLICATIONS = {
+    'sync': 'config.wsgi:application',
+    'gthread': 'config.wsgi:application',
+    'uvicorn': 'config.asgi:application',  # With async read views and live doc events
+}
+
+
+def default_workers(worker_class: str, cpus: int) -> int:
+    """
+    Sync workers serve one request at a time and wait on the database: 2 per CPU, plus one.
+    gthread and uvicorn workers serve several requests each: one per CPU (plus one for gthread).
+    """
+    if worker_class == 'sync':
+        return 2 * cpus + 1
+    if worker_class == 'gthread':
+        return cpus + 1
+
+    return cpus
+
+
+if GUNICORN_WORKER_CLASS not in WORKER_CLASSES:
+    raise ValueError(f'GUNICORN_WORKER_CLASS should be one of {", ".join(WORKER_CLASSES)}')
+
+wsgi_app = APPLICATIONS[GUNICORN_WORKER_CLASS]
+bind = GUNICORN_BIND
+worker_class = WORKER_CLASSES[GUNICORN_WORKER_CLASS]
+workers = GUNICORN_WORKERS or default_workers(GUNICORN_WORKER_CLASS, multiprocessing.cpu_count())
+threads = GUNICORN_THREADS if GUNICORN_WORKER_CLASS == 'gthread' else 1
+
+preload_app = GUNICORN_PRELOAD
+reload = False
+
+# Recycle the workers to bound memory growth, not all at the same time
+max_requests = GUNICORN_MAX_REQUESTS
+max_requests_jitter = GUNICORN_MAX_REQUESTS_JITTER
+
+timeout = GUNICORN_TIMEOUT
+graceful_timeout = GUNICORN_GRACEFUL_TIMEOUT
+keepalive = GUNICORN_KEEPALIVE
+
+if preload_app:
+    # No collection while the app is loaded: the collector would touch (and copy) the pages of the shared objects
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+
+    # Connections opened while loading the app must not be shared by the workers
+    from django.db import connections
+    connections.close_all()
+
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    """
+    Runs in the worker once the app is loaded (post_fork runs before when the app is not preloaded).
+    Uvicorn workers are warmed up by the ASGI lifespan instead, in the thread of the sync views (see config.asgi).
+    """
+    from django.conf import settings
+    from config.warmup import warm_up
+
+    if settings.WARM_UP and GUNICORN_WORKER_CLASS != 'uvicorn':
+        warm_up()
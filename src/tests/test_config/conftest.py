@@ -0,0 +1,23 @@
+import pytest
+from django.contrib.auth.models import Permission
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from docs.models import Version, Page, Part
+
+
+@pytest.fixture
+def client_api():
+    return APIClient()
+
+
+@pytest.fixture
+def list_parts():
+   version = baker.make(Version, name='Version1', permission=baker.make(Permission))
+   page = baker.make(Page, version=version, permission=baker.make(Permission))
+
+   parts = [
+      baker.make(Part, page=page, name=f'Part {i}', content='Some documentation content. ' * 20, permission=baker.make(Permission))
+      for i in range(5)
+   ]
+   return parts
@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apis.docs.page import PageViewSet
+from utils.async_views import async_read_view
+
+
+def thread_name_view(request):
+    return HttpResponse(threading.current_thread().name)
+
+
+@pytest.mark.async_views
+class TestAsyncReadView:
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('method,pooled', [('get', True), ('head', True), ('post', False)])
+    def test_only_reads_should_run_in_the_read_pool(self, method, pooled):
+        request = getattr(APIRequestFactory(), method)('/')
+
+        response = async_to_sync(async_read_view(thread_name_view))(request)
+
+        assert response.content.decode().startswith('docs-read') is pooled
+
+    @pytest.mark.django_db(transaction=True)
+    def test_response_should_be_the_same_as_the_sync_view(self, admin_user, list_parts):
+        page = list_parts[0].page
+        view = PageViewSet.as_view({'get': 'parts'})
+        request = APIRequestFactory().get(f'/api/docs/pages/{page.id}/parts/')
+        force_authenticate(request, user=admin_user)
+
+        expected = view(request, pk=page.id).render()
+        response = async_to_sync(async_read_view(view))(request, pk=page.id)
+
+        assert response.status_code == 200
+        assert response.content == expected.content
@@ -0,0 +1,116 @@
+import gzip
+
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+
+from config import middlewares
+from config.middlewares import negotiate_encoding
+
+
+@pytest.mark.compression
+class TestNegotiateEncoding:
+
+    @pytest.mark.parametrize(
+        "accept_encoding,expected",
+        [
+            ('', None),
+            ('identity', None),
+            ('gzip', 'gzip'),
+            ('deflate, gzip;q=0.5', 'gzip'),
+            ('gzip;q=0', None),
+            ('*', 'gzip'),
+            ('br;q=1.0, *;q=0', None),
+        ]
+    )
+    def test_negotiation(self, accept_encoding, expected, mocker):
+        mocker.patch.dict(middlewares.COMPRESSORS, {'gzip': middlewares.COMPRESSORS['gzip']}, clear=True)
+
+        assert negotiate_encoding(accept_encoding) == expected
+
+    def test_best_quality_should_win_over_server_preference(self):
+        assert negotiate_encoding('gzip;q=1, br;q=0.5, zstd;q=0.1') == 'gzip'
+
+
+@pytest.mark.compression
+class TestCompressionMiddleware:
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        caches[settings.COMPRESSION_CACHE_ALIAS].clear()
+
+    def url(self, list_parts):
+        return f'/api/docs/pages/{list_parts[0].page.id}/parts/'
+
+    @pytest.mark.django_db
+    def test_response_should_be_gzipped(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        raw = client_api.get(self.url(list_parts))
+        response = client_api.get(self.url(list_parts), HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['ETag'].startswith('W/')
+        assert 'Accept-Encoding' in response['Vary']
+        assert gzip.decompress(response.content) == raw.content
+        assert len(response.content) < len(raw.content)
+
+    @pytest.mark.django_db
+    def test_doc_response_should_be_compressed_once(self, client_api, admin_user, list_parts, mocker):
+        client_api.force_authenticate(user=admin_user)
+        compress = mocker.spy(middlewares, 'compress')
+
+        first = client_api.get(self.url(list_parts), HTTP_ACCEPT_ENCODING='gzip')
+        second = client_api.get(self.url(list_parts), HTTP_ACCEPT_ENCODING='gzip')
+
+        assert first.content == second.content
+        assert compress.call_count == 1
+
+    @pytest.mark.django_db
+    def test_objects_with_the_same_revision_should_not_share_compressed_bodies(self, client_api, admin_user,
+                                                                               list_parts, mocker):
+        client_api.force_authenticate(user=admin_user)
+        mocker.patch.object(settings, 'COMPRESSION_MIN_SIZE', 1)
+        part = list_parts[0]
+
+        page = client_api.get(f'/api/docs/pages/{part.page_id}/', HTTP_ACCEPT_ENCODING='gzip')
+        version = client_api.get(f'/api/docs/versions/{part.page.version_id}/', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert page['ETag'] == version['ETag'] == 'W/"1"'
+        assert gzip.decompress(page.content) != gzip.decompress(version.content)
+
+    @pytest.mark.django_db
+    def test_not_modified_should_be_returned_with_etag(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url(list_parts), HTTP_ACCEPT_ENCODING='gzip')
+
+        response = client_api.get(self.url(list_parts), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        assert response.status_code == 304
+
+    @pytest.mark.django_db
+    def test_small_response_should_not_be_compressed(self, client_api, admin_user, list_parts, mocker):
+        client_api.force_authenticate(user=admin_user)
+        mocker.patch.object(settings, 'COMPRESSION_MIN_SIZE', 100000)
+
+        response = client_api.get(self.url(list_parts), HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response.status_code == 200
+        assert not response.has_header('Content-Encoding')
+
+    @pytest.mark.django_db
+    def test_response_should_not_be_compressed_if_not_accepted(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url(list_parts))
+
+        assert not response.has_header('Content-Encoding')
+        assert 'Accept-Encoding' in response['Vary']
+
+    @pytest.mark.django_db
+    def test_streaming_response_should_be_gzipped(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        raw = client_api.get(self.url(list_parts) + '?stream=true')
+        response = client_api.get(self.url(list_parts) + '?stream=true', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(b''.join(response.streaming_content)) == b''.join(raw.streaming_content)
@@ -0,0 +1,68 @@
+import time
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connections
+
+from config import connections as config_connections
+from config.connections import check_connections
+
+
+def fake_connection(idle: float, usable: bool = True):
+    connection = mock.Mock(in_atomic_block=False, released_at=time.monotonic() - idle)
+    connection.is_usable.return_value = usable
+    return connection
+
+
+@pytest.mark.connections
+class TestCheckConnections:
+
+    def test_idle_broken_connection_should_be_closed(self, mocker):
+        connection = fake_connection(idle=settings.DATABASE_HEALTH_CHECK_IDLE + 1, usable=False)
+        mocker.patch.object(config_connections.connections, 'all', return_value=[connection])
+
+        check_connections()
+
+        connection.close.assert_called_once()
+
+    def test_recently_used_connection_should_not_be_pinged(self, mocker):
+        connection = fake_connection(idle=0)
+        mocker.patch.object(config_connections.connections, 'all', return_value=[connection])
+
+        check_connections()
+
+        connection.is_usable.assert_not_called()
+        connection.close.assert_not_called()
+
+
+@pytest.mark.connections
+class TestReadiness:
+    url = '/api/health/ready/'
+
+    @pytest.mark.django_db
+    def test_ready_database_should_work(self, client_api):
+        response = client_api.get(self.url)
+
+        assert response.status_code == 200
+        assert response.json() == {'status': 'ready', 'code': '200'}
+
+    @pytest.mark.django_db
+    def test_unavailable_database_should_return_503(self, client_api, mocker):
+        connection = connections['default']
+        mocker.patch.object(connection, 'is_usable', return_value=False)
+        mocker.patch.object(connection, 'close')
+        mocker.patch.object(connection, 'ensure_connection', side_effect=OperationalError('connection refused'))
+
+        response = client_api.get(self.url)
+
+        assert response.status_code == 503
+        assert response.json()['status'] == 'unavailable'
+
+    def test_wait_for_database_should_fail_after_timeout(self, mocker):
+        mocker.patch.object(config_connections, 'databases_ready', return_value=False)
+
+        with pytest.raises(CommandError):
+            call_command('wait_for_database', timeout=0, interval=0)
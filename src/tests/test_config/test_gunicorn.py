@@ -0,0 +1,28 @@
+import gc
+import runpy
+
+import pytest
+from django.conf import settings
+
+
+@pytest.fixture
+def gunicorn_conf():
+    try:
+        yield runpy.run_path(str(settings.BASE_DIR.parent / 'gunicorn.conf.py'))
+    finally:
+        gc.enable()  # Disabled by the preload of the master
+
+
+@pytest.mark.gunicorn
+class TestGunicornConf:
+
+    @pytest.mark.parametrize('worker_class,expected', [('sync', 9), ('gthread', 5), ('uvicorn', 4)])
+    def test_workers_should_be_derived_from_cpus(self, gunicorn_conf, worker_class, expected):
+        assert gunicorn_conf['default_workers'](worker_class, cpus=4) == expected
+
+    def test_default_profile_should_preload_the_wsgi_app(self, gunicorn_conf):
+        assert gunicorn_conf['wsgi_app'] == 'config.wsgi:application'
+        assert gunicorn_conf['worker_class'] == 'sync'
+        assert gunicorn_conf['preload_app'] is True
+        assert gunicorn_conf['reload'] is False
+        assert gunicorn_conf['max_requests_jitter'] > 0
@@ -0,0 +1,69 @@
+import datetime
+import decimal
+import uuid
+from collections import OrderedDict
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from config import backends
+from config.backends import FastJSONRenderer, CustomJSONRenderer
+
+
+@pytest.fixture
+def payload():
+    return {
+        'data': [
+            OrderedDict(
+                id=uuid.UUID('4fa85f64-5717-4562-b3fc-2c963f66afa6'),
+                name='Pàge\u2028 1',
+                created_at=datetime.datetime(2023, 3, 1, 10, 20, 30, 123456, tzinfo=datetime.timezone.utc),
+                day=datetime.date(2023, 3, 1),
+                price=decimal.Decimal('10.50'),
+                permission=None,
+            )
+        ],
+        'code': '200',
+    }
+
+
+@pytest.mark.renderer
+class TestFastJSONRenderer:
+
+    def test_output_should_be_the_same_than_drf_renderer(self, payload):
+        assert FastJSONRenderer().render(payload) == JSONRenderer().render(payload)
+
+    def test_should_fall_back_to_drf_renderer_without_orjson(self, payload, mocker):
+        mocker.patch.object(backends, 'orjson', None)
+
+        assert FastJSONRenderer().render(payload) == JSONRenderer().render(payload)
+
+    def test_indent_should_be_supported(self, payload):
+        rendered = FastJSONRenderer().render(payload, 'application/json; indent=4')
+
+        assert rendered == JSONRenderer().render(payload, 'application/json; indent=4')
+
+    def test_none_should_render_empty_body(self):
+        assert FastJSONRenderer().render(None) == b''
+
+
+@pytest.mark.renderer
+class TestCustomJSONRenderer:
+
+    def test_envelope_should_reuse_data(self, payload):
+        rendered = CustomJSONRenderer().render(payload)
+
+        assert rendered == JSONRenderer().render({'data': payload['data'], 'code': '200', 'message': None})
+        assert 'code' in payload  # the view data is not mutated
+
+    def test_envelope_should_extract_code_and_message(self, mocker):
+        response = mocker.Mock(status_code=400)
+        rendered = CustomJSONRenderer().render({'message': 'error', 'code': '400'}, renderer_context={'response': response})
+
+        assert rendered == b'{"data":{},"code":"400","message":"error"}'
+
+    def test_envelope_should_use_status_code_by_default(self, mocker):
+        response = mocker.Mock(status_code=200)
+        rendered = CustomJSONRenderer().render([1, 2], renderer_context={'response': response})
+
+        assert rendered == b'{"data":[1,2],"code":"0200","message":null}'
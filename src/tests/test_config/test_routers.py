@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.http import HttpResponse
+from model_bakery import baker
+from rest_framework.test import APIRequestFactory
+
+from config.middlewares import ReplicaMiddleware
+from config.routers import ReplicaRouter, uses_replica
+from docs.models import Page, Part, Version
+from users.models import User
+
+
+@pytest.fixture
+def replica(mocker):
+    mocker.patch.object(settings, 'DATABASE_REPLICAS', ['replica'])
+    caches[settings.PRIMARY_STICKY_CACHE_ALIAS].clear()
+    yield 'replica'
+    caches[settings.PRIMARY_STICKY_CACHE_ALIAS].clear()
+
+
+def version_names(response) -> list:
+    return [version['name'] for version in response.data['results']['data']]
+
+
+@pytest.mark.replicas
+class TestReplicaRouter:
+    url = '/api/docs/versions/'
+
+    @pytest.mark.parametrize('method,path,expected', [
+        ('get', '/api/docs/versions/', True),
+        ('head', '/api/users/', True),
+        ('post', '/api/docs/versions/', False),
+        ('patch', '/api/docs/pages/1/', False),
+        ('get', '/api/auth/', False),
+        ('get', '/admin/', False),
+    ])
+    def test_only_safe_requests_of_doc_and_user_endpoints_should_use_replica(self, replica, method, path, expected):
+        request = getattr(APIRequestFactory(), method)(path)
+
+        assert uses_replica(request) is expected
+
+    def test_without_replicas_everything_should_use_primary(self):
+        assert uses_replica(APIRequestFactory().get(self.url)) is False
+
+    @pytest.mark.django_db(databases=['default', 'replica'])
+    def test_safe_requests_should_read_from_replica(self, client_api, admin_user, replica):
+        baker.make(Version, name='Primary', permission=baker.make(Permission))
+        baker.make(Version, name='Replica', permission=baker.make(Permission, _using=replica), _using=replica)
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url)
+
+        assert response.status_code == 200
+        assert version_names(response) == ['Replica']
+
+    @pytest.mark.django_db(databases=['default', 'replica'])
+    def test_readers_should_be_read_from_replica(self, client_api, admin_user, replica):
+        version = baker.make(Version, permission=baker.make(Permission, _using=replica), _using=replica)
+        page = baker.make(Page, version=version, permission=baker.make(Permission, _using=replica), _using=replica)
+        part = baker.make(Part, page=page, permission=baker.make(Permission, _using=replica), _using=replica)
+        reader = baker.make(User, username='reader', _using=replica)
+        User.user_permissions.through.objects.using(replica).create(user=reader, permission=part.permission)
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(f'/api/docs/parts/{part.id}/readers/')
+
+        assert response.status_code == 200
+        assert [reader['username'] for reader in response.data['results']['data']] == ['reader']
+
+    @pytest.mark.django_db(databases=['default', 'replica'])
+    def test_client_should_stick_to_primary_after_its_write(self, client_api, admin_user, replica, mocker):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.post(self.url, data={'name': 'v2'}, format='json')
+        assert response.status_code == 201
+        assert version_names(client_api.get(self.url)) == ['V2']
+
+        # Another client still reads from the replica
+        other_client = APIRequestFactory().get(self.url, HTTP_AUTHORIZATION='Bearer other')
+        assert uses_replica(other_client) is True
+
+        # Once the window is over, the client reads from the replica again
+        caches[settings.PRIMARY_STICKY_CACHE_ALIAS].clear()
+        assert version_names(client_api.get(self.url)) == []
+
+    @pytest.mark.django_db(databases=['default', 'replica'])
+    def test_reads_outside_requests_should_use_primary(self, replica):
+        baker.make(Version, name='Primary', permission=baker.make(Permission))
+
+        assert list(Version.objects.values_list('name', flat=True)) == ['Primary']
+
+    def test_async_requests_should_be_routed_in_their_context(self, replica):
+        router = ReplicaRouter()
+        reads = []
+
+        def sync_view(request):
+            reads.append(router.db_for_read(Version))
+            router.db_for_write(Version)
+            reads.append(router.db_for_read(Version))
+            return HttpResponse()
+
+        async def get_response(request):
+            return await sync_to_async(sync_view)(request)
+
+        middleware = ReplicaMiddleware(get_response)
+        request = APIRequestFactory().get(self.url, HTTP_AUTHORIZATION='Bearer async')
+        async_to_sync(middleware)(request)
+
+        assert asyncio.iscoroutinefunction(middleware) is True
+        assert reads == ['replica', 'default']
+        # The write made in the sync view sticks the client to the primary, and the state is reset
+        assert uses_replica(request) is False
+        assert router.db_for_read(Version) == 'default'
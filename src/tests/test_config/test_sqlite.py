@@ -0,0 +1,95 @@
+import pytest
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from config.sqlite import base
+from config.sqlite.base import DatabaseWrapper
+
+
+@pytest.fixture
+def sqlite_file(tmp_path, mocker):
+    # Locks are not waited for, so that the tests do not wait for busy_timeout
+    mocker.patch.object(settings, 'SQLITE_PRAGMAS', {**settings.SQLITE_PRAGMAS, 'busy_timeout': 0})
+    return {**connections['default'].settings_dict, 'NAME': str(tmp_path / 'db.sqlite3')}
+
+
+@pytest.fixture
+def open_connection(sqlite_file, django_db_blocker):
+    # Connections to a throw-away file, not to the test database
+    wrappers = []
+
+    def open_connection(**settings_dict):
+        wrapper = DatabaseWrapper({**sqlite_file, **settings_dict}, alias=f'sqlite_{len(wrappers)}')
+        wrapper.ensure_connection()
+        wrappers.append(wrapper)
+        return wrapper
+
+    with django_db_blocker.unblock():
+        yield open_connection
+        for wrapper in wrappers:
+            wrapper.close()
+
+
+def pragma(wrapper, name: str):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.sqlite
+class TestSQLiteBackend:
+
+    def test_new_connection_should_be_tuned(self, open_connection):
+        wrapper = open_connection()
+
+        assert pragma(wrapper, 'journal_mode') == 'wal'
+        assert pragma(wrapper, 'synchronous') == 1  # NORMAL
+        assert pragma(wrapper, 'cache_size') == settings.SQLITE_PRAGMAS['cache_size']
+        assert pragma(wrapper, 'query_only') == 0
+
+    def test_read_only_connection_should_not_write(self, open_connection):
+        open_connection().cursor().execute('CREATE TABLE doc (name TEXT)')
+        reader = open_connection(READ_ONLY=True)
+
+        with pytest.raises(OperationalError):
+            reader.cursor().execute("INSERT INTO doc VALUES ('page')")
+
+    def test_transaction_should_take_the_write_lock_when_it_begins(self, open_connection, mocker):
+        mocker.patch.object(settings, 'SQLITE_WRITE_RETRIES', 0)
+        writer = open_connection()
+        writer.cursor().execute('CREATE TABLE doc (name TEXT)')
+        other_writer = open_connection()
+
+        writer._start_transaction_under_autocommit()
+
+        with pytest.raises(OperationalError, match='locked'):
+            other_writer.cursor().execute("INSERT INTO doc VALUES ('page')")
+        writer.cursor().execute('ROLLBACK')
+
+    def test_locked_write_should_be_retried(self, open_connection, mocker):
+        writer = open_connection()
+        writer.cursor().execute('CREATE TABLE doc (name TEXT)')
+        other_writer = open_connection()
+        writer._start_transaction_under_autocommit()
+        # The first writer commits while the second one waits
+        sleep = mocker.patch.object(base.time, 'sleep', side_effect=lambda _: writer.cursor().execute('COMMIT'))
+
+        other_writer.cursor().execute("INSERT INTO doc VALUES ('page')")
+
+        assert sleep.call_count == 1
+        with writer.cursor() as cursor:
+            cursor.execute('SELECT name FROM doc')
+            assert cursor.fetchall() == [('page',)]
+
+    def test_locked_write_should_fail_after_retries(self, open_connection, mocker):
+        writer = open_connection()
+        writer.cursor().execute('CREATE TABLE doc (name TEXT)')
+        other_writer = open_connection()
+        writer._start_transaction_under_autocommit()
+        sleep = mocker.patch.object(base.time, 'sleep')
+
+        with pytest.raises(OperationalError, match='locked'):
+            other_writer.cursor().execute("INSERT INTO doc VALUES ('page')")
+
+        assert sleep.call_count == settings.SQLITE_WRITE_RETRIES
+        writer.cursor().execute('ROLLBACK')
@@ -0,0 +1,43 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from docs.management.commands.startup_profile import parse_importtime, group_by_package
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     django.utils.version
+import time:       250 |        550 |   django
+import time:      1000 |       1000 |     rest_framework.views
+import time:       200 |       1200 |   rest_framework
+"""
+
+
+@pytest.mark.startup
+class TestStartupProfile:
+
+    def test_importtime_report_should_be_parsed(self):
+        assert parse_importtime(IMPORTTIME) == [
+            ('_io', 120, 120),
+            ('django.utils.version', 300, 300),
+            ('django', 250, 550),
+            ('rest_framework.views', 1000, 1000),
+            ('rest_framework', 200, 1200),
+        ]
+
+    def test_modules_should_be_grouped_by_package(self):
+        assert sorted(group_by_package(parse_importtime(IMPORTTIME))) == [
+            ('_io', 120, 120), ('django', 550, 550), ('rest_framework', 1200, 1200),
+        ]
+
+    def test_worker_start_should_be_profiled(self):
+        output = StringIO()
+
+        call_command('startup_profile', top=5, stdout=output)
+
+        lines = output.getvalue().splitlines()
+        assert lines[0].startswith('Worker start (wsgi, config.settings.testing)')
+        assert len(lines) == 2 + 5
+        assert 'config.wsgi' in output.getvalue()
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.urls import get_resolver
+
+from config import asgi, warmup
+
+
+@pytest.fixture
+def cold_worker(mocker):
+    mocker.patch.object(warmup, '_warm', threading.Event())
+
+
+def lifespan(messages: list) -> list:
+    """
+    Run the ASGI app with a lifespan scope, receiving `messages`. Return the messages sent
+    """
+    sent = []
+    messages = iter(messages)
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message)
+
+    async_to_sync(asgi.application)({'type': 'lifespan'}, receive, send)
+    return sent
+
+
+@pytest.mark.warmup
+class TestWarmUp:
+
+    @pytest.mark.django_db
+    def test_warm_up_should_resolve_routes_and_build_serializers(self, cold_worker, mocker):
+        build_fields = mocker.spy(warmup, 'build_fields')
+
+        assert warmup.warm_up() is True
+
+        assert warmup.is_warm()
+        assert get_resolver()._populated
+        serializers = {type(call.args[0]).__name__ for call in build_fields.call_args_list}
+        assert {'VersionResponseSerializer', 'PageWithPartSerializer', 'UserFullSerializer'} <= serializers
+
+    def test_warm_up_should_run_once(self, cold_worker, mocker):
+        warmup._warm.set()
+        resolve_routes = mocker.patch.object(warmup, 'resolve_routes')
+
+        assert warmup.warm_up() is True
+
+        resolve_routes.assert_not_called()
+
+    def test_unavailable_database_should_keep_the_worker_cold(self, cold_worker, mocker):
+        mocker.patch.object(warmup, 'databases_ready', return_value=False)
+
+        assert warmup.warm_up() is False
+
+        assert not warmup.is_warm()
+
+    @pytest.mark.django_db
+    def test_readiness_should_wait_for_the_warm_up(self, client_api, cold_worker, mocker):
+        mocker.patch.object(settings, 'WARM_UP', True)
+        mocker.patch.object(warmup, 'load_caches', side_effect=RuntimeError('cache server unavailable'))
+
+        response = client_api.get('/api/health/ready/')
+
+        assert response.status_code == 503
+        assert response.json() == {'status': 'warming up', 'code': '503'}
+
+        mocker.patch.object(warmup, 'load_caches')
+        assert client_api.get('/api/health/ready/').status_code == 200
+
+    def test_asgi_lifespan_should_warm_up_before_startup_completes(self, mocker):
+        mocker.patch.object(settings, 'WARM_UP', True)
+        warm_up = mocker.patch.object(asgi, 'warm_up')
+
+        sent = lifespan([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+
+        warm_up.assert_called_once_with()
+        assert sent == [{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}]
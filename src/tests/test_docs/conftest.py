@@ -21,6 +21,12 @@ def inactivated_user():
    return user
 
 
+@pytest.fixture
+def version_group():
+   # Group created with the Version 'Version1' and linked to it
+   return Group.objects.get_or_create(name='Version1')[0]
+
+
 @pytest.fixture
 def single_user_without_group():
    user = baker.make(User, is_staff=False, is_superuser=False)
@@ -30,11 +36,11 @@ def single_user_without_group():
 
 
 @pytest.fixture
-def single_user_with_group():
+def single_user_with_group(version_group):
    user = baker.make(User, is_staff=False, is_superuser=False)
    user.set_password('mike')
    user.save()
-   group = baker.make(Group, _quantity=1, name='Version1')[0]
+   group = version_group
    group.user_set.add(user)
    group.permissions.add(
       baker.make(Permission, _quantity=1, id=37)[0]
@@ -49,11 +55,11 @@ def single_user_with_group():
 
 
 @pytest.fixture
-def single_user_with_group():
+def single_user_with_group(version_group):
    user = baker.make(User, is_staff=False, is_superuser=False)
    user.set_password('mike')
    user.save()
-   group = baker.make(Group, _quantity=1, name='Version1')[0]
+   group = version_group
    group.user_set.add(user)
    group.permissions.add(
       baker.make(Permission, _quantity=1, id=37)[0]
@@ -68,10 +74,10 @@ def single_user_with_group():
 
 
 @pytest.fixture
-def single_doc_version():
+def single_doc_version(version_group):
    perm = baker.make(Permission, _quantity=1, id=37)[0]
 
-   version = baker.make(Version, _quantity=1, name='Version1', permission=perm)
+   version = baker.make(Version, _quantity=1, name='Version1', permission=perm, group=version_group)
    return version
 
 
@@ -82,18 +88,18 @@ def single_permission():
 
 
 @pytest.fixture
-def list_pages():
+def list_pages(version_group):
    version_perm = baker.make(Permission, _quantity=1, id=37)[0]
 
-   version = baker.make(Version, _quantity=1, name='Version1', permission=version_perm)
+   version = baker.make(Version, _quantity=1, name='Version1', permission=version_perm, group=version_group)
    pages = baker.make(Page, _quantity=1, version=version[0], permission=baker.make(Permission, _quantity=1)[0])
    return pages
 
 
 @pytest.fixture
-def list_parts():
+def list_parts(version_group):
    version = baker.make(
-      Version, _quantity=1, name='Version1',
+      Version, _quantity=1, name='Version1', group=version_group,
       permission=baker.make(Permission, _quantity=1, id=37)[0]
    )[0]
    page = baker.make(
@@ -110,9 +116,9 @@ def list_parts():
 
 
 @pytest.fixture
-def list_parts_with_other_perms():
+def list_parts_with_other_perms(version_group):
    version = baker.make(
-      Version, _quantity=1, name='Version1',
+      Version, _quantity=1, name='Version1', group=version_group,
       permission=baker.make(Permission, _quantity=1, id=50)[0]
    )[0]
    page = baker.make(
@@ -135,7 +141,13 @@ def other_perms():
 
 
 @pytest.fixture
-def single_group():
-   group = baker.make(Group, _quantity=1, name='Version1')
-   return group
+def single_group(version_group):
+   return [version_group]
 
+
+
+@pytest.fixture
+def other_version_page():
+   group = baker.make(Group, name='Version2')
+   version = baker.make(Version, name='Version2', group=group, permission=baker.make(Permission, id=60))
+   return baker.make(Page, name='Target', version=version, permission=baker.make(Permission, id=61))
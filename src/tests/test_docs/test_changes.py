@@ -0,0 +1,237 @@
+import pytest
+from django.contrib.auth.models import Permission
+from model_bakery import baker
+
+from docs.changes import next_sequences
+from docs.models import Change, Page
+from utils.choices import AccessKinds, ChangeActions, DocKinds
+
+
+@pytest.mark.changes
+class TestChanges:
+    url = '/api/docs/changes/'
+
+    def test_unauthenticated_user_should_not_work(self, client_api):
+        response = client_api.get(self.url)
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_invalid_cursor_should_not_work(self, client_api, admin_user):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url, {'since': 'abc'})
+
+        assert response.status_code == 400
+        assert response.data['code'] == '400'
+
+    @pytest.mark.django_db
+    def test_first_sync_should_return_everything(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        part = list_parts[0]
+
+        response = client_api.get(self.url)
+
+        data = response.data['results']['data']
+        assert response.status_code == 200
+        assert response.data['next'] is None
+        assert [version['id'] for version in data['versions']] == [part.page.version_id]
+        assert [page['id'] for page in data['pages']] == [part.page_id]
+        assert [item['id'] for item in data['parts']] == [part.id]
+        assert data['deleted'] == {'versions': [], 'pages': [], 'parts': []}
+
+    @pytest.mark.django_db
+    def test_up_to_date_sync_should_cost_one_query(self, client_api, admin_user, list_parts, django_assert_num_queries):
+        client_api.force_authenticate(user=admin_user)
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+
+        with django_assert_num_queries(1):
+            response = client_api.get(self.url, {'since': cursor})
+
+        assert response.status_code == 200
+        assert response.data['results']['data'] == {
+            'versions': [], 'pages': [], 'parts': [], 'cursor': cursor,
+            'deleted': {'versions': [], 'pages': [], 'parts': []}
+        }
+
+    @pytest.mark.django_db
+    def test_sync_should_return_updates_and_deletes_since_cursor(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        part = list_parts[0]
+        other_page = baker.make(Page, version=part.page.version, permission=baker.make(Permission))
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+
+        client_api.put(f'/api/docs/parts/{part.id}/', data={'content': 'new'}, format='json')
+        client_api.delete(f'/api/docs/pages/{other_page.id}/')
+        response = client_api.get(self.url, {'since': cursor})
+
+        data = response.data['results']['data']
+        assert [item['content'] for item in data['parts']] == ['new']
+        assert data['pages'] == []
+        assert data['deleted'] == {'versions': [], 'pages': [other_page.id], 'parts': []}
+        assert data['cursor'] > cursor
+
+    @pytest.mark.django_db
+    def test_sync_should_only_return_readable_docs(self, client_api, single_user_with_group, list_parts):
+        client_api.force_authenticate(user=single_user_with_group)
+        part = list_parts[0]
+        hidden_page = baker.make(Page, version=part.page.version, permission=baker.make(Permission))
+
+        response = client_api.get(self.url)
+
+        data = response.data['results']['data']
+        assert [page['id'] for page in data['pages']] == [part.page_id]
+        assert hidden_page.id not in [page['id'] for page in data['pages']]
+        assert [item['id'] for item in data['parts']] == [part.id]
+
+    @pytest.mark.django_db
+    def test_sync_should_be_paginated(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url, {'page_size': 1})
+
+        data = response.data['results']['data']
+        assert len(data['versions']) + len(data['pages']) + len(data['parts']) == 1
+        assert f"since={data['cursor']}" in response.data['next']
+
+    @pytest.mark.django_db
+    def test_cursor_should_follow_the_commit_order_not_the_id(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        part = list_parts[0]
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+        # The first insert gets the lowest id but commits last, so it gets the highest sequence
+        committed_last = Change.objects.create(
+            sequence=cursor + 2, kind=DocKinds.PARTS, object_id=part.id, action=ChangeActions.UPDATED
+        )
+        Change.objects.create(sequence=cursor + 1, kind=DocKinds.PAGES, object_id=part.page_id, action=ChangeActions.UPDATED)
+
+        response = client_api.get(self.url, {'since': cursor + 1})
+
+        data = response.data['results']['data']
+        assert committed_last.id < Change.objects.get(sequence=cursor + 1).id
+        assert [item['id'] for item in data['parts']] == [part.id]
+        assert data['pages'] == []
+        assert data['cursor'] == cursor + 2
+
+    @pytest.mark.django_db
+    def test_sequences_should_be_reserved_together(self, list_parts):
+        first = next_sequences(3)
+
+        assert next_sequences(1) == first + 3
+
+    @pytest.mark.django_db
+    def test_grant_and_revoke_should_be_synced_to_their_user_only(self, client_api, admin_user, single_user_without_group,
+                                                                  list_parts):
+        part = list_parts[0]
+        other_user = baker.make('users.User', is_staff=False, is_superuser=False)
+        client_api.force_authenticate(user=single_user_without_group)
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+        body = {'permissions': [part.permission_id], 'user': single_user_without_group.id}
+
+        client_api.force_authenticate(user=admin_user)
+        client_api.post('/api/docs/access/grant_user_permission/', data=body, format='json')
+        client_api.force_authenticate(user=single_user_without_group)
+        response = client_api.get(self.url, {'since': cursor})
+
+        data = response.data['results']['data']
+        assert [item['id'] for item in data['parts']] == [part.id]
+        assert data['deleted'] == {'versions': [], 'pages': [], 'parts': []}
+        cursor = data['cursor']
+
+        client_api.force_authenticate(user=admin_user)
+        client_api.put(f'/api/docs/parts/{part.id}/', data={'content': 'new'}, format='json')
+        client_api.post('/api/docs/access/deny_user_permission/', data=body, format='json')
+        client_api.force_authenticate(user=single_user_without_group)
+        response = client_api.get(self.url, {'since': cursor})
+
+        data = response.data['results']['data']
+        assert data['parts'] == []
+        assert data['deleted'] == {'versions': [], 'pages': [], 'parts': [part.id]}
+
+        client_api.force_authenticate(user=other_user)
+        response = client_api.get(self.url, {'since': cursor})
+
+        assert response.data['results']['data']['deleted'] == {'versions': [], 'pages': [], 'parts': []}
+
+    @pytest.mark.django_db
+    def test_revoked_group_should_not_remove_what_the_user_still_reads(self, client_api, admin_user,
+                                                                       single_user_with_group, list_parts):
+        part = list_parts[0]
+        single_user_with_group.user_permissions.add(part.permission)
+        client_api.force_authenticate(user=single_user_with_group)
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+
+        client_api.force_authenticate(user=admin_user)
+        client_api.post(
+            '/api/docs/access/deny_user_group/',
+            data={'groups': [part.page.version.group_id], 'user': single_user_with_group.id}, format='json'
+        )
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(self.url, {'since': cursor})
+
+        assert response.data['results']['data']['deleted'] == {
+            'versions': [part.page.version_id], 'pages': [part.page_id], 'parts': []
+        }
+
+    @pytest.mark.django_db
+    def test_bulk_grant_should_log_one_change_per_user_and_permission(self, client_api, admin_user, list_parts):
+        part = list_parts[0]
+        users = baker.make('users.User', is_staff=False, is_superuser=False, _quantity=3)
+        client_api.force_authenticate(user=admin_user)
+
+        client_api.post(
+            '/api/docs/access/bulk_grant_permissions/',
+            data={'users': [str(user.id) for user in users], 'permissions': [part.page.permission_id]}, format='json'
+        )
+
+        assert set(Change.objects.filter(user__isnull=False).values_list('user_id', 'kind', 'object_id')) == {
+            (user.id, AccessKinds.PERMISSIONS, part.page.permission_id) for user in users
+        }
+        client_api.force_authenticate(user=users[0])
+        response = client_api.get(self.url, {'since': Change.objects.filter(user=users[0]).get().sequence - 1})
+        assert [page['id'] for page in response.data['results']['data']['pages']] == [part.page_id]
+
+    @pytest.mark.django_db
+    def test_deletion_should_not_be_synced_to_users_who_could_not_read_it(self, client_api, admin_user,
+                                                                         single_user_with_group, list_parts):
+        hidden_page = baker.make(Page, version=list_parts[0].page.version, permission=baker.make(Permission))
+        client_api.force_authenticate(user=single_user_with_group)
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+
+        client_api.force_authenticate(user=admin_user)
+        client_api.delete(f'/api/docs/pages/{hidden_page.id}/')
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(self.url, {'since': cursor})
+
+        assert response.data['results']['data']['deleted'] == {'versions': [], 'pages': [], 'parts': []}
+
+    @pytest.mark.django_db
+    def test_page_deletion_should_be_synced_to_its_group_readers(self, client_api, admin_user, single_user_with_group,
+                                                                 list_parts):
+        part = list_parts[0]
+        client_api.force_authenticate(user=single_user_with_group)
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+
+        client_api.force_authenticate(user=admin_user)
+        client_api.delete(f'/api/docs/pages/{part.page_id}/')
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(self.url, {'since': cursor})
+
+        assert response.data['results']['data']['deleted'] == {
+            'versions': [], 'pages': [part.page_id], 'parts': [part.id]
+        }
+
+    @pytest.mark.django_db
+    def test_version_deletion_should_be_synced_to_its_group_readers(self, client_api, admin_user,
+                                                                    single_user_with_group, list_parts):
+        part = list_parts[0]
+        client_api.force_authenticate(user=single_user_with_group)
+        cursor = client_api.get(self.url).data['results']['data']['cursor']
+
+        client_api.force_authenticate(user=admin_user)
+        client_api.delete(f'/api/docs/versions/{part.page.version_id}/')
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(self.url, {'since': cursor})
+
+        assert response.data['results']['data']['deleted'] == {
+            'versions': [part.page.version_id], 'pages': [part.page_id], 'parts': [part.id]
+        }
@@ -0,0 +1,178 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from model_bakery import baker
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apis.docs.events import ReaderFilter, change_tail, doc_events
+from docs.changes import last_sequence, publish_changes_since
+from docs.events import RESYNC, EventHub, hub
+from docs.models import Page
+
+
+def scope(token: str = None) -> dict:
+    headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+    return {'type': 'http', 'method': 'GET', 'path': '/api/docs/events/', 'headers': headers}
+
+
+def stream(scope: dict, publish) -> list:
+    """
+    Run the endpoint until it answers, call publish() (in the event loop thread), then disconnect.
+    Return the messages sent
+    """
+    async def run():
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.ensure_future(doc_events(scope, receive, send))
+        while not sent:
+            await asyncio.sleep(0.01)
+
+        if sent[0]['status'] == 200:
+            publish()
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+
+        disconnected.set()
+        await task
+        return sent
+
+    return async_to_sync(run)()
+
+
+def event(permission_id: int, action: str = 'updated', cursor: int = 1, user_id=None, published_at=0) -> dict:
+    return {'type': 'change', 'cursor': cursor, 'kind': 'pages', 'id': 1, 'action': action,
+            'permission_id': permission_id, 'user_id': user_id, 'published_at': published_at}
+
+
+@pytest.mark.changes
+class TestEventHub:
+
+    def test_slow_subscription_should_be_resynced(self):
+        loop = asyncio.new_event_loop()
+        event_hub = EventHub()
+        subscription = event_hub.subscribe(loop, queue_size=2)
+
+        for cursor in range(3):
+            event_hub.publish(event(1, cursor=cursor))
+        loop.run_until_complete(asyncio.sleep(0))
+
+        assert subscription.queue.qsize() == 1
+        assert subscription.queue.get_nowait() is RESYNC
+        loop.close()
+
+    def test_closed_subscription_should_be_removed(self):
+        loop = asyncio.new_event_loop()
+        event_hub = EventHub()
+        event_hub.subscribe(loop, queue_size=2)
+        loop.close()
+
+        event_hub.publish(event(1))
+
+        assert len(event_hub) == 0
+
+    @pytest.mark.django_db
+    def test_committed_changes_should_be_published_from_the_change_feed(self, list_pages):
+        loop = asyncio.new_event_loop()
+        cursor = last_sequence()
+        # Saved in any process: the events are read back from the change feed
+        Page.objects.get(id=list_pages[0].id).save()
+        subscription = hub.subscribe(loop, queue_size=10)
+
+        try:
+            new_cursor, more = publish_changes_since(cursor)
+            loop.run_until_complete(asyncio.sleep(0))
+        finally:
+            hub.unsubscribe(subscription)
+            loop.close()
+
+        published = subscription.queue.get_nowait()
+        assert (published['kind'], published['id'], published['action']) == ('pages', list_pages[0].id, 'updated')
+        assert published['permission_id'] == list_pages[0].permission_id
+        assert (published['cursor'], new_cursor, more) == (cursor + 1, cursor + 1, False)
+        assert publish_changes_since(new_cursor) == (new_cursor, False)
+
+
+@pytest.mark.changes
+class TestReaderFilter:
+
+    @pytest.mark.django_db
+    def test_events_of_unheld_permissions_should_not_reload_permissions(self, single_user_with_group, mocker):
+        reader = ReaderFilter(single_user_with_group)
+        async_to_sync(reader.load)()
+        load = mocker.spy(reader, 'load')
+        hidden_permission = baker.make(Permission)
+
+        for cursor in range(1, 20):
+            hidden = event(hidden_permission.id, cursor=cursor, published_at=reader.loaded_at + cursor)
+            assert async_to_sync(reader.accepts)(hidden) is False
+
+        assert load.call_count == 0
+
+    @pytest.mark.django_db
+    def test_access_changes_should_reload_permissions_of_their_user_only(self, single_user_with_group,
+                                                                         single_user_without_group):
+        permission = baker.make(Permission)
+        reader = ReaderFilter(single_user_without_group)
+        async_to_sync(reader.load)()
+        single_user_without_group.user_permissions.add(permission)
+        granted = event(permission.id, action='granted', user_id=single_user_without_group.id,
+                        published_at=reader.loaded_at + 1)
+
+        assert async_to_sync(ReaderFilter(single_user_with_group).accepts)(granted) is False
+        assert async_to_sync(reader.accepts)(granted) is True
+        assert permission.id in reader.permissions
+
+
+@pytest.mark.changes
+class TestDocEvents:
+
+    @pytest.mark.django_db
+    def test_unauthenticated_user_should_not_work(self):
+        sent = stream(scope(), lambda: None)
+
+        assert sent[0]['status'] == 401
+
+    @pytest.mark.django_db
+    def test_events_should_be_filtered_by_reader_permissions(self, single_user_with_group, list_parts):
+        hidden_permission = baker.make(Permission)
+
+        def publish():
+            hub.publish(event(list_parts[0].permission_id, cursor=1))
+            hub.publish(event(hidden_permission.id, cursor=2))
+            hub.publish(event(hidden_permission.id, action='deleted', cursor=3))
+            hub.publish(event(list_parts[0].permission_id, action='deleted', cursor=4))
+
+        sent = stream(scope(str(AccessToken.for_user(single_user_with_group))), publish)
+
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        assert sent[0]['status'] == 200
+        assert dict(sent[0]['headers'])[b'content-type'] == b'text/event-stream'
+        assert b'id: 1\nevent: updated\n' in body
+        assert b'id: 2\n' not in body
+        assert b'id: 3\n' not in body
+        assert b'id: 4\nevent: deleted\n' in body
+        assert len(hub) == 0
+        assert change_tail.task is None
+
+    @pytest.mark.django_db
+    def test_slow_reader_should_get_resync_and_end(self, admin_user, mocker):
+        mocker.patch.object(settings, 'DOC_EVENTS_QUEUE_SIZE', 1)
+
+        def publish():
+            hub.publish(event(1, cursor=1))
+            hub.publish(event(1, cursor=2))
+
+        sent = stream(scope(str(AccessToken.for_user(admin_user))), publish)
+
+        assert sent[-1] == {'type': 'http.response.body', 'body': b'event: resync\ndata: {}\n\n', 'more_body': False}
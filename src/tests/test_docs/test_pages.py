@@ -1,7 +1,23 @@
+import gzip
+import json
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
 import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from model_bakery import baker
 
-from docs.models import Version, Page
+from docs.models import Change, Version, Page, Part, RevisionConflict
+from users.models import ExpiringGrant, IdempotentResponse
+from utils.choices import ChangeActions, DocKinds
+from utils.decorators import IDEMPOTENCY_IN_PROGRESS, request_fingerprint
 
 
 @pytest.mark.page
@@ -56,7 +72,6 @@ class TestCreate:
         client_api.force_authenticate(user=admin_user)
 
         mocker.patch.object(Version.objects, 'get', return_value=single_doc_version[0], autospec=True)
-        mocker.patch.object(Group.objects, 'get', return_value=single_group[0], autospec=True)
 
         response = client_api.post(self.url, data=test_input, format='json')
 
@@ -67,6 +82,143 @@ class TestCreate:
         assert response.data['data']['version'] == test_input['version']
         assert response.data['data']['permission'] is not None
 
+    @pytest.mark.django_db
+    def test_creation_should_work_after_group_rename(self, client_api, admin_user, single_doc_version, version_group):
+        version_group.name = 'Renamed'
+        version_group.save()
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.post(self.url, data={'name': 'senelec', 'version': single_doc_version[0].id}, format='json')
+
+        assert response.status_code == 201
+        assert version_group.permissions.filter(id=response.data['data']['permission']['id']).exists()
+
+    @pytest.mark.django_db
+    def test_creation_should_work_when_the_version_has_no_group(self, client_api, admin_user, single_doc_version):
+        single_doc_version[0].group.delete()
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.post(self.url, data={'name': 'senelec', 'version': single_doc_version[0].id}, format='json')
+
+        assert response.status_code == 201
+        assert not Permission.objects.get(id=response.data['data']['permission']['id']).group_set.exists()
+
+
+    @pytest.mark.django_db
+    def test_create_should_write_each_row_once_in_one_transaction(self, client_api, admin_user, single_doc_version, django_assert_num_queries, mocker):
+        ContentType.objects.clear_cache()
+        client_api.force_authenticate(user=admin_user)
+        save = mocker.spy(Page, 'save')
+
+        # version, unique name check, content type, savepoint, permission, page, sequence, sequence read, change,
+        # group permission, release
+        with django_assert_num_queries(11):
+            response = client_api.post(self.url, data={'name': 'senelec', 'version': single_doc_version[0].id}, format='json')
+
+        assert response.status_code == 201
+        save.assert_called_once()
+        assert save.call_args.kwargs.get('update_fields') is None
+
+
+    @pytest.mark.django_db
+    def test_retry_with_same_idempotency_key_should_replay_first_response(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        body = {'name': 'senelec', 'version': single_doc_version[0].id}
+        first = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='page-senelec')
+        retry = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='page-senelec')
+
+        assert first.status_code == retry.status_code == 201
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert json.loads(retry.content) == json.loads(first.content)
+        assert Page.objects.count() == 1
+        assert Permission.objects.filter(codename=first.data['data']['permission']['codename']).count() == 1
+
+    @pytest.mark.django_db
+    def test_idempotency_key_reused_for_another_request_should_not_work(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        client_api.post(self.url, data={'name': 'senelec', 'version': single_doc_version[0].id}, format='json', HTTP_IDEMPOTENCY_KEY='key')
+        response = client_api.post(self.url, data={'name': 'other', 'version': single_doc_version[0].id}, format='json', HTTP_IDEMPOTENCY_KEY='key')
+
+        assert response.status_code == 422
+        assert response.data['code'] == '422'
+        assert Page.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_expired_idempotency_key_should_run_the_request_again(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        body = {'name': 'senelec', 'version': single_doc_version[0].id}
+        client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='key')
+        IdempotentResponse.objects.update(created_at=timezone.now() - settings.IDEMPOTENCY_KEY_TTL)
+
+        response = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='key')
+
+        # The Page already exists: the create runs again and fails, server errors are not stored
+        assert response.status_code == 500
+        assert response.has_header('Idempotent-Replayed') is False
+        assert IdempotentResponse.objects.exists() is False
+
+    @pytest.mark.django_db
+    def test_idempotency_key_should_be_reserved_before_the_write(self, client_api, admin_user, single_doc_version, mocker):
+        client_api.force_authenticate(user=admin_user)
+        create_permission = Permission.objects.create
+        reserved = []
+
+        def create(**kwargs):
+            reserved.extend(IdempotentResponse.objects.filter(key='key').values_list('status_code', flat=True))
+            return create_permission(**kwargs)
+
+        mocker.patch.object(Permission.objects, 'create', side_effect=create)
+        response = client_api.post(self.url, data={'name': 'senelec', 'version': single_doc_version[0].id}, format='json', HTTP_IDEMPOTENCY_KEY='key')
+
+        assert response.status_code == 201
+        assert reserved == [IDEMPOTENCY_IN_PROGRESS]
+        assert IdempotentResponse.objects.get(key='key').status_code == 201
+
+    @pytest.mark.django_db
+    def test_retry_during_the_first_request_should_replay_its_response(self, client_api, admin_user, single_doc_version, mocker):
+        client_api.force_authenticate(user=admin_user)
+        body = {'name': 'senelec', 'version': single_doc_version[0].id}
+        first = IdempotentResponse(
+            fingerprint=request_fingerprint(SimpleNamespace(method='POST', path=self.url, data=body)),
+            status_code=201, content=b'{"data":{"name":"Senelec"},"code":"201"}'
+        )
+        # The first request reserved the key after the lookup of the retry, and committed while the retry waited
+        lookup = mocker.patch.object(IdempotentResponse.objects, 'filter')
+        lookup.return_value.first.side_effect = [None, first]
+        mocker.patch.object(IdempotentResponse.objects, 'create', side_effect=IntegrityError('unique constraint'))
+
+        response = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='key')
+
+        assert response.status_code == 201
+        assert response['Idempotent-Replayed'] == 'true'
+        assert Page.objects.exists() is False
+
+    @pytest.mark.django_db
+    def test_retry_of_a_request_in_progress_should_not_work(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        body = {'name': 'senelec', 'version': single_doc_version[0].id}
+        IdempotentResponse.objects.create(
+            user=admin_user, key='key', status_code=IDEMPOTENCY_IN_PROGRESS, content=b'',
+            fingerprint=request_fingerprint(SimpleNamespace(method='POST', path=self.url, data=body)),
+        )
+
+        response = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='key')
+
+        assert response.status_code == 409
+        assert Page.objects.exists() is False
+
+    @pytest.mark.django_db
+    def test_purge_should_delete_expired_idempotency_keys(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        client_api.post(self.url, data={'name': 'senelec', 'version': single_doc_version[0].id}, format='json', HTTP_IDEMPOTENCY_KEY='key')
+        client_api.post(self.url, data={'name': 'other', 'version': single_doc_version[0].id}, format='json', HTTP_IDEMPOTENCY_KEY='key2')
+        IdempotentResponse.objects.filter(key='key').update(created_at=timezone.now() - settings.IDEMPOTENCY_KEY_TTL)
+
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        assert '1 idempotency key(s) purged' in out.getvalue()
+        assert list(IdempotentResponse.objects.values_list('key', flat=True)) == ['key2']
+
 
 @pytest.mark.page
 class TestRetrieve:
@@ -173,6 +325,96 @@ class TestUpdate:
         assert response.data['data']['name'] == body['name'].title()
 
 
+    @pytest.mark.django_db
+    def test_update_should_only_write_changed_fields(self, client_api, admin_user, list_pages, django_assert_num_queries, mocker):
+        client_api.force_authenticate(user=admin_user)
+        save = mocker.spy(Page, 'save')
+
+        # page, unique name check, savepoint, page, sequence, sequence read, change, permission, release
+        with django_assert_num_queries(9):
+            response = client_api.put(f'{self.url}{list_pages[0].id}/', data={'name': 'renamed'}, format='json')
+
+        assert response.status_code == 200
+        assert save.call_args.kwargs['update_fields'] == ['name', 'updated_at']
+        assert save.call_args.kwargs['expected_revision'] == 1
+
+        with django_assert_num_queries(6):
+            client_api.put(f'{self.url}{list_pages[0].id}/', data={'description': 'new'}, format='json')
+
+        assert save.call_args.kwargs['update_fields'] == ['description', 'updated_at']
+        assert save.call_args.kwargs['expected_revision'] == 2
+        list_pages[0].refresh_from_db()
+        assert list_pages[0].revision == 3
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('if_match', ['"1"', 'W/"1"', '1', '*'])
+    def test_update_with_current_if_match_should_work(self, client_api, admin_user, list_pages, if_match):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.put(
+            f'{self.url}{list_pages[0].id}/', data={'description': 'new'}, format='json', HTTP_IF_MATCH=if_match
+        )
+
+        assert response.status_code == 200
+        assert response.data['data']['revision'] == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_update_with_stale_if_match_should_not_work(self, client_api, admin_user, list_pages):
+        client_api.force_authenticate(user=admin_user)
+        Page.objects.filter(id=list_pages[0].id).update(revision=2)
+
+        response = client_api.put(
+            f'{self.url}{list_pages[0].id}/', data={'description': 'new'}, format='json', HTTP_IF_MATCH='"1"'
+        )
+
+        assert response.status_code == 412
+        assert response.data['code'] == '412'
+        assert Page.objects.get(id=list_pages[0].id).description != 'new'
+
+    @pytest.mark.django_db
+    def test_etag_of_retrieve_and_update_should_be_sent_back_in_if_match(self, client_api, admin_user, list_parts):
+        page = list_parts[0].page
+        client_api.force_authenticate(user=admin_user)
+
+        etag = client_api.get(f'{self.url}{page.id}/')['ETag']
+        assert etag == '"1"'
+        assert client_api.get(f'{self.url}{page.id}/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        response = client_api.put(f'{self.url}{page.id}/', data={'description': 'new'}, format='json', HTTP_IF_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] == '"2"'
+
+        response = client_api.put(
+            f'{self.url}{page.id}/', data={'description': 'newer'}, format='json', HTTP_IF_MATCH=response['ETag']
+        )
+        assert response.status_code == 200
+        response = client_api.put(f'{self.url}{page.id}/', data={'description': 'stale'}, format='json', HTTP_IF_MATCH=etag)
+        assert response.status_code == 412
+
+    @pytest.mark.django_db
+    def test_update_with_invalid_if_match_should_not_work(self, client_api, admin_user, list_pages):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.put(
+            f'{self.url}{list_pages[0].id}/', data={'description': 'new'}, format='json', HTTP_IF_MATCH='"abc"'
+        )
+
+        assert response.status_code == 400
+        assert response.data['code'] == '400'
+
+    @pytest.mark.django_db
+    def test_concurrent_update_should_not_overwrite(self, list_pages):
+        first, second = Page.objects.get(id=list_pages[0].id), Page.objects.get(id=list_pages[0].id)
+
+        first.description = 'first'
+        first.save(update_fields=['description'], expected_revision=first.revision)
+        second.description = 'second'
+
+        with pytest.raises(RevisionConflict), transaction.atomic():
+            second.save(update_fields=['description'], expected_revision=second.revision)
+
+        page = Page.objects.get(id=list_pages[0].id)
+        assert (page.description, page.revision, second.revision) == ('first', 2, 1)
+
+
 @pytest.mark.page
 class TestDestroy:
     url = '/api/docs/pages/'
@@ -275,3 +517,151 @@ class TestParts:
 
         response = client_api.get(self.url+f'{list_parts[0].page.id}/parts/')
         assert response.status_code == 200
+
+    @pytest.mark.django_db
+    def test_stream_should_return_all_parts_at_once(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url+f'{list_parts[0].page.id}/parts/?stream=1')
+
+        assert response.status_code == 200
+        content = json.loads(b''.join(response.streaming_content))
+        assert content['code'] == '200'
+        assert [part['id'] for part in content['data']] == [part.id for part in list_parts]
+
+    @pytest.mark.django_db
+    def test_fields_should_only_read_and_return_these_fields(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        with CaptureQueriesContext(connections['default']) as context:
+            response = client_api.get(self.url+f'{list_parts[0].page.id}/parts/?fields=id,name')
+
+        assert response.status_code == 200
+        assert response.json()['results']['data'] == [{'id': part.id, 'name': part.name} for part in list_parts]
+        assert not any('"content"' in query['sql'] for query in context.captured_queries)
+
+    @pytest.mark.django_db
+    def test_omit_should_not_read_omitted_fields(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        with CaptureQueriesContext(connections['default']) as context:
+            response = client_api.get(self.url+f'{list_parts[0].page.id}/parts/?omit=content,permission&stream=1')
+
+        assert response.status_code == 200
+        part = json.loads(b''.join(response.streaming_content))['data'][0]
+        assert set(part) == {'id', 'name', 'page', 'revision', 'created_at', 'updated_at'}
+        assert not any('"content"' in query['sql'] for query in context.captured_queries)
+
+    @pytest.mark.django_db
+    def test_unknown_fields_should_not_work(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url+f'{list_parts[0].page.id}/parts/?fields=id,title')
+
+        assert response.status_code == 400
+        assert response.json()['message'].startswith('Unknown fields: title.')
+
+
+@pytest.mark.page
+class TestBulk:
+    url = '/api/docs/pages/'
+
+    @pytest.mark.django_db
+    def test_not_admin_or_not_staff_user_should_not_work(self, client_api, single_user_without_group, list_pages):
+        client_api.force_authenticate(user=single_user_without_group)
+
+        response = client_api.post(self.url+'bulk_delete/', data={'pages': [list_pages[0].id]}, format='json')
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_bulk_delete_should_delete_pages_parts_and_permissions(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        page = list_parts[0].page
+
+        response = client_api.post(self.url+'bulk_delete/', data={'pages': [page.id]}, format='json')
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'pages': 1, 'parts': 1}
+        assert not Page.objects.filter(id=page.id).exists()
+        assert not Permission.objects.filter(id__in=[page.permission_id, list_parts[0].permission_id]).exists()
+
+    @pytest.mark.django_db
+    def test_bulk_delete_should_use_one_delete_per_table_and_log_the_changes(self, client_api, admin_user, list_parts,
+                                                                             version_group, single_user_without_group,
+                                                                             django_assert_num_queries):
+        client_api.force_authenticate(user=admin_user)
+        page = list_parts[0].page
+        parts = [*list_parts, *(baker.make(Part, page=page, permission=baker.make(Permission)) for _ in range(5))]
+        permissions = [page.permission_id, *(part.permission_id for part in parts)]
+        version_group.permissions.add(*permissions)
+        single_user_without_group.user_permissions.add(*permissions)
+        ExpiringGrant.objects.create(
+            user=single_user_without_group, permission_id=page.permission_id,
+            expires_at=timezone.now() + timedelta(days=1)
+        )
+
+        # validation, savepoint, pages, parts, user and group links lost, DELETE parts and pages, DELETE group links,
+        # user links, expiring grants and permissions, sequence, sequence read, changes, release
+        with django_assert_num_queries(16):
+            response = client_api.post(self.url+'bulk_delete/', data={'pages': [page.id]}, format='json')
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'pages': 1, 'parts': len(parts)}
+        assert not Permission.objects.filter(id__in=permissions).exists()
+        assert not ExpiringGrant.objects.exists()
+        assert set(Change.objects.filter(action=ChangeActions.DELETED).values_list('kind', 'object_id')) == {
+            (DocKinds.PAGES, page.id), *((DocKinds.PARTS, part.id) for part in parts)
+        }
+
+    @pytest.mark.django_db
+    def test_bulk_move_should_rewrite_codenames_and_groups(self, client_api, admin_user, list_parts, version_group,
+                                                           other_version_page):
+        client_api.force_authenticate(user=admin_user)
+        page, part = list_parts[0].page, list_parts[0]
+        version_group.permissions.add(page.permission, part.permission)
+
+        response = client_api.post(
+            self.url+'bulk_move/', data={'pages': [page.id], 'version': other_version_page.version_id}, format='json'
+        )
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'pages': 1, 'parts': 1}
+        page = Page.objects.select_related('permission').get(id=page.id)
+        part_permission = Permission.objects.get(id=part.permission_id)
+        assert page.version_id == other_version_page.version_id
+        assert page.permission.codename == f"version2-{page.name.lower().replace(' ', '_')}"
+        assert part_permission.codename.startswith(f"{page.permission.codename}-")
+        assert set(
+            Group.objects.filter(permissions__in=[page.permission_id, part.permission_id]).values_list('name', flat=True)
+        ) == {'Version2'}
+
+    @pytest.mark.django_db
+    def test_bulk_move_should_change_the_etag_of_the_parts(self, client_api, admin_user, list_parts, other_version_page):
+        client_api.force_authenticate(user=admin_user)
+        part = list_parts[0]
+        before = client_api.get(f'/api/docs/parts/{part.id}/', HTTP_ACCEPT_ENCODING='gzip')
+
+        client_api.post(
+            self.url+'bulk_move/', data={'pages': [part.page_id], 'version': other_version_page.version_id},
+            format='json'
+        )
+
+        stale = client_api.get(f'/api/docs/parts/{part.id}/', HTTP_IF_NONE_MATCH=before['ETag'])
+        after = client_api.get(f'/api/docs/parts/{part.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        assert stale.status_code == 200
+        assert after['ETag'] != before['ETag']
+        assert json.loads(gzip.decompress(after.content))['data']['permission']['codename'].startswith('version2-')
+
+    @pytest.mark.django_db
+    def test_bulk_move_with_name_clash_should_not_work(self, client_api, admin_user, list_pages, other_version_page):
+        client_api.force_authenticate(user=admin_user)
+        Page.objects.filter(id=list_pages[0].id).update(name=other_version_page.name)
+
+        response = client_api.post(
+            self.url+'bulk_move/', data={'pages': [list_pages[0].id], 'version': other_version_page.version_id},
+            format='json'
+        )
+
+        assert response.status_code == 400
+        assert Page.objects.get(id=list_pages[0].id).version_id == list_pages[0].version_id
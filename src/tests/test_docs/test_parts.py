@@ -1,7 +1,10 @@
 import pytest
-from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
 
-from docs.models import Page
+from model_bakery import baker
+
+from docs.models import Page, Part
 
 
 @pytest.mark.part
@@ -66,7 +69,6 @@ class TestCreate:
         client_api.force_authenticate(user=admin_user)
 
         mocker.patch.object(Page.objects, 'get', return_value=list_parts[part].page, autospec=True)
-        mocker.patch.object(Group.objects, 'get', return_value=single_group[0], autospec=True)
 
         body = test_input
         body['page'] = list_parts[part].page.id
@@ -80,6 +82,22 @@ class TestCreate:
         assert response.data['data']['permission'] is not None
 
 
+    @pytest.mark.django_db
+    def test_create_should_write_each_row_once_in_one_transaction(self, client_api, admin_user, list_pages, django_assert_num_queries, mocker):
+        ContentType.objects.clear_cache()
+        client_api.force_authenticate(user=admin_user)
+        save = mocker.spy(Part, 'save')
+
+        # page, unique name check, version, content type, savepoint, permission, part, sequence,
+        # sequence read, change, group permission, release
+        with django_assert_num_queries(12):
+            response = client_api.post(self.url, data={'name': 'intro', 'content': 'Text', 'page': list_pages[0].id}, format='json')
+
+        assert response.status_code == 201
+        save.assert_called_once()
+        assert save.call_args.kwargs.get('update_fields') is None
+
+
 @pytest.mark.part
 class TestRetrieve:
     url = '/api/docs/parts/'
@@ -200,6 +218,28 @@ class TestUpdate:
         assert response.data['data']['page'] == body['page']
 
 
+    @pytest.mark.django_db
+    def test_update_should_only_write_changed_fields(self, client_api, admin_user, list_parts, django_assert_num_queries, mocker):
+        client_api.force_authenticate(user=admin_user)
+        save = mocker.spy(Part, 'save')
+
+        # part, unique name check, savepoint, part, sequence, sequence read, change, permission, release
+        with django_assert_num_queries(9):
+            response = client_api.put(f'{self.url}{list_parts[0].id}/', data={'name': 'renamed'}, format='json')
+
+        assert response.status_code == 200
+        assert save.call_args.kwargs['update_fields'] == ['name', 'updated_at']
+        assert save.call_args.kwargs['expected_revision'] == 1
+
+        with django_assert_num_queries(6):
+            client_api.put(f'{self.url}{list_parts[0].id}/', data={'content': 'new'}, format='json')
+
+        assert save.call_args.kwargs['update_fields'] == ['content', 'updated_at']
+        assert save.call_args.kwargs['expected_revision'] == 2
+        list_parts[0].refresh_from_db()
+        assert list_parts[0].revision == 3
+
+
 @pytest.mark.part
 class TestDestroy:
     url = '/api/docs/parts/'
@@ -239,3 +279,69 @@ class TestDestroy:
         assert response.data['code'] == '202'
 
 
+
+
+@pytest.mark.part
+class TestBulk:
+    url = '/api/docs/parts/'
+
+    @pytest.mark.django_db
+    def test_not_admin_or_not_staff_user_should_not_work(self, client_api, single_user_without_group, list_parts):
+        client_api.force_authenticate(user=single_user_without_group)
+
+        response = client_api.post(self.url+'bulk_delete/', data={'parts': [list_parts[0].id]}, format='json')
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_bulk_delete_should_delete_parts_and_permissions(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.post(self.url+'bulk_delete/', data={'parts': [list_parts[0].id]}, format='json')
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'parts': 1}
+        assert not Part.objects.filter(id=list_parts[0].id).exists()
+        assert not Permission.objects.filter(id=list_parts[0].permission_id).exists()
+
+    @pytest.mark.django_db
+    def test_bulk_delete_with_unknown_ids_should_not_work(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.post(self.url+'bulk_delete/', data={'parts': [list_parts[0].id, 0]}, format='json')
+
+        assert response.status_code == 400
+        assert Part.objects.filter(id=list_parts[0].id).exists()
+
+    @pytest.mark.django_db
+    def test_bulk_move_should_rewrite_codenames_and_groups(self, client_api, admin_user, list_parts, version_group,
+                                                           other_version_page, django_assert_num_queries):
+        client_api.force_authenticate(user=admin_user)
+        part = list_parts[0]
+        version_group.permissions.add(part.permission)
+
+        # parts, page, names, name clash, parts, savepoint, parts, permissions, group delete, group insert, sequence,
+        # sequence read, changes, release
+        with django_assert_num_queries(14):
+            response = client_api.post(
+                self.url+'bulk_move/', data={'parts': [part.id], 'page': other_version_page.id}, format='json'
+            )
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'parts': 1}
+        part = Part.objects.select_related('permission').get(id=part.id)
+        assert (part.page_id, part.revision) == (other_version_page.id, 2)
+        assert part.permission.codename == f"version2-target-{part.name.lower().replace(' ', '_')}"
+        assert list(part.permission.group_set.values_list('name', flat=True)) == ['Version2']
+
+    @pytest.mark.django_db
+    def test_bulk_move_with_name_clash_should_not_work(self, client_api, admin_user, list_parts, other_version_page):
+        client_api.force_authenticate(user=admin_user)
+        baker.make(Part, name=list_parts[0].name, page=other_version_page)
+
+        response = client_api.post(
+            self.url+'bulk_move/', data={'parts': [list_parts[0].id], 'page': other_version_page.id}, format='json'
+        )
+
+        assert response.status_code == 400
+        assert Part.objects.get(id=list_parts[0].id).page_id == list_parts[0].page_id
@@ -0,0 +1,77 @@
+import pytest
+from django.contrib.auth.models import Group, Permission
+from model_bakery import baker
+
+from apis.serializers.page import PageResponseSerializer, PageValuesSerializer
+from apis.serializers.part import PartResponseSerializer, PartValuesSerializer
+from apis.serializers.users import UserInfoSerializer, UserInfoValuesSerializer
+from apis.serializers.version import VersionResponseSerializer, VersionValuesSerializer
+from config.backends import FastJSONRenderer
+from docs.models import Version, Page, Part
+from users.models import User
+
+SERIALIZERS = [
+    (Version, VersionResponseSerializer, VersionValuesSerializer),
+    (Page, PageResponseSerializer, PageValuesSerializer),
+    (Part, PartResponseSerializer, PartValuesSerializer),
+    (User, UserInfoSerializer, UserInfoValuesSerializer),
+]
+
+
+@pytest.fixture
+def docs():
+    # With and without the optional fields and relations
+    versions = [
+        baker.make(Version, name='Version1', description='First', permission=baker.make(Permission),
+                   group=baker.make(Group)),
+        baker.make(Version, name='Version2', description=None, permission=None, group=None),
+    ]
+    pages = [
+        baker.make(Page, version=versions[0], permission=baker.make(Permission), is_under_maintenance=True),
+        baker.make(Page, version=versions[1], permission=None, description=None),
+    ]
+    baker.make(Part, page=pages[0], content='Some "quoted" content\n', permission=baker.make(Permission))
+    baker.make(Part, page=pages[1], content='', permission=None)
+    baker.make(User, username='reader', email=None, enterprise=None)
+    baker.make(User, username='writer', email='writer@mail.com', enterprise='WZ', is_staff=True)
+
+
+@pytest.mark.values
+class TestValuesSerializers:
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('model,serializer_class,values_serializer_class', SERIALIZERS)
+    def test_output_should_be_identical_to_the_model_serializer(self, docs, model, serializer_class,
+                                                                values_serializer_class):
+        queryset = model.objects.order_by('pk')
+        rows = values_serializer_class().values(queryset)
+
+        expected = FastJSONRenderer().render(serializer_class(queryset, many=True).data)
+        assert FastJSONRenderer().render(values_serializer_class(rows, many=True).data) == expected
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('sparse_fields', [{'fields': ['name', 'permission']}, {'omit': ['content', 'id']}])
+    def test_sparse_output_should_be_identical_to_the_model_serializer(self, docs, sparse_fields):
+        queryset = Part.objects.order_by('pk')
+        rows = PartValuesSerializer(**sparse_fields).values(queryset)
+
+        expected = FastJSONRenderer().render(PartResponseSerializer(queryset, many=True, **sparse_fields).data)
+        assert FastJSONRenderer().render(PartValuesSerializer(rows, many=True, **sparse_fields).data) == expected
+
+    @pytest.mark.django_db
+    def test_list_should_be_read_in_one_query(self, docs, django_assert_num_queries):
+        serializer = PageValuesSerializer(many=True)
+
+        with django_assert_num_queries(1):
+            serializer.instance = serializer.values(Page.objects.order_by('pk'))
+            assert [page['permission'] is None for page in serializer.data] == [False, True]
+
+    def test_same_fields_in_any_order_should_share_one_layout(self):
+        PartValuesSerializer.get_layout.cache_clear()
+
+        first = PartValuesSerializer(fields=['name', 'id'])
+        second = PartValuesSerializer(fields=['id', 'name', 'id', 'name'])
+
+        assert first.layout is second.layout
+        assert [name for name, *_ in first.layout] == ['id', 'name']
+        assert PartValuesSerializer.get_layout.cache_info().currsize == 1
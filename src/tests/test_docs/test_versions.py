@@ -1,5 +1,8 @@
+import json
+
 import pytest
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
 
 from docs.models import Version
 
@@ -59,10 +62,13 @@ class TestCreate:
     def test_name_should_be_unique(self, client_api, admin_user, single_doc_version):
         client_api.force_authenticate(user=admin_user)
         body = {'name': single_doc_version[0].name.lower()}
+        permissions_count = Permission.objects.count()
         response = client_api.post(self.url, data=body, format='json')
 
         assert response.status_code == 500
         assert str(response.data['message']) == 'UNIQUE constraint failed: docs_version.name'
+        # Nothing is left behind by the failed creation
+        assert Permission.objects.count() == permissions_count
 
     @pytest.mark.django_db
     @pytest.mark.parametrize(
@@ -83,6 +89,25 @@ class TestCreate:
         assert response.data['data']['permission']['codename'] == test_input['name'].lower()
 
         assert Group.objects.filter(name=response.data['data']['name']).first() is not None
+        assert Version.objects.get(id=response.data['data']['id']).group.name == response.data['data']['name']
+
+
+    @pytest.mark.django_db
+    def test_create_should_write_each_row_once_in_one_transaction(self, client_api, admin_user, django_assert_num_queries):
+        ContentType.objects.clear_cache()
+        client_api.force_authenticate(user=admin_user)
+
+        # unique name check, content type, savepoint, permission, group, group permission, version, sequence,
+        # sequence read, change, release
+        with django_assert_num_queries(11) as context:
+            response = client_api.post(self.url, data={'name': 'v2'}, format='json')
+
+        assert response.status_code == 201
+        version_writes = [
+            query for query in context.captured_queries
+            if Version._meta.db_table in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+        assert len(version_writes) == 1
 
 
 @pytest.mark.version
@@ -102,6 +127,18 @@ class TestList:
 
         assert response.status_code == 200
 
+    @pytest.mark.django_db
+    def test_list_with_fields_should_keep_the_nested_permission(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url+'?fields=name,permission')
+
+        assert response.status_code == 200
+        assert response.json()['results']['data'] == [{
+            'name': 'Version1',
+            'permission': {'id': single_doc_version[0].permission.id, 'codename': single_doc_version[0].permission.codename},
+        }]
+
 
 @pytest.mark.version
 class TestRetrieve:
@@ -194,6 +231,46 @@ class TestUpdate:
         assert response.data['data']['permission']['codename'] == test_input['name'].lower()
 
 
+    @pytest.mark.django_db
+    def test_update_should_only_write_changed_fields(self, client_api, admin_user, single_doc_version, django_assert_num_queries, mocker):
+        client_api.force_authenticate(user=admin_user)
+        save = mocker.spy(Version, 'save')
+
+        # version, unique name check, savepoint, version, sequence, sequence read, change, permission, group, release
+        with django_assert_num_queries(10):
+            response = client_api.put(f'{self.url}{single_doc_version[0].id}/', data={'name': 'renamed'}, format='json')
+
+        assert response.status_code == 201
+        assert save.call_args.kwargs['update_fields'] == ['name', 'updated_at']
+        assert save.call_args.kwargs['expected_revision'] == 1
+
+        with django_assert_num_queries(7):
+            client_api.put(f'{self.url}{single_doc_version[0].id}/', data={'description': 'new'}, format='json')
+
+        assert save.call_args.kwargs['update_fields'] == ['description', 'updated_at']
+        assert save.call_args.kwargs['expected_revision'] == 2
+        single_doc_version[0].refresh_from_db()
+        assert single_doc_version[0].revision == 3
+
+    @pytest.mark.django_db
+    def test_update_with_stale_if_match_should_not_work(self, client_api, admin_user, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        url = f'{self.url}{single_doc_version[0].id}/'
+
+        response = client_api.put(url, data={'description': 'first'}, format='json', HTTP_IF_MATCH='"1"')
+
+        assert response.status_code == 201
+        assert response.data['data']['revision'] == 2
+
+        response = client_api.put(url, data={'name': 'renamed'}, format='json', HTTP_IF_MATCH='"1"')
+
+        assert response.status_code == 412
+        assert response.data['code'] == '412'
+        version = Version.objects.select_related('permission').get(id=single_doc_version[0].id)
+        assert (version.name, version.revision) == ('Version1', 2)
+        assert version.permission.codename == single_doc_version[0].permission.codename
+
+
 @pytest.mark.version
 class TestDestroy:
     url = '/api/docs/versions/'
@@ -273,3 +350,17 @@ class TestPages:
         assert response.data['results']['code'] == '200'
         assert len(response.data['results']['data']) == len(list_pages)
         assert response.data['results']['data'][0]['id'] == list_pages[0].id
+
+    @pytest.mark.django_db
+    def test_stream_should_return_all_pages_at_once(self, client_api, single_user_with_group, list_pages):
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(self.url+f'{list_pages[0].version.id}/pages/?stream=true')
+
+        assert response.status_code == 200
+        assert response.streaming is True
+
+        content = json.loads(b''.join(response.streaming_content))
+        assert content['code'] == '200'
+        assert len(content['data']) == len(list_pages)
+        assert content['data'][0]['id'] == list_pages[0].id
+        assert content['data'][0]['permission']['id'] == list_pages[0].permission.id
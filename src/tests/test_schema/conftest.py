@@ -0,0 +1,16 @@
+import pytest
+from rest_framework.test import APIClient
+
+from apis.swagger_schema import clear_schema_cache
+
+
+@pytest.fixture
+def client_api():
+    return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def empty_schema_cache():
+    clear_schema_cache()
+    yield
+    clear_schema_cache()
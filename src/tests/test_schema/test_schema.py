@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from apis import swagger_schema
+
+
+@pytest.mark.schema
+class TestSchema:
+    url = '/swagger.json'
+
+    def test_unauthenticated_user_should_not_work(self, client_api):
+        response = client_api.get(self.url)
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_schema_is_generated_only_once(self, client_api, admin_user, mocker):
+        client_api.force_authenticate(user=admin_user)
+        generate_schema = mocker.spy(swagger_schema, 'generate_schema')
+
+        first = client_api.get(self.url)
+        second = client_api.get(self.url)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert first.content == second.content
+        assert generate_schema.call_count == 1
+        assert json.loads(first.content)['info']['title'] == 'Wizall Documentation'
+
+    @pytest.mark.django_db
+    def test_schema_should_return_304_when_etag_matches(self, client_api, admin_user):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url)
+
+        response = client_api.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        assert response.status_code == 304
+        assert response.content == b''
+
+    @pytest.mark.django_db
+    def test_schema_should_be_gzipped_if_accepted(self, client_api, admin_user):
+        client_api.force_authenticate(user=admin_user)
+        raw = client_api.get(self.url)
+        compressed = client_api.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        assert compressed.status_code == 200
+        assert compressed['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(compressed.content) == raw.content
+        assert 'Accept-Encoding' in compressed['Vary']
+
+    @pytest.mark.django_db
+    def test_schema_should_be_served_from_built_file(self, client_api, admin_user, tmp_path, mocker):
+        schema_file = tmp_path / 'openapi.json'
+        mocker.patch.object(settings, 'OPENAPI_SCHEMA_FILE', schema_file)
+        call_command('build_openapi', output=str(schema_file))
+
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url)
+
+        assert response.status_code == 200
+        assert response.content == schema_file.read_bytes()
+
+
+@pytest.mark.schema
+class TestBuildOpenapi:
+
+    def test_schema_should_be_valid(self):
+        # Validation does not happen at request time anymore, so CI relies on this check
+        call_command('build_openapi', check=True)
@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth.models import Permission
+from django.core.cache import cache
 from model_bakery import baker
 from django.contrib.auth.models import Group
 from rest_framework.test import APIClient
@@ -8,6 +9,14 @@ from users.models import User
 from docs.models import Version, Page, Part
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Rolled back test data does not bump the structure generation, so cached catalogues would leak between tests
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def client_api():
     return APIClient()
@@ -21,6 +30,12 @@ def inactivated_user():
    return user
 
 
+@pytest.fixture
+def version_group():
+   # Group created with the Version 'Version1' and linked to it
+   return Group.objects.get_or_create(name='Version1')[0]
+
+
 @pytest.fixture
 def single_user_without_group():
    user = baker.make(User, is_staff=False, is_superuser=False)
@@ -30,11 +45,11 @@ def single_user_without_group():
 
 
 @pytest.fixture
-def single_user_with_group():
+def single_user_with_group(version_group):
    user = baker.make(User, is_staff=False, is_superuser=False)
    user.set_password('mike')
    user.save()
-   group = baker.make(Group, _quantity=1, name='Version1')[0]
+   group = version_group
    group.user_set.add(user)
    group.permissions.add(
       baker.make(Permission, _quantity=1, id=37)[0]
@@ -49,11 +64,11 @@ def single_user_with_group():
 
 
 @pytest.fixture
-def single_user_with_group():
+def single_user_with_group(version_group):
    user = baker.make(User, is_staff=False, is_superuser=False)
    user.set_password('mike')
    user.save()
-   group = baker.make(Group, _quantity=1, name='Version1')[0]
+   group = version_group
    group.user_set.add(user)
    group.permissions.add(
       baker.make(Permission, _quantity=1, id=37)[0]
@@ -68,10 +83,10 @@ def single_user_with_group():
 
 
 @pytest.fixture
-def single_doc_version():
+def single_doc_version(version_group):
    perm = baker.make(Permission, _quantity=1, id=37)[0]
 
-   version = baker.make(Version, _quantity=1, name='Version1', permission=perm)
+   version = baker.make(Version, _quantity=1, name='Version1', permission=perm, group=version_group)
    return version
 
 
@@ -82,18 +97,18 @@ def single_permission():
 
 
 @pytest.fixture
-def list_pages():
+def list_pages(version_group):
    version_perm = baker.make(Permission, _quantity=1, id=37)[0]
 
-   version = baker.make(Version, _quantity=1, name='Version1', permission=version_perm)
+   version = baker.make(Version, _quantity=1, name='Version1', permission=version_perm, group=version_group)
    pages = baker.make(Page, _quantity=1, version=version[0], permission=baker.make(Permission, _quantity=1)[0])
    return pages
 
 
 @pytest.fixture
-def list_parts():
+def list_parts(version_group):
    version = baker.make(
-      Version, _quantity=1, name='Version1',
+      Version, _quantity=1, name='Version1', group=version_group,
       permission=baker.make(Permission, _quantity=1, id=37)[0]
    )[0]
    page = baker.make(
@@ -110,9 +125,9 @@ def list_parts():
 
 
 @pytest.fixture
-def list_parts_with_other_perms():
+def list_parts_with_other_perms(version_group):
    version = baker.make(
-      Version, _quantity=1, name='Version1',
+      Version, _quantity=1, name='Version1', group=version_group,
       permission=baker.make(Permission, _quantity=1, id=50)[0]
    )[0]
    page = baker.make(
@@ -128,6 +143,13 @@ def list_parts_with_other_perms():
    return parts
 
 
+@pytest.fixture
+def other_version_parts():
+   version = baker.make(Version, name='Version2', permission=baker.make(Permission, id=50))
+   page = baker.make(Page, version=version, permission=baker.make(Permission, id=51))
+   return baker.make(Part, _quantity=1, page=page, permission=baker.make(Permission, id=52))
+
+
 @pytest.fixture
 def other_perms():
    permission= baker.make(Permission, _quantity=3,)
@@ -135,7 +157,6 @@ def other_perms():
 
 
 @pytest.fixture
-def single_group():
-   group = baker.make(Group, _quantity=1, name='Version1')
-   return group
+def single_group(version_group):
+   return [version_group]
 
@@ -1,5 +1,17 @@
+from datetime import timedelta
+from io import StringIO
+
 import pytest
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.utils import timezone
+from model_bakery import baker
+
+from docs.models import Change
+from users import access
+from users.models import User, ExpiringGrant
+from utils.choices import AccessKinds, ChangeActions, DocKinds
+from utils.pagination import encode_cursor
 
 
 @pytest.mark.access
@@ -67,9 +79,90 @@ class TestPermissions:
         response = client_api.get(self.url)
 
         assert response.status_code == 200
-        assert response.data['data']['versions'].count() == 0  # I don't know why, but it returns a queryset. So we have to use count
-        assert response.data['data']['pages'].count() == 0  # I don't know why, but it returns a queryset. So we have to use count
-        assert response.data['data']['parts'].count() == 0  # I don't know why, but it returns a queryset. So we have to use count
+        assert response.data['next'] is None
+        assert response.data['results']['data'] == {'versions': [], 'pages': [], 'parts': []}
+
+    @pytest.mark.django_db
+    def test_should_list_permissions_of_versions_pages_and_parts(self, client_api, admin_user, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url)
+
+        data = response.data['results']['data']
+        assert response.status_code == 200
+        assert [item['permission_id'] for item in data['versions']] == [37]
+        assert [item['permission_id'] for item in data['pages']] == [38]
+        assert [item['permission_id'] for item in data['parts']] == [39]
+
+    @pytest.mark.django_db
+    def test_should_filter_by_page(self, client_api, admin_user, list_parts, other_version_parts):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url, {'page': list_parts[0].page_id})
+
+        data = response.data['results']['data']
+        assert response.status_code == 200
+        assert data['versions'] == []
+        assert [item['permission_id'] for item in data['pages']] == [38]
+        assert [item['permission_id'] for item in data['parts']] == [39]
+
+    @pytest.mark.django_db
+    def test_should_filter_by_codename_prefix(self, client_api, admin_user, list_parts):
+        Permission.objects.filter(id=38).update(codename='page_home')
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url, {'codename': 'page_'})
+
+        data = response.data['results']['data']
+        assert [item['permission_id'] for item in data['versions'] + data['pages'] + data['parts']] == [38]
+
+    @pytest.mark.django_db
+    def test_should_paginate_with_cursor(self, client_api, admin_user, list_parts, other_version_parts):
+        client_api.force_authenticate(user=admin_user)
+
+        seen = []
+        url, params = self.url, {'page_size': 4}
+        while url:
+            response = client_api.get(url, params)
+            assert response.status_code == 200
+            data = response.data['results']['data']
+            seen += [item['permission_id'] for item in data['versions'] + data['pages'] + data['parts']]
+            url, params = response.data['next'], None
+
+        assert sorted(seen) == [37, 38, 39, 50, 51, 52]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('cursor', [
+        'not-a-cursor', encode_cursor([]), encode_cursor(['part_1']), encode_cursor(['part_1', 37, 1]),
+        encode_cursor([37, 'part_1']), encode_cursor(['part_1', True]),
+    ])
+    def test_invalid_cursor_should_not_work(self, client_api, admin_user, cursor):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url, {'cursor': cursor})
+
+        assert response.status_code == 400
+        assert response.data['code'] == '400'
+
+    @pytest.mark.django_db
+    def test_should_reuse_cached_catalogue_until_structure_changes(self, client_api, admin_user, list_parts,
+                                                                    django_assert_num_queries):
+        client_api.force_authenticate(user=admin_user)
+        client_api.get(self.url)
+
+        with django_assert_num_queries(0):
+            client_api.get(self.url)
+
+        part = list_parts[0]
+        part.content = 'New content'
+        part.save()
+        with django_assert_num_queries(0):
+            client_api.get(self.url)
+
+        part.name = 'Renamed'
+        part.save()
+        with django_assert_num_queries(1):
+            client_api.get(self.url)
+
+        part.delete()
+        response = client_api.get(self.url)
+        assert response.data['results']['data']['parts'] == []
 
 
 @pytest.mark.access
@@ -169,3 +262,306 @@ class TestDenyUser:
         assert response.data['data']['id'] == str(single_user_with_group.id)
         assert str(single_doc_version[0].permission.id) not in str(response.data['data']['user_permissions'])
         assert str(single_doc_version[0].permission.codename) not in str(response.data['data']['user_permissions'])
+
+
+@pytest.mark.access
+class TestBulkAccess:
+
+    @pytest.mark.django_db
+    def test_not_admin_or_not_staff_user_should_not_work(self, client_api, single_user_without_group):
+        client_api.force_authenticate(user=single_user_without_group)
+        response = client_api.post('/api/docs/access/bulk_grant_permissions/', data={}, format='json')
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_users_and_permissions_should_exist(self, client_api, admin_user):
+        client_api.force_authenticate(user=admin_user)
+        body = {'permissions': [1000], 'users': ['4fa85f64-5717-4562-b3fc-2c963f66afa6']}
+        response = client_api.post('/api/docs/access/bulk_grant_permissions/', data=body, format='json')
+
+        assert response.status_code == 400
+        assert response.data['message']['permissions'][0] == 'Some ID are not permissions IDs. Please check again'
+        assert response.data['message']['users'][0] == 'Some IDs are not users IDs. Please check again'
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('url,body', [
+        ('/api/docs/access/grant_user_permission/', {'permissions': list(range(1001)), 'user': '4fa85f64-5717-4562-b3fc-2c963f66afa6'}),
+        ('/api/docs/access/deny_user_group/', {'groups': list(range(1001)), 'user': '4fa85f64-5717-4562-b3fc-2c963f66afa6'}),
+        ('/api/docs/access/bulk_grant_permissions/', {'permissions': list(range(1001)), 'users': []}),
+        ('/api/docs/access/bulk_deny_groups/', {'groups': list(range(1001)), 'users': []}),
+    ])
+    def test_permissions_and_groups_should_be_capped_like_users(self, client_api, admin_user, url, body):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.post(url, data=body, format='json')
+
+        assert response.status_code == 400
+        target = 'permissions' if 'permissions' in body else 'groups'
+        assert response.data['message'][target][0] == 'Ensure this field has no more than 1000 elements.'
+
+    @pytest.mark.django_db
+    def test_grant_then_deny_permissions_to_many_users(self, client_api, admin_user, other_perms,
+                                                       django_assert_max_num_queries):
+        users = baker.make(User, _quantity=20)
+        user_ids = [str(user.id) for user in users]
+        permission_ids = [perm.id for perm in other_perms]
+        users[0].user_permissions.add(other_perms[0])
+        client_api.force_authenticate(user=admin_user)
+
+        # validation (2) + existing pairs (1) + one bulk insert + the users and one bulk insert of their access
+        # changes, whatever the number of users and permissions
+        with django_assert_max_num_queries(11):
+            response = client_api.post(
+                '/api/docs/access/bulk_grant_permissions/',
+                data={'users': user_ids, 'permissions': permission_ids}, format='json'
+            )
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'users': 20, 'permissions': 3, 'granted': 59}
+        assert User.user_permissions.through.objects.filter(permission__in=other_perms).count() == 60
+
+        response = client_api.post(
+            '/api/docs/access/bulk_deny_permissions/',
+            data={'users': user_ids[:10], 'permissions': permission_ids}, format='json'
+        )
+
+        assert response.status_code == 202
+        assert response.data['data'] == {'users': 10, 'permissions': 3, 'denied': 30}
+        assert User.user_permissions.through.objects.filter(permission__in=other_perms).count() == 30
+
+    @pytest.mark.django_db
+    def test_grant_then_deny_groups_to_many_users(self, client_api, admin_user):
+        users = baker.make(User, _quantity=5)
+        groups = baker.make(Group, _quantity=2)
+        body = {'users': [str(user.id) for user in users], 'groups': [group.id for group in groups]}
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.post('/api/docs/access/bulk_grant_groups/', data=body, format='json')
+        assert response.status_code == 202
+        assert response.data['data'] == {'users': 5, 'groups': 2, 'granted': 10}
+        assert all(user.groups.count() == 2 for user in users)
+
+        response = client_api.post('/api/docs/access/bulk_grant_groups/', data=body, format='json')
+        assert response.data['data']['granted'] == 0
+
+        response = client_api.post('/api/docs/access/bulk_deny_groups/', data=body, format='json')
+        assert response.status_code == 202
+        assert response.data['data'] == {'users': 5, 'groups': 2, 'denied': 10}
+        assert all(user.groups.count() == 0 for user in users)
+
+
+@pytest.mark.access
+class TestExpiringGrants:
+
+    @pytest.mark.django_db
+    def test_expiration_date_should_be_in_the_future(self, client_api, admin_user, single_user_without_group, single_doc_version):
+        client_api.force_authenticate(user=admin_user)
+        body = {
+            'permissions': [single_doc_version[0].permission.id], 'user': single_user_without_group.id,
+            'expires_at': (timezone.now() - timedelta(days=1)).isoformat()
+        }
+        response = client_api.post('/api/docs/access/grant_user_permission/', data=body, format='json')
+
+        assert response.status_code == 400
+        assert response.data['message']['expires_at'][0] == 'Expiration date should be in the future'
+
+    @pytest.mark.django_db
+    def test_expired_permission_should_be_absent_immediately(self, client_api, admin_user, single_user_without_group, single_doc_version):
+        version = single_doc_version[0]
+        client_api.force_authenticate(user=admin_user)
+        body = {
+            'permissions': [version.permission.id], 'user': single_user_without_group.id,
+            'expires_at': (timezone.now() + timedelta(days=1)).isoformat()
+        }
+        response = client_api.post('/api/docs/access/grant_user_permission/', data=body, format='json')
+        assert response.status_code == 202
+
+        client_api.force_authenticate(user=single_user_without_group)
+        response = client_api.get(f'/api/docs/versions/{version.id}/')
+        assert response.status_code == 200
+
+        ExpiringGrant.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = client_api.get(f'/api/docs/versions/{version.id}/')
+        assert response.status_code == 500
+        assert response.data['message'] == 'No Version matches the given query.'
+
+        # Not revoked yet, only ignored
+        assert single_user_without_group.user_permissions.filter(id=version.permission.id).exists()
+
+    @pytest.mark.django_db
+    def test_expired_group_should_be_absent_immediately(self, client_api, admin_user, single_user_with_group, list_parts):
+        page = list_parts[0].page
+        group = single_user_with_group.groups.get()
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(f'/api/docs/pages/{page.id}/parts/')
+        assert response.status_code == 200
+
+        baker.make(ExpiringGrant, user=single_user_with_group, group=group, expires_at=timezone.now())
+        response = client_api.get(f'/api/docs/pages/{page.id}/parts/')
+        assert response.status_code == 500
+        assert response.data['message'] == 'No Page matches the given query.'
+
+    @pytest.mark.django_db
+    def test_permanent_grant_should_clear_expiration(self, client_api, admin_user, single_user_without_group, single_doc_version):
+        permission = single_doc_version[0].permission
+        baker.make(ExpiringGrant, user=single_user_without_group, permission=permission, expires_at=timezone.now() + timedelta(days=1))
+        client_api.force_authenticate(user=admin_user)
+        body = {'permissions': [permission.id], 'user': single_user_without_group.id}
+        response = client_api.post('/api/docs/access/grant_user_permission/', data=body, format='json')
+
+        assert response.status_code == 202
+        assert ExpiringGrant.objects.exists() is False
+
+    @pytest.mark.django_db
+    def test_bulk_grant_should_record_expiration(self, client_api, admin_user, other_perms):
+        users = baker.make(User, _quantity=3)
+        expires_at = timezone.now() + timedelta(hours=1)
+        client_api.force_authenticate(user=admin_user)
+        body = {'users': [str(user.id) for user in users], 'permissions': [perm.id for perm in other_perms], 'expires_at': expires_at.isoformat()}
+        response = client_api.post('/api/docs/access/bulk_grant_permissions/', data=body, format='json')
+
+        assert response.status_code == 202
+        assert ExpiringGrant.objects.filter(expires_at=expires_at).count() == 9
+
+    @pytest.mark.django_db
+    def test_sweeper_should_revoke_expired_grants_only(self, single_user_with_group, other_perms):
+        user = single_user_with_group
+        group = user.groups.get()
+        user.user_permissions.add(*other_perms)
+        past, future = timezone.now() - timedelta(minutes=1), timezone.now() + timedelta(days=1)
+        baker.make(ExpiringGrant, user=user, group=group, expires_at=past)
+        baker.make(ExpiringGrant, user=user, permission=other_perms[0], expires_at=past)
+        baker.make(ExpiringGrant, user=user, permission=other_perms[1], expires_at=past)
+        baker.make(ExpiringGrant, user=user, permission=other_perms[2], expires_at=future)
+
+        out = StringIO()
+        call_command('revoke_expired_grants', batch_size=2, stdout=out)
+
+        assert '3 expired grant(s) revoked' in out.getvalue()
+        assert user.groups.exists() is False
+        assert list(user.user_permissions.all()) == [other_perms[2]]
+        assert list(ExpiringGrant.objects.values_list('permission_id', flat=True)) == [other_perms[2].id]
+
+    @pytest.mark.django_db
+    def test_sweeper_should_log_the_docs_the_user_can_not_read_anymore(self, single_user_with_group, list_parts):
+        user = single_user_with_group
+        part = list_parts[0]
+        group = user.groups.get()
+        user.user_permissions.add(part.permission)
+        baker.make(ExpiringGrant, user=user, group=group, expires_at=timezone.now() - timedelta(minutes=1))
+
+        call_command('revoke_expired_grants', stdout=StringIO())
+
+        # Logged per group, expanded to its objects when the change feed is read
+        assert list(Change.objects.filter(user=user).values_list('kind', 'object_id', 'action')) == [
+            (AccessKinds.GROUPS, group.id, ChangeActions.REVOKED)
+        ]
+
+
+@pytest.mark.access
+class TestReaders:
+
+    @pytest.mark.django_db
+    def test_not_admin_or_not_staff_user_should_not_work(self, client_api, single_user_with_group, list_parts):
+        client_api.force_authenticate(user=single_user_with_group)
+        response = client_api.get(f'/api/docs/pages/{list_parts[0].page_id}/readers/')
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_should_list_readers_with_their_grant(self, client_api, admin_user, single_user_with_group,
+                                                  single_user_without_group, list_parts, django_assert_num_queries):
+        part = list_parts[0]
+        direct_reader = baker.make(User, username='direct')
+        direct_reader.user_permissions.add(part.permission)
+        baker.make(User, username='nobody')
+        expired_reader = baker.make(User, username='expired')
+        expired_reader.user_permissions.add(part.permission)
+        baker.make(ExpiringGrant, user=expired_reader, permission=part.permission, expires_at=timezone.now())
+        baker.make(User, username='inactive', is_active=False).user_permissions.add(part.permission)
+        client_api.force_authenticate(user=admin_user)
+
+        # object + count + readers
+        with django_assert_num_queries(3):
+            response = client_api.get(f'/api/docs/parts/{part.id}/readers/')
+
+        readers = {reader['username']: reader['access'] for reader in response.data['results']['data']}
+        assert response.status_code == 200
+        assert response.data['count'] == 2
+        assert readers == {
+            'direct': {'direct': True, 'group': None},
+            single_user_with_group.username: {'direct': False, 'group': 'Version1'},
+        }
+
+    @pytest.mark.django_db
+    def test_page_readers_should_include_group_and_direct_grants(self, client_api, admin_user, single_user_with_group, list_parts):
+        page = list_parts[0].page
+        single_user_with_group.user_permissions.add(page.permission)
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(f'/api/docs/pages/{page.id}/readers/')
+
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+        assert response.data['results']['data'][0]['access'] == {'direct': True, 'group': 'Version1'}
+
+
+    @pytest.mark.django_db
+    def test_readers_should_be_counted_and_sliced_like_a_queryset(self, list_parts):
+        part = list_parts[0]
+        for username in ('b', 'a', 'c', 'd'):
+            baker.make(User, username=username).user_permissions.add(part.permission)
+        baker.make(User, username='e', is_active=False).user_permissions.add(part.permission)
+
+        readers = access.readers(part.permission_id)
+
+        assert readers.count() == len(list(readers)) == 4
+        assert [user.username for user in readers[1:3]] == ['b', 'c']
+        assert readers[0].username == 'a'
+        assert (readers[0].direct_grant, readers[0].group_grant) == (True, None)
+
+@pytest.mark.access
+class TestAccessMatrix:
+    url = '/api/docs/access/matrix/'
+
+    @pytest.mark.django_db
+    def test_not_admin_or_not_staff_user_should_not_work(self, client_api, single_user_without_group):
+        client_api.force_authenticate(user=single_user_without_group)
+        response = client_api.get(self.url)
+
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_should_stream_accesses_as_csv(self, client_api, admin_user, single_user_with_group, list_parts,
+                                           django_assert_num_queries):
+        page = list_parts[0].page
+        direct_reader = baker.make(User, username='direct')
+        direct_reader.user_permissions.add(page.permission)
+        expired_reader = baker.make(User, username='expired')
+        expired_reader.user_permissions.add(page.permission)
+        baker.make(ExpiringGrant, user=expired_reader, permission=page.permission, expires_at=timezone.now())
+        client_api.force_authenticate(user=admin_user)
+
+        with django_assert_num_queries(1):
+            response = client_api.get(self.url)
+            content = b''.join(response.streaming_content).decode()
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/csv'
+        header, *rows = content.splitlines()
+        assert header == 'username,kind,version,page,granted_by'
+        assert sorted(rows) == sorted([
+            f'direct,page,{page.version.name},{page.name},permission',
+            f'{single_user_with_group.username},version,{page.version.name},,group:Version1',
+            f'{single_user_with_group.username},page,{page.version.name},{page.name},group:Version1',
+        ])
+        assert [row.split(',')[0] for row in rows] == sorted(row.split(',')[0] for row in rows)
+
+    @pytest.mark.django_db
+    def test_command_should_write_the_same_csv(self, client_api, admin_user, single_user_with_group, list_parts):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url)
+
+        out = StringIO()
+        call_command('export_access_matrix', stdout=out)
+
+        assert out.getvalue() == b''.join(response.streaming_content).decode()
@@ -1,5 +1,9 @@
+import json
+
 import pytest
 from apis.serializers.users import UserInfoSerializer
+from users.models import User
+from utils.streaming import iter_json_list
 
 
 @pytest.mark.user_space
@@ -103,6 +107,21 @@ class TestCreate:
         assert response.data['data']['is_staff'] == test_input['is_staff']
 
 
+    @pytest.mark.django_db
+    def test_retry_with_same_idempotency_key_should_not_create_twice(self, client_api, admin_user, django_assert_num_queries):
+        client_api.force_authenticate(user=admin_user)
+        body = {'username': 'retried', 'password': 'secret', 'email': 'retried@mail.com'}
+        first = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='create-retried')
+
+        with django_assert_num_queries(1):
+            retry = client_api.post(self.url, data=body, format='json', HTTP_IDEMPOTENCY_KEY='create-retried')
+
+        assert first.status_code == retry.status_code == 201
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert json.loads(retry.content)['data']['id'] == first.data['data']['id']
+        assert User.objects.filter(username='retried').count() == 1
+
+
 @pytest.mark.user_space
 class TestList:
     url = '/api/users/'
@@ -136,6 +155,47 @@ class TestList:
 
         assert response.data['results']['code'] == '200'
 
+    @pytest.mark.django_db
+    def test_stream_should_return_all_users(self, client_api, admin_user, list_users_instances):
+        client_api.force_authenticate(user=admin_user)
+        response = client_api.get(self.url+'?stream=true')
+
+        assert response.status_code == 200
+        assert response.streaming is True
+
+        content = json.loads(b''.join(response.streaming_content))
+        assert content['code'] == '200'
+        assert len(content['data']) == len(list_users_instances) + 1
+        assert content['data'] == json.loads(json.dumps(UserInfoSerializer(User.objects.order_by('username'), many=True).data))
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("chunk_size", [1, 2, 4, 10])
+    def test_stream_should_serialize_by_chunk(self, list_users_instances, chunk_size):
+        chunks = list(iter_json_list(User.objects.order_by('username'), UserInfoSerializer, chunk_size=chunk_size))
+        content = json.loads(b''.join(chunks))
+
+        assert len(chunks) == 2 + -(-len(list_users_instances) // chunk_size)
+        assert [user['username'] for user in content['data']] == sorted(user.username for user in list_users_instances)
+
+    @pytest.mark.django_db
+    def test_list_with_fields_should_return_these_fields(self, client_api, admin_user, list_users_instances):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url+'?fields=id,username&stream=1')
+
+        content = json.loads(b''.join(response.streaming_content))
+        assert content['data'] == [
+            {'id': str(user.id), 'username': user.username} for user in User.objects.order_by('username')
+        ]
+
+    @pytest.mark.django_db
+    def test_write_only_fields_should_not_be_selected(self, client_api, admin_user):
+        client_api.force_authenticate(user=admin_user)
+
+        response = client_api.get(self.url+'?fields=password')
+
+        assert response.status_code == 400
+
     # @pytest.mark.django_db
     # @pytest.mark.parametrize(
     #     "test_input,expected",
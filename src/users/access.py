@@ -0,0 +1,292 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import connections, router, transaction
+from django.db.models import CharField, Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from docs.changes import insert_changes
+from docs.models import Change
+from users.models import User, ExpiringGrant
+from utils.choices import AccessKinds, ChangeActions
+
+EXPIRED_GRANTS_BATCH_SIZE = 500
+
+
+def expired_grants(user):
+    return ExpiringGrant.objects.filter(user=user, expires_at__lte=timezone.now())
+
+
+def active_groups(user):
+    """
+    Groups of the user, without the expired ones
+    """
+    return user.groups.exclude(id__in=expired_grants(user).filter(group__isnull=False).values('group_id'))
+
+
+def active_user_permissions(user):
+    """
+    Permissions given directly to the user, without the expired ones
+    """
+    return user.user_permissions.exclude(
+        id__in=expired_grants(user).filter(permission__isnull=False).values('permission_id')
+    )
+
+
+def readable_permission_ids(user):
+    """
+    IDs of the permissions the user has through its groups or directly, as a subquery.
+    Expired grants are filtered out in the same query (indexed on user and expires_at), so they are absent as
+    soon as they expire, even before the sweeper removes them.
+    """
+    return (
+        Permission.objects.filter(group__in=active_groups(user)) | active_user_permissions(user)
+    ).values_list('id', flat=True)
+
+
+class Readers:
+    """
+    Users who hold a permission, directly or through one of their groups, without expired grants, ordered by
+    username. Each user is annotated with:
+        - direct_grant: True if the permission is given to the user directly
+        - group_grant: name of a group giving the permission, None if there is none
+    Read from the permission side: the grants of the permission on the m2m tables (indexed on permission_id), then
+    the users holding them, so the cost follows the number of readers and not the number of users.
+    Staff and superusers read everything and are not listed unless they hold the permission. Inactive users can not
+    log in and are not listed.
+
+    Counted and sliced like a QuerySet, so that the paginators run one query for the count and one for the page.
+    Read from the database the router gives for reading Users, like a QuerySet.
+    """
+    ordered = True
+
+    def __init__(self, permission_id: int, now=None):
+        self.permission_id = permission_id
+        self.now = now or timezone.now()
+        self.db = router.db_for_read(User)
+
+    def grants_sql(self) -> tuple:
+        """
+        One row per grant of the permission: (user_id, direct_grant, group_grant)
+        """
+        sql = f"""
+            SELECT up.user_id, 1 AS direct_grant, NULL AS group_grant
+            FROM {User.user_permissions.through._meta.db_table} up
+            WHERE up.permission_id = %s AND NOT EXISTS (
+                SELECT 1 FROM {ExpiringGrant._meta.db_table} e
+                WHERE e.user_id = up.user_id AND e.permission_id = up.permission_id AND e.expires_at <= %s
+            )
+            UNION ALL
+            SELECT ug.user_id, 0, g.name
+            FROM {Group.permissions.through._meta.db_table} gp
+            JOIN {User.groups.through._meta.db_table} ug ON ug.group_id = gp.group_id
+            JOIN {Group._meta.db_table} g ON g.id = gp.group_id
+            WHERE gp.permission_id = %s AND NOT EXISTS (
+                SELECT 1 FROM {ExpiringGrant._meta.db_table} e
+                WHERE e.user_id = ug.user_id AND e.group_id = ug.group_id AND e.expires_at <= %s
+            )
+        """
+        now = connections[self.db].ops.adapt_datetimefield_value(self.now)
+        return sql, [self.permission_id, now, self.permission_id, now]
+
+    def count(self) -> int:
+        sql, params = self.grants_sql()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT COUNT(DISTINCT grants.user_id)
+                FROM ({sql}) grants
+                JOIN {User._meta.db_table} u ON u.id = grants.user_id
+                WHERE u.is_active = %s
+            """, [*params, True])
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        sql, params = self.grants_sql()
+        limit = connections[self.db].ops.limit_offset_sql(index.start, index.stop)
+        users = list(User.objects.db_manager(self.db).raw(f"""
+            SELECT u.*, readers.direct_grant, readers.group_grant
+            FROM (
+                SELECT grants.user_id, MAX(grants.direct_grant) AS direct_grant, MIN(grants.group_grant) AS group_grant
+                FROM ({sql}) grants
+                GROUP BY grants.user_id
+            ) readers
+            JOIN {User._meta.db_table} u ON u.id = readers.user_id
+            WHERE u.is_active = %s
+            ORDER BY u.username
+            {limit}
+        """, [*params, True]))
+        for user in users:
+            user.direct_grant = bool(user.direct_grant)
+
+        return users
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __len__(self):
+        return self.count()
+
+
+def readers(permission_id: int, now=None) -> Readers:
+    return Readers(permission_id, now)
+
+
+ACCESS_MATRIX_HEADER = ('username', 'kind', 'version', 'page', 'granted_by')
+
+
+def access_matrix(now=None):
+    """
+    Every (user, version or page) access as rows of ACCESS_MATRIX_HEADER, ordered by username.
+    One UNION ALL query over the user-permission and user-group m2m tables joined to Versions and Pages;
+    only existing accesses are listed (sparse matrix) and expired grants are left out.
+    Staff and superusers read everything and are not listed unless they hold the permission.
+    """
+    now = now or timezone.now()
+    expired = ExpiringGrant.objects.filter(user_id=OuterRef('user_id'), expires_at__lte=now)
+    direct_grants = User.user_permissions.through.objects.exclude(
+        Exists(expired.filter(permission_id=OuterRef('permission_id')))
+    )
+    group_grants = User.groups.through.objects.exclude(Exists(expired.filter(group_id=OuterRef('group_id'))))
+
+    def branch(queryset, permission: str, kind: str, granted_by):
+        # Only annotations, created in the same order, so that the columns of every branch match
+        version = f'{permission}__version__name' if kind == 'version' else f'{permission}__page__version__name'
+        return queryset.filter(**{f'{permission}__{kind}__isnull': False}).annotate(
+            matrix_username=F('user__username'),
+            matrix_kind=Value(kind, output_field=CharField()),
+            matrix_version=F(version),
+            matrix_page=F(f'{permission}__page__name') if kind == 'page' else Value('', output_field=CharField()),
+            matrix_granted_by=granted_by,
+        ).values_list(*(f'matrix_{column}' for column in ACCESS_MATRIX_HEADER)).order_by()
+
+    by_group = Concat(Value('group:'), F('group__name'), output_field=CharField())
+    branches = [
+        branch(direct_grants, 'permission', 'version', Value('permission', output_field=CharField())),
+        branch(direct_grants, 'permission', 'page', Value('permission', output_field=CharField())),
+        branch(group_grants, 'group__permissions', 'version', by_group),
+        branch(group_grants, 'group__permissions', 'page', by_group),
+    ]
+
+    return branches[0].union(*branches[1:], all=True).order_by('matrix_username', 'matrix_version', 'matrix_page')
+
+
+def log_access_changes(users: list, action: str, permissions: list = (), groups: list = ()):
+    """
+    Log in the change feed (docs.changes) the permissions or groups granted to (ChangeActions.GRANTED) or revoked
+    from (ChangeActions.REVOKED) each user: one row per user and permission or group, expanded to their
+    Versions, Pages and Parts when the feed is read. Run after the grants are changed, in the same transaction.
+    Staff and superusers read everything: nothing is logged for them.
+    Two queries whatever the number of users: the users and the bulk INSERT.
+    """
+    kind, targets = (AccessKinds.GROUPS, groups) if groups else (AccessKinds.PERMISSIONS, permissions)
+    if not targets:
+        return
+
+    users = User.objects.filter(id__in=users, is_staff=False, is_superuser=False).values_list('id', flat=True)
+    insert_changes([
+        Change(user_id=user, kind=kind, object_id=target, action=action) for user in users for target in targets
+    ])
+
+
+def access_loss_changes(permissions: list = (), groups: list = ()) -> list:
+    """
+    Unsaved Change rows of the accesses lost with the deletion of permissions or groups, so that the deletion of
+    their objects still reaches the users who could read them:
+        - the permissions revoked from the users holding them directly
+        - the groups revoked from their members
+        - the permissions lost by the groups, with no user
+    Read before the rows are deleted. Staff and superusers read everything: nothing is logged for them.
+    """
+    readers = User.objects.filter(is_staff=False, is_superuser=False).values('id')
+    changes = [
+        Change(user_id=user, kind=AccessKinds.PERMISSIONS, object_id=permission, action=ChangeActions.REVOKED)
+        for user, permission in User.user_permissions.through.objects.filter(
+            permission_id__in=permissions, user_id__in=readers
+        ).values_list('user_id', 'permission_id')
+    ]
+    changes += [
+        Change(user_id=user, kind=AccessKinds.GROUPS, object_id=group, action=ChangeActions.REVOKED)
+        for user, group in User.groups.through.objects.filter(
+            group_id__in=groups, user_id__in=readers
+        ).values_list('user_id', 'group_id')
+    ]
+    changes += [
+        Change(kind=AccessKinds.GROUPS, object_id=group, permission_id=permission, action=ChangeActions.REVOKED)
+        for group, permission in Group.permissions.through.objects.filter(
+            Q(permission_id__in=permissions) | Q(group_id__in=groups)
+        ).values_list('group_id', 'permission_id')
+    ]
+
+    return changes
+
+
+def set_grants_expiry(users: list, expires_at=None, permissions: list = (), groups: list = ()):
+    """
+    Record when the grants of permissions or groups to users expire. With `expires_at=None` the grants become
+    permanent (or are being removed), so their expiry is cleared.
+    """
+    targets = Q(permission_id__in=permissions) if permissions else Q(group_id__in=groups)
+    ExpiringGrant.objects.filter(targets, user_id__in=users).delete()
+
+    if expires_at is not None:
+        ExpiringGrant.objects.bulk_create(
+            [ExpiringGrant(user_id=user, permission_id=permission, expires_at=expires_at)
+             for user in users for permission in permissions] +
+            [ExpiringGrant(user_id=user, group_id=group, expires_at=expires_at)
+             for user in users for group in groups],
+            batch_size=1000
+        )
+
+
+def revoke_expired_grants(now=None, batch_size: int = EXPIRED_GRANTS_BATCH_SIZE) -> int:
+    """
+    Remove expired grants from the User m2m tables, batch by batch: one DELETE per table and per batch.
+    The revoked permissions and groups are logged in the change feed, with one INSERT per batch.
+    Return the number of grants revoked.
+    """
+    now = now or timezone.now()
+    revoked = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                ExpiringGrant.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('id', 'user_id', 'permission_id', 'group_id')[:batch_size]
+            )
+            if not batch:
+                return revoked
+
+            permissions = Q()
+            groups = Q()
+            revoked_by_user = {}
+            for _, user, permission, group in batch:
+                user_permissions, user_groups = revoked_by_user.setdefault(user, ([], []))
+                if permission is not None:
+                    permissions |= Q(user_id=user, permission_id=permission)
+                    user_permissions.append(permission)
+                else:
+                    groups |= Q(user_id=user, group_id=group)
+                    user_groups.append(group)
+
+            if permissions:
+                User.user_permissions.through.objects.filter(permissions).delete()
+            if groups:
+                User.groups.through.objects.filter(groups).delete()
+            ExpiringGrant.objects.filter(id__in=[grant[0] for grant in batch]).delete()
+
+            readers = set(
+                User.objects.filter(id__in=revoked_by_user, is_staff=False, is_superuser=False)
+                .values_list('id', flat=True)
+            )
+            insert_changes([
+                Change(user_id=user, kind=kind, object_id=target, action=ChangeActions.REVOKED)
+                for user, (user_permissions, user_groups) in revoked_by_user.items() if user in readers
+                for kind, targets in ((AccessKinds.PERMISSIONS, user_permissions), (AccessKinds.GROUPS, user_groups))
+                for target in targets
+            ])
+
+        revoked += len(batch)
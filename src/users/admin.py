@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import User, ExpiringGrant
 from django.contrib.auth.models import Permission
 
 
@@ -11,3 +11,4 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Permission)
+admin.site.register(ExpiringGrant)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from users.access import access_matrix, ACCESS_MATRIX_HEADER
+from utils.streaming import iter_csv, STREAMING_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Export who can read which Version and Page as CSV (one line per access)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output', dest='output', default=None,
+            help='Output file. Default to the standard output'
+        )
+
+    def handle(self, *args, **options):
+        lines = iter_csv(ACCESS_MATRIX_HEADER, access_matrix().iterator(chunk_size=STREAMING_CHUNK_SIZE))
+
+        if options['output'] is None:
+            for chunk in lines:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', newline='') as output:
+            output.writelines(lines)
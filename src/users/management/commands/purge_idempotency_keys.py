@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import IdempotentResponse
+
+
+class Command(BaseCommand):
+    help = "Delete the responses stored for Idempotency-Key headers once they are older than IDEMPOTENCY_KEY_TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, dest='batch_size', default=1000,
+            help='Number of responses deleted per query'
+        )
+
+    def handle(self, *args, **options):
+        expired = IdempotentResponse.objects.filter(created_at__lte=timezone.now() - settings.IDEMPOTENCY_KEY_TTL)
+        deleted = 0
+
+        while True:
+            batch = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += IdempotentResponse.objects.filter(id__in=batch).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'{deleted} idempotency key(s) purged'))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.access import revoke_expired_grants, EXPIRED_GRANTS_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Revoke the permissions and groups whose grant expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, dest='batch_size', default=EXPIRED_GRANTS_BATCH_SIZE,
+            help='Number of grants revoked per transaction'
+        )
+        parser.add_argument(
+            '--interval', type=int, dest='interval', default=None,
+            help='Run forever, sweeping every INTERVAL seconds (instead of a cron job)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            revoked = revoke_expired_grants(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{revoked} expired grant(s) revoked'))
+
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-19 01:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiringGrant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='auth.group')),
+                ('permission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='auth.permission')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiring_grants', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='expiringgrant',
+            index=models.Index(fields=['user', 'expires_at'], name='users_grant_user_expires_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expiringgrant',
+            constraint=models.UniqueConstraint(fields=('user', 'permission'), name='users_grant_unique_user_permission'),
+        ),
+        migrations.AddConstraint(
+            model_name='expiringgrant',
+            constraint=models.UniqueConstraint(fields=('user', 'group'), name='users_grant_unique_user_group'),
+        ),
+    ]
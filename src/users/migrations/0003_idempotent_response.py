@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-19 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_expiring_grant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotentResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(help_text='sha256 of the method, path and body of the request', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('content', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='idempotentresponse',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='users_idempotency_unique_user_key'),
+        ),
+    ]
@@ -2,7 +2,7 @@ import uuid
 
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, Permission, Group
 
 
 class User(AbstractUser):
@@ -13,3 +13,47 @@ class User(AbstractUser):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+
+class ExpiringGrant(models.Model):
+    """
+    Expiry of a Permission or Group granted to a User. The grant itself lives in the User m2m tables;
+    expired grants are ignored by access checks and removed by `manage.py revoke_expired_grants`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expiring_grants')
+    permission = models.ForeignKey(Permission, on_delete=models.CASCADE, null=True, blank=True)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'expires_at'], name='users_grant_user_expires_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'permission'], name='users_grant_unique_user_permission'),
+            models.UniqueConstraint(fields=['user', 'group'], name='users_grant_unique_user_group'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} - {self.permission_id or self.group_id} until {self.expires_at}'
+
+
+class IdempotentResponse(models.Model):
+    """
+    First response sent for an Idempotency-Key, replayed when a client retries the same request.
+    Rows older than settings.IDEMPOTENCY_KEY_TTL are ignored and removed by `manage.py purge_idempotency_keys`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text="sha256 of the method, path and body of the request")
+    status_code = models.PositiveSmallIntegerField()
+    content = models.BinaryField()
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='users_idempotency_unique_user_key'),
+        ]
@@ -0,0 +1,65 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from config.connections import check_connections, release_connections
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_executor = None
+_read_executor_lock = threading.Lock()
+
+
+def get_read_executor() -> ThreadPoolExecutor:
+    """
+    Threads running the read views, created on first use. Each thread holds at most one database connection, kept
+    for settings.CONN_MAX_AGE: settings.ASYNC_READ_THREADS bounds the connection pool of the reads of a worker.
+    """
+    global _read_executor
+    if _read_executor is None:
+        with _read_executor_lock:
+            if _read_executor is None:
+                _read_executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_READ_THREADS, thread_name_prefix='docs-read'
+                )
+
+    return _read_executor
+
+
+def async_read_view(view):
+    """
+    Async version of a sync (DRF) view, for ASGI servers.
+
+    Under ASGI, Django 3.2 runs every sync view of a worker in one shared thread, so one slow read blocks all the
+    others. Here the read requests are run in the bounded thread pool of get_read_executor() and are served
+    concurrently. Django 3.2 has no async ORM, so the view itself (queries, serialization, rendering) stays sync.
+    Writes keep Django's thread sensitive behaviour.
+    """
+    def read(request, *args, **kwargs):
+        # Same connection handling as the request_started and request_finished signals, for the pool threads
+        close_old_connections()
+        check_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if not getattr(response, 'is_rendered', True):
+                response.render()
+
+            return response
+        finally:
+            close_old_connections()
+            release_connections()
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await sync_to_async(read, thread_sensitive=False, executor=get_read_executor())(
+                request, *args, **kwargs
+            )
+
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    return wrapper
@@ -1,4 +1,4 @@
-from django.utils.translation import ugettext_lazy as _
+from django.utils.translation import gettext_lazy as _
 
 
 class Countries:
@@ -13,3 +13,45 @@ class Countries:
         (BURKINA, _("Burkina Faso")),
         (COTE_IVOIRE, _("Cote d'Ivoire")),
     )
+
+
+class DocKinds:
+    VERSIONS = 'versions'
+    PAGES = 'pages'
+    PARTS = 'parts'
+
+    CHOICES = (
+        (VERSIONS, _("Versions")),
+        (PAGES, _("Pages")),
+        (PARTS, _("Parts")),
+    )
+
+
+class AccessKinds:
+    """
+    Kinds of the access changes of the change feed: a permission or a group granted to or revoked from a user
+    """
+    PERMISSIONS = 'permissions'
+    GROUPS = 'groups'
+
+    CHOICES = (
+        (PERMISSIONS, _("Permissions")),
+        (GROUPS, _("Groups")),
+    )
+
+
+class ChangeActions:
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    # Access changes
+    GRANTED = 'granted'
+    REVOKED = 'revoked'
+
+    CHOICES = (
+        (CREATED, _("Created")),
+        (UPDATED, _("Updated")),
+        (DELETED, _("Deleted")),
+        (GRANTED, _("Granted")),
+        (REVOKED, _("Revoked")),
+    )
@@ -1,4 +1,18 @@
-from rest_framework import permissions
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from drf_yasg import openapi
+from rest_framework import permissions, status
+from rest_framework.response import Response
+
+from config.backends import FastJSONRenderer
+from users.models import IdempotentResponse
 
 
 class IsStaffOrAdminUser(permissions.BasePermission):
@@ -10,3 +24,159 @@ class IsStaffOrAdminUser(permissions.BasePermission):
         return bool(
             (request.user.is_superuser or request.user.is_staff) and request.user.is_authenticated
         )
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+idempotency_key_parameter = openapi.Parameter(
+    IDEMPOTENCY_KEY_HEADER, openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False,
+    description='Unique key of the request. A retry with the same key gets the first response back, '
+                'without running the request again'
+)
+
+
+def request_fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+IDEMPOTENCY_IN_PROGRESS = 0  # status_code of the row reserving a key while its request runs
+
+
+def stored_response(stored, fingerprint: str):
+    """
+    Response to a request whose key is already stored: the first response, or an error if the key was used for
+    another request or its request is still running
+    """
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {'message': f'{IDEMPOTENCY_KEY_HEADER} already used for another request', 'code': '422'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    if stored.status_code == IDEMPOTENCY_IN_PROGRESS:
+        return Response(
+            {'message': f'A request with this {IDEMPOTENCY_KEY_HEADER} is in progress', 'code': '409'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    response = HttpResponse(bytes(stored.content), status=stored.status_code, content_type=FastJSONRenderer.media_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Support the Idempotency-Key header on a write endpoint.
+
+    The first response (except 5xx, which can be retried) is stored for settings.IDEMPOTENCY_KEY_TTL; requests with
+    the same key get it back from one indexed lookup, without running the view again.
+    Reusing a key for another request returns a 422.
+
+    The key is reserved (unique row of the user and the key) before the view runs, in the transaction of its writes:
+    a retry arriving while the first request runs waits for it on the unique index, then gets its response back.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > IdempotentResponse._meta.get_field('key').max_length:
+            return Response(
+                {'message': f'{IDEMPOTENCY_KEY_HEADER} is too long', 'code': '400'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        stored = IdempotentResponse.objects.filter(user=request.user, key=key).first()
+        if stored is not None and stored.created_at <= timezone.now() - settings.IDEMPOTENCY_KEY_TTL:
+            stored.delete()
+            stored = None
+
+        if stored is not None:
+            return stored_response(stored, fingerprint)
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    reservation = IdempotentResponse.objects.create(
+                        user=request.user, key=key, fingerprint=fingerprint, status_code=IDEMPOTENCY_IN_PROGRESS,
+                        content=b''
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key reserved it first, and has committed since
+                stored = IdempotentResponse.objects.filter(user=request.user, key=key).first()
+                if stored is None:
+                    return Response(
+                        {'message': f'A request with this {IDEMPOTENCY_KEY_HEADER} is in progress', 'code': '409'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                return stored_response(stored, fingerprint)
+
+            response = view_method(self, request, *args, **kwargs)
+
+            if response.status_code >= 500:
+                # Nothing is kept, the request can be retried with the same key
+                transaction.set_rollback(True)
+            elif isinstance(response, Response):
+                reservation.status_code = response.status_code
+                reservation.content = FastJSONRenderer().render(response.data)
+                reservation.save(update_fields=['status_code', 'content'])
+            else:
+                reservation.delete()
+
+        return response
+
+    return wrapper
+
+
+IF_MATCH_HEADER = 'If-Match'
+
+if_match_parameter = openapi.Parameter(
+    IF_MATCH_HEADER, openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False,
+    description='ETag of the object the update is based on, as returned by its retrieve or update (e.g. "3", the '
+                '`revision` of the object). The update fails with a 412 if the object was modified since then'
+)
+
+
+def revision_etag(revision: int) -> str:
+    return f'"{revision}"'
+
+
+def with_revision_etag(response, instance):
+    """
+    Set the ETag of the revision of a Version, Page or Part on its retrieve or update response: the value to send
+    back in If-Match. ConditionalGetMiddleware keeps an ETag set by the view (it only adds a missing one).
+    """
+    response['ETag'] = revision_etag(instance.revision)
+    return response
+
+
+def if_match_revision(request):
+    """
+    Return the revision of the ETag given by the If-Match header, None if there is none or it is "*".
+    The ETag is the one of with_revision_etag() ("3"), or its weak form (W/"3") once the response was compressed;
+    a bare revision (3) is accepted too. Raise ValueError if it is not the ETag of a revision
+    """
+    value = request.headers.get(IF_MATCH_HEADER, '').strip()
+    if not value or value == '*':
+        return None
+
+    etags = parse_etags(value) if '"' in value else [revision_etag(value)]
+    if len(etags) != 1:
+        raise ValueError(f'Invalid ETag: {value}')
+
+    etag = etags[0][2:] if etags[0].startswith('W/') else etags[0]
+    revision = int(etag.strip('"'))
+    if revision < 1 or revision_etag(revision) != etag:
+        raise ValueError(f'Invalid revision: {etag}')
+
+    return revision
+
+
+def revision_conflict_response(error, expected_revision) -> Response:
+    if expected_revision is None:
+        # No precondition was given: the row was modified between the read and the write of this request
+        return Response({'message': str(error), 'code': '409'}, status=status.HTTP_409_CONFLICT)
+
+    return Response({'message': str(error), 'code': '412'}, status=status.HTTP_412_PRECONDITION_FAILED)
@@ -0,0 +1,41 @@
+import base64
+import json
+
+from django.conf import settings
+
+
+def encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def decode_cursor(cursor: str, types: tuple) -> tuple:
+    """
+    Values of the cursor, one of each of `types` in order.
+    Raise ValueError if the cursor is not one we encoded
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError('Invalid cursor')
+
+    for value, value_type in zip(values, types):
+        # bool is a subclass of int, but never a valid cursor value
+        if isinstance(value, bool) or not isinstance(value, value_type):
+            raise ValueError('Invalid cursor')
+
+    return tuple(values)
+
+
+def get_page_size(request, max_page_size: int = 1000) -> int:
+    """
+    Page size from the "page_size" query parameter, default to REST_FRAMEWORK PAGE_SIZE
+    """
+    try:
+        page_size = int(request.query_params['page_size'])
+    except (KeyError, ValueError):
+        return settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    return max(1, min(page_size, max_page_size))
@@ -0,0 +1,36 @@
+from drf_yasg import openapi
+
+sparse_fields_parameters = [
+    openapi.Parameter(
+        'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Comma separated fields to return, e.g. "id,name". Other columns are not read from the database'
+    ),
+    openapi.Parameter(
+        'omit', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Comma separated fields not to return, e.g. "content". They are not read from the database'
+    ),
+]
+
+
+def split_names(value: str) -> list:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_sparse_fields(request, serializer_class) -> dict:
+    """
+    `fields` and `omit` arguments of a serializer using SparseFieldsMixin, from the ?fields= and ?omit= query
+    parameters. Empty when the request asks for all the fields.
+    Raise ValueError if a field is not one of the serializer.
+    """
+    sparse_fields = {
+        argument: split_names(request.query_params[argument])
+        for argument in ('fields', 'omit') if argument in request.query_params
+    }
+
+    readable = [name for name, field in serializer_class().fields.items() if not field.write_only]
+    unknown = [name for names in sparse_fields.values() for name in names if name not in readable]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}. Fields are: {", ".join(readable)}')
+
+    return sparse_fields
+
@@ -0,0 +1,84 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from drf_yasg import openapi
+
+from config.backends import FastJSONRenderer
+
+STREAMING_CHUNK_SIZE = 500
+
+stream_parameter = openapi.Parameter(
+    'stream', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+    description='Stream the whole list as {"data": [...], "code": "200"} instead of paginating it'
+)
+
+
+def is_streaming_requested(request) -> bool:
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def iter_json_list(queryset, serializer_class, chunk_size: int = STREAMING_CHUNK_SIZE, serializer_kwargs: dict = None):
+    """
+    Yield {"data": [...], "code": "200"} piece by piece.
+    Rows are read through a server-side cursor and serialized chunk by chunk, so only one chunk is in memory.
+    `serializer_kwargs` are given to the serializer, e.g. the fields kept (see utils.sparse_fields).
+    """
+    serializer_kwargs = serializer_kwargs or {}
+    renderer = FastJSONRenderer()
+    separator = b''
+
+    yield b'{"data":['
+
+    chunk = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            yield separator + renderer.render(serializer_class(chunk, many=True, **serializer_kwargs).data)[1:-1]
+            separator = b','
+            chunk = []
+
+    if chunk:
+        yield separator + renderer.render(serializer_class(chunk, many=True, **serializer_kwargs).data)[1:-1]
+
+    yield b'],"code":"200"}'
+
+
+def streaming_list_response(queryset, serializer_class, chunk_size: int = STREAMING_CHUNK_SIZE,
+                            serializer_kwargs: dict = None):
+    return StreamingHttpResponse(
+        iter_json_list(queryset, serializer_class, chunk_size, serializer_kwargs),
+        content_type=FastJSONRenderer.media_type
+    )
+
+
+class _Echo:
+    """
+    File-like object returning what is written, so that csv.writer can format one row at a time
+    """
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows, chunk_size: int = STREAMING_CHUNK_SIZE):
+    """
+    Yield CSV lines for a header and an iterable of rows (e.g. queryset.values_list().iterator()),
+    `chunk_size` rows at a time, so that memory does not grow with the number of rows.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) == chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+def streaming_csv_response(header, rows, filename: str, chunk_size: int = STREAMING_CHUNK_SIZE):
+    response = StreamingHttpResponse(iter_csv(header, rows, chunk_size), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response